@@ -3,15 +3,12 @@ from collections import namedtuple
 import numpy as np
 import tensorflow as tf
 from model import LSTMPolicy
+from baselines.common.advantage import discounted_returns, gae
 import six.moves.queue as queue
-import scipy.signal
 import threading
 import distutils.version
 use_tf12_api = distutils.version.LooseVersion(tf.VERSION) >= distutils.version.LooseVersion('0.12.0')
 
-def discount(x, gamma):
-    return scipy.signal.lfilter([1], [1, -gamma], x[::-1], axis=0)[::-1]
-
 def process_rollout(rollout, gamma, lambda_=1.0):
     """
     given a rollout, compute its returns and the advantage
@@ -19,14 +16,12 @@ def process_rollout(rollout, gamma, lambda_=1.0):
     batch_si = np.asarray(rollout.states)
     batch_a = np.asarray(rollout.actions)
     rewards = np.asarray(rollout.rewards)
-    vpred_t = np.asarray(rollout.values + [rollout.r])
-
-    rewards_plus_v = np.asarray(rollout.rewards + [rollout.r])
-    batch_r = discount(rewards_plus_v, gamma)[:-1]
-    delta_t = rewards + gamma * vpred_t[1:] - vpred_t[:-1]
-    # this formula for the advantage comes "Generalized Advantage Estimation":
-    # https://arxiv.org/abs/1506.02438
-    batch_adv = discount(delta_t, gamma * lambda_)
+    values = np.asarray(rollout.values)
+    # a rollout never crosses an episode boundary, rollout.r is 0 if it ended in a terminal state
+    news = np.zeros(len(rewards))
+
+    batch_r = discounted_returns(rewards, news, rollout.r, 0, gamma)
+    batch_adv = gae(rewards, values, news, rollout.r, 0, gamma, lambda_)
 
     features = rollout.features[0]
     return Batch(batch_si, batch_a, batch_adv, batch_r, rollout.terminal, features)
@@ -227,22 +227,32 @@ class Model(object):
 
 
 class Acer():
-    def __init__(self, runner, model, buffer, log_interval):
+    def __init__(self, runner, model, buffer, log_interval, replay_ratio=0, replay_start=0):
         self.runner = runner
         self.model = model
         self.buffer = buffer
         self.log_interval = log_interval
+        self.replay_ratio = replay_ratio
+        self.replay_start = replay_start
         self.tstart = None
         self.episode_stats = EpisodeStats(runner.nsteps, runner.nenv)
         self.steps = None
+        # number of off-policy calls due after the last on-policy one
+        self.num_replay = 0
 
     def call(self, on_policy):
         runner, model, buffer, steps = self.runner, self.model, self.buffer, self.steps
         if on_policy:
-            enc_obs, obs, actions, rewards, mus, dones, masks = runner.run()
+            enc_obs, actions, rewards, mus, dones, masks = runner.run()
             self.episode_stats.feed(rewards, dones)
+            self.num_replay = 0
             if buffer is not None:
                 buffer.put(enc_obs, actions, rewards, mus, dones, masks)
+                if self.replay_ratio > 0 and buffer.has_atleast(self.replay_start):
+                    self.num_replay = np.random.poisson(self.replay_ratio)
+                    # the replay batches are assembled while the on-policy batch trains
+                    buffer.prefetch(self.num_replay)
+            obs = runner.decode(enc_obs, dones)
         else:
             # get obs, actions, rewards, mus, dones from buffer.
             obs, actions, rewards, mus, dones, masks = buffer.get()
@@ -364,14 +374,12 @@ def learn(network, env, seed=None, nsteps=20, total_timesteps=int(80e6), q_coef=
     else:
         buffer = None
     nbatch = nenvs*nsteps
-    acer = Acer(runner, model, buffer, log_interval)
+    acer = Acer(runner, model, buffer, log_interval, replay_ratio, replay_start)
     acer.tstart = time.time()
 
     for acer.steps in range(0, total_timesteps, nbatch): #nbatch samples, 1 on_policy call and multiple off-policy calls
         acer.call(on_policy=True)
-        if replay_ratio > 0 and buffer.has_atleast(replay_start):
-            n = np.random.poisson(replay_ratio)
-            for _ in range(n):
-                acer.call(on_policy=False)  # no simulation steps in this
+        for _ in range(acer.num_replay):
+            acer.call(on_policy=False)  # no simulation steps in this
 
     return model
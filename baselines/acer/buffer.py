@@ -1,3 +1,6 @@
+import queue
+import threading
+
 import numpy as np
 
 class Buffer(object):
@@ -27,6 +30,11 @@ class Buffer(object):
         self.next_idx = 0
         self.num_in_buffer = 0
 
+        # Batches assembled ahead of get() by a background thread
+        self._prefetched = queue.Queue()
+        self._num_prefetched = 0
+        self._prefetch_thread = None
+
     def has_atleast(self, frames):
         # Frames per env, so total (nenv * frames) Frames needed
         # Each buffer loc has nenv * nsteps frames
@@ -41,21 +49,22 @@ class Buffer(object):
         # dones has shape [nenvs, nsteps]
         # returns stacked obs of shape [nenv, (nsteps + 1), nh, nw, nstack*nc]
 
-        return _stack_obs(enc_obs, dones,
+        return stack_obs(enc_obs, dones,
                           nsteps=self.nsteps)
 
     def put(self, enc_obs, actions, rewards, mus, dones, masks):
         # enc_obs [nenv, (nsteps + nstack), nh, nw, nc]
         # actions, rewards, dones [nenv, nsteps]
         # mus [nenv, nsteps, nact]
+        self._drop_prefetched()
 
         if self.enc_obs is None:
             self.enc_obs = np.empty([self.size] + list(enc_obs.shape), dtype=self.obs_dtype)
             self.actions = np.empty([self.size] + list(actions.shape), dtype=self.ac_dtype)
             self.rewards = np.empty([self.size] + list(rewards.shape), dtype=np.float32)
             self.mus = np.empty([self.size] + list(mus.shape), dtype=np.float32)
-            self.dones = np.empty([self.size] + list(dones.shape), dtype=np.bool)
-            self.masks = np.empty([self.size] + list(masks.shape), dtype=np.bool)
+            self.dones = np.empty([self.size] + list(dones.shape), dtype=np.bool_)
+            self.masks = np.empty([self.size] + list(masks.shape), dtype=np.bool_)
 
         self.enc_obs[self.next_idx] = enc_obs
         self.actions[self.next_idx] = actions
@@ -68,17 +77,48 @@ class Buffer(object):
         self.num_in_buffer = min(self.size, self.num_in_buffer + 1)
 
     def take(self, x, idx, envx):
-        nenv = self.nenv
-        out = np.empty([nenv] + list(x.shape[2:]), dtype=x.dtype)
-        for i in range(nenv):
-            out[i] = x[idx[i], envx[i]]
-        return out
+        return x[idx, envx]
 
     def get(self):
         # returns
         # obs [nenv, (nsteps + 1), nh, nw, nstack*nc]
         # actions, rewards, dones [nenv, nsteps]
         # mus [nenv, nsteps, nact]
+        if self._num_prefetched > 0:
+            self._num_prefetched -= 1
+            batch = self._prefetched.get()
+            if isinstance(batch, Exception):
+                raise batch
+            return batch
+        return self.sample()
+
+    def prefetch(self, nbatches):
+        """
+        Starts assembling the batches of the next nbatches calls to get() in a background
+        thread, e.g. while the model trains on the on-policy batch. Batches that are not
+        taken by the next put() are dropped.
+        """
+        self._drop_prefetched()
+        self._num_prefetched = nbatches
+        self._prefetch_thread = threading.Thread(target=self._prefetch, args=(nbatches,), daemon=True)
+        self._prefetch_thread.start()
+
+    def _prefetch(self, nbatches):
+        for _ in range(nbatches):
+            try:
+                self._prefetched.put(self.sample())
+            except Exception as e:
+                self._prefetched.put(e)
+                return
+
+    def _drop_prefetched(self):
+        if self._prefetch_thread is not None:
+            self._prefetch_thread.join()
+            self._prefetch_thread = None
+        self._prefetched = queue.Queue()
+        self._num_prefetched = 0
+
+    def sample(self):
         nenv = self.nenv
         assert self.can_sample()
 
@@ -86,7 +126,7 @@ class Buffer(object):
         idx = np.random.randint(0, self.num_in_buffer, nenv)
         envx = np.arange(nenv)
 
-        take = lambda x: self.take(x, idx, envx)  # for i in range(nenv)], axis = 0)
+        take = lambda x: self.take(x, idx, envx)  # one fancy-indexed gather per array
         dones = take(self.dones)
         enc_obs = take(self.enc_obs)
         obs = self.decode(enc_obs, dones)
@@ -121,7 +161,8 @@ def _stack_obs_ref(enc_obs, dones, nsteps):
 
     return np.reshape(obs[:, (nstack-1):].transpose((2, 1, 3, 4, 0, 5)), (nenv, (nsteps + 1)) + obs_shape)
 
-def _stack_obs(enc_obs, dones, nsteps):
+def stack_obs(enc_obs, dones, nsteps):
+    """Stack the encoded frames enc_obs [nenv, nsteps + nstack, nh, nw, nc] into [nenv, (nsteps + 1), nh, nw, nstack*nc]."""
     nenv = enc_obs.shape[0]
     nstack = enc_obs.shape[1] - nsteps
     nc = enc_obs.shape[-1]
@@ -151,6 +192,6 @@ def test_stack_obs():
     dones = np.random.randint(low=0, high=2, size=(nenv, nsteps))
 
     stacked_obs_ref = _stack_obs_ref(enc_obs, dones, nsteps=nsteps)
-    stacked_obs_test = _stack_obs(enc_obs, dones, nsteps=nsteps)
+    stacked_obs_test = stack_obs(enc_obs, dones, nsteps=nsteps)
 
     np.testing.assert_allclose(stacked_obs_ref, stacked_obs_test)
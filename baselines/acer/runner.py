@@ -1,4 +1,5 @@
 import numpy as np
+from baselines.acer.buffer import stack_obs
 from baselines.common.runners import AbstractEnvRunner
 from baselines.common.vec_env.vec_frame_stack import VecFrameStack
 from gym import spaces
@@ -24,38 +25,36 @@ class Runner(AbstractEnvRunner):
 
 
     def run(self):
-        # enc_obs = np.split(self.obs, self.nstack, axis=3)  # so now list of obs steps
-        enc_obs = np.split(self.env.stackedobs, self.env.nstack, axis=-1)
-        mb_obs, mb_actions, mb_mus, mb_dones, mb_rewards = [], [], [], [], []
-        for _ in range(self.nsteps):
+        # the batch is kept as single frames only: the nstack frames of the current
+        # observations, oldest first, then the newest frame of every step
+        nenv, nsteps, nstack, nc = self.nenv, self.nsteps, self.nstack, self.nc
+        enc_obs = np.empty((nenv, nsteps + nstack) + self.obs.shape[1:-1] + (nc,), dtype=self.obs_dtype)
+        for i in range(nstack):
+            enc_obs[:, i] = self.obs[..., i * nc:(i + 1) * nc]
+        mb_actions = np.empty((nenv, nsteps), dtype=self.ac_dtype)
+        mb_rewards = np.empty((nenv, nsteps), dtype=np.float32)
+        mb_mus = np.empty((nenv, nsteps, self.nact), dtype=np.float32)
+        mb_dones = np.empty((nenv, nsteps + 1), dtype=np.bool_)
+        for t in range(nsteps):
             actions, mus, states = self.model.step(self.obs, S=self.states, M=self.dones)
-            mb_obs.append(np.copy(self.obs))
-            mb_actions.append(actions)
-            mb_mus.append(mus)
-            mb_dones.append(self.dones)
+            mb_actions[:, t] = actions
+            mb_mus[:, t] = mus
+            mb_dones[:, t] = self.dones
             obs, rewards, dones, _ = self.env.step(actions)
             # states information for statefull models like LSTM
             self.states = states
             self.dones = dones
             self.obs = obs
-            mb_rewards.append(rewards)
-            enc_obs.append(obs[..., -self.nc:])
-        mb_obs.append(np.copy(self.obs))
-        mb_dones.append(self.dones)
-
-        enc_obs = np.asarray(enc_obs, dtype=self.obs_dtype).swapaxes(1, 0)
-        mb_obs = np.asarray(mb_obs, dtype=self.obs_dtype).swapaxes(1, 0)
-        mb_actions = np.asarray(mb_actions, dtype=self.ac_dtype).swapaxes(1, 0)
-        mb_rewards = np.asarray(mb_rewards, dtype=np.float32).swapaxes(1, 0)
-        mb_mus = np.asarray(mb_mus, dtype=np.float32).swapaxes(1, 0)
-
-        mb_dones = np.asarray(mb_dones, dtype=np.bool).swapaxes(1, 0)
+            mb_rewards[:, t] = rewards
+            enc_obs[:, nstack + t] = obs[..., -nc:]
+        mb_dones[:, nsteps] = self.dones
 
         mb_masks = mb_dones # Used for statefull models like LSTM's to mask state when done
         mb_dones = mb_dones[:, 1:] # Used for calculating returns. The dones array is now aligned with rewards
 
-        # shapes are now [nenv, nsteps, []]
-        # When pulling from buffer, arrays will now be reshaped in place, preventing a deep copy.
-
-        return enc_obs, mb_obs, mb_actions, mb_rewards, mb_mus, mb_dones, mb_masks
+        # shapes are [nenv, nsteps, []], as stored in the buffer
+        return enc_obs, mb_actions, mb_rewards, mb_mus, mb_dones, mb_masks
 
+    def decode(self, enc_obs, dones):
+        """The stacked observations [nenv, (nsteps + 1), nh, nw, nstack*nc] of a batch from run()."""
+        return stack_obs(enc_obs, dones, nsteps=self.nsteps)
@@ -1,2 +1,3 @@
 from baselines.bench.benchmarks import *
 from baselines.bench.monitor import *
+from baselines.bench.monitor_robotics import MonitorRobotics
@@ -7,17 +7,28 @@ from glob import glob
 import csv
 import os.path as osp
 import json
+from collections import deque
 import numpy as np
 
 class Monitor(Wrapper):
+    """
+    Records the reward, length and end time of every episode to a results file.
+
+    format='csv' writes one flushed row per episode (the historical format), format='bin'
+    buffers the episodes and appends them in chunks of fixed-width binary records that
+    load_results can memory-map. Only the last stats_maxlen episodes are kept in memory
+    for get_episode_rewards() & co.; total_episodes counts all of them.
+    """
     EXT = "monitor.csv"
+    BIN_EXT = "monitor.bin"
     f = None
 
-    def __init__(self, env, filename, allow_early_resets=False, reset_keywords=(), info_keywords=()):
+    def __init__(self, env, filename, allow_early_resets=False, reset_keywords=(), info_keywords=(),
+                 format='csv', stats_maxlen=10000):
         Wrapper.__init__(self, env=env)
         self.tstart = time.time()
         if filename:
-            self.results_writer = ResultsWriter(filename,
+            self.results_writer = make_results_writer(format, filename,
                 header={"t_start": time.time(), 'env_id' : env.spec and env.spec.id},
                 extra_keys=reset_keywords + info_keywords
             )
@@ -26,11 +37,13 @@ class Monitor(Wrapper):
         self.reset_keywords = reset_keywords
         self.info_keywords = info_keywords
         self.allow_early_resets = allow_early_resets
-        self.rewards = None
+        self.eprew = 0.
+        self.eplen = 0
         self.needs_reset = True
-        self.episode_rewards = []
-        self.episode_lengths = []
-        self.episode_times = []
+        self.episode_rewards = deque(maxlen=stats_maxlen)
+        self.episode_lengths = deque(maxlen=stats_maxlen)
+        self.episode_times = deque(maxlen=stats_maxlen)
+        self.total_episodes = 0
         self.total_steps = 0
         self.current_reset_info = {} # extra info about the current episode, that was passed in during reset()
 
@@ -46,7 +59,8 @@ class Monitor(Wrapper):
     def reset_state(self):
         if not self.allow_early_resets and not self.needs_reset:
             raise RuntimeError("Tried to reset an environment before done. If you want to allow early resets, wrap your env with Monitor(env, path, allow_early_resets=True)")
-        self.rewards = []
+        self.eprew = 0.
+        self.eplen = 0
         self.needs_reset = False
 
 
@@ -70,17 +84,19 @@ class Monitor(Wrapper):
         return (ob, rew, done, info)
 
     def update(self, ob, rew, done, info):
-        self.rewards.append(rew)
+        self.eprew += rew
+        self.eplen += 1
         if done:
             self.needs_reset = True
-            eprew = sum(self.rewards)
-            eplen = len(self.rewards)
-            epinfo = {"r": round(eprew, 6), "l": eplen, "t": round(time.time() - self.tstart, 6)}
+            eprew, eplen = self.eprew, self.eplen
+            eptime = time.time() - self.tstart
+            epinfo = {"r": round(eprew, 6), "l": eplen, "t": round(eptime, 6)}
             for k in self.info_keywords:
                 epinfo[k] = info[k]
             self.episode_rewards.append(eprew)
             self.episode_lengths.append(eplen)
-            self.episode_times.append(time.time() - self.tstart)
+            self.episode_times.append(eptime)
+            self.total_episodes += 1
             epinfo.update(self.current_reset_info)
             if self.results_writer:
                 self.results_writer.write_row(epinfo)
@@ -91,6 +107,8 @@ class Monitor(Wrapper):
         self.total_steps += 1
 
     def close(self):
+        if self.results_writer is not None:
+            self.results_writer.close()
         if self.f is not None:
             self.f.close()
 
@@ -101,27 +119,32 @@ class Monitor(Wrapper):
         return self.total_steps
 
     def get_episode_rewards(self):
-        return self.episode_rewards
+        return list(self.episode_rewards)
 
     def get_episode_lengths(self):
-        return self.episode_lengths
+        return list(self.episode_lengths)
 
     def get_episode_times(self):
-        return self.episode_times
+        return list(self.episode_times)
 
 class LoadMonitorResultsError(Exception):
     pass
 
 
+def _resolve_filename(filename, ext):
+    if not filename.endswith(ext):
+        if osp.isdir(filename):
+            filename = osp.join(filename, ext)
+        else:
+            filename = filename + "." + ext
+    return filename
+
+
 class ResultsWriter(object):
     def __init__(self, filename, header='', extra_keys=()):
         self.extra_keys = extra_keys
         assert filename is not None
-        if not filename.endswith(Monitor.EXT):
-            if osp.isdir(filename):
-                filename = osp.join(filename, Monitor.EXT)
-            else:
-                filename = filename + "." + Monitor.EXT
+        filename = _resolve_filename(filename, Monitor.EXT)
         self.f = open(filename, "wt")
         if isinstance(header, dict):
             header = '# {} \n'.format(json.dumps(header))
@@ -135,20 +158,127 @@ class ResultsWriter(object):
             self.logger.writerow(epinfo)
             self.f.flush()
 
+    def close(self):
+        if not self.f.closed:
+            self.f.close()
+
+
+class BinaryResultsWriter(object):
+    """
+    Writes episodes as fixed-width little-endian records: r and t as float64, l as int64,
+    and the extra keys (which must be numeric) as float64. The file starts with a
+    '# {json}' line holding the header and the record dtype, padded so that the records
+    are aligned. Rows are buffered and appended chunk_size at a time, or after
+    flush_interval seconds, whichever comes first.
+    """
+    ALIGN = 64
+
+    def __init__(self, filename, header=None, extra_keys=(), chunk_size=1024, flush_interval=10.0):
+        assert filename is not None
+        filename = _resolve_filename(filename, Monitor.BIN_EXT)
+        self.extra_keys = tuple(extra_keys)
+        self.dtype = np.dtype([('r', '<f8'), ('l', '<i8'), ('t', '<f8')] + [(k, '<f8') for k in self.extra_keys])
+        header = dict(header or {})
+        header['dtype'] = self.dtype.descr
+        line = '# {}'.format(json.dumps(header))
+        line += ' ' * (-(len(line) + 1) % self.ALIGN) + '\n'
+        self.f = open(filename, "wb")
+        self.f.write(line.encode('ascii'))
+        self.f.flush()
+        self.buf = np.zeros(chunk_size, dtype=self.dtype)
+        self.nbuf = 0
+        self.flush_interval = flush_interval
+        self.tflush = time.time()
+
+    def write_row(self, epinfo):
+        row = self.buf[self.nbuf]
+        for k in self.dtype.names:
+            row[k] = epinfo[k]
+        self.nbuf += 1
+        if self.nbuf == len(self.buf) or time.time() - self.tflush > self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.nbuf:
+            self.buf[:self.nbuf].tofile(self.f)
+            self.nbuf = 0
+        self.f.flush()
+        self.tflush = time.time()
+
+    def close(self):
+        if not self.f.closed:
+            self.flush()
+            self.f.close()
+
+
+def make_results_writer(format, filename, header=None, extra_keys=()):
+    if format == 'csv':
+        return ResultsWriter(filename, header=header, extra_keys=extra_keys)
+    elif format == 'bin':
+        return BinaryResultsWriter(filename, header=header, extra_keys=extra_keys)
+    else:
+        raise ValueError('Unknown monitor format %s' % (format,))
+
+
+def read_binary_monitor(fname):
+    """
+    Return (header, records) for a binary monitor file, with the records memory-mapped
+    as a structured array. A partially written trailing record is ignored.
+    """
+    with open(fname, 'rb') as fh:
+        firstline = fh.readline()
+    assert firstline[:1] == b'#'
+    header = json.loads(firstline[1:].decode('ascii'))
+    dtype = np.dtype([tuple(field) for field in header.pop('dtype')])
+    nrecords = (osp.getsize(fname) - len(firstline)) // dtype.itemsize
+    if nrecords == 0:
+        return header, np.zeros(0, dtype=dtype)
+    return header, np.memmap(fname, dtype=dtype, mode='r', offset=len(firstline), shape=(nrecords,))
+
 
 def get_monitor_files(dir):
-    return glob(osp.join(dir, "*" + Monitor.EXT))
+    return glob(osp.join(dir, "*" + Monitor.EXT)) + glob(osp.join(dir, "*" + Monitor.BIN_EXT))
+
+def _load_binary_results(monitor_files):
+    """
+    Fast path of load_results for directories that only hold binary monitor files:
+    the records are memory-mapped and merged with numpy before building the DataFrame.
+    """
+    import pandas
+    headers, chunks = [], []
+    for fname in monitor_files:
+        header, records = read_binary_monitor(fname)
+        headers.append(header)
+        chunks.append((header, records))
+    columns = [k for k in chunks[0][1].dtype.names if all(k in records.dtype.names for _, records in chunks)]
+    data = {k: np.concatenate([records[k] for _, records in chunks]) for k in columns}
+    data['t'] = data['t'] + np.concatenate([np.full(len(records), header['t_start']) for header, records in chunks])
+    order = np.argsort(data['t'], kind='mergesort')
+    df = pandas.DataFrame({k: v[order] for k, v in data.items()})
+    df['t'] -= min(header['t_start'] for header in headers)
+    df.headers = headers # HACK to preserve backwards compatibility
+    return df
 
 def load_results(dir):
     import pandas
     monitor_files = (
         glob(osp.join(dir, "*monitor.json")) +
-        glob(osp.join(dir, "*monitor.csv"))) # get both csv and (old) json files
+        glob(osp.join(dir, "*monitor.csv")) +
+        glob(osp.join(dir, "*" + Monitor.BIN_EXT))) # get csv, binary and (old) json files
     if not monitor_files:
         raise LoadMonitorResultsError("no monitor files of the form *%s found in %s" % (Monitor.EXT, dir))
+    if all(fname.endswith(Monitor.BIN_EXT) for fname in monitor_files):
+        return _load_binary_results(monitor_files)
     dfs = []
     headers = []
     for fname in monitor_files:
+        if fname.endswith(Monitor.BIN_EXT):
+            header, records = read_binary_monitor(fname)
+            headers.append(header)
+            df = pandas.DataFrame(np.asarray(records))
+            df['t'] += header['t_start']
+            dfs.append(df)
+            continue
         with open(fname, 'rt') as fh:
             if fname.endswith('csv'):
                 firstline = fh.readline()
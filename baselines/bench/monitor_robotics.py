@@ -3,42 +3,42 @@ __all__ = ['MonitorRobotics', 'get_monitor_files', 'load_results']
 import gym
 from gym.core import Wrapper
 import time
-from glob import glob
-import csv
-import os.path as osp
-import json
+from collections import deque
+from baselines.bench.monitor import Monitor, LoadMonitorResultsError, make_results_writer, \
+    get_monitor_files, load_results
 
 class MonitorRobotics(Wrapper):
-    EXT = "monitor.csv"
+    """
+    Monitor for the robotics environments, sharing the results writers (and so the
+    'csv' and 'bin' formats) of bench.Monitor.
+    """
+    EXT = Monitor.EXT
     f = None
 
     def __init__(self, env, filename,
                     allow_early_resets=False,
                     reset_keywords=(),
-                    robotics=True):
+                    robotics=True,
+                    format='csv',
+                    stats_maxlen=10000):
         Wrapper.__init__(self, env=env)
         self.tstart = time.time()
         if filename is None:
-            self.f = None
-            self.logger = None
+            self.results_writer = None
         else:
-            if not filename.endswith(MonitorRobotics.EXT):
-                if osp.isdir(filename):
-                    filename = osp.join(filename, MonitorRobotics.EXT)
-                else:
-                    filename = filename + "." + MonitorRobotics.EXT
-            self.f = open(filename, "wt")
-            self.f.write('#%s\n'%json.dumps({"t_start": self.tstart, "gym_version": gym.__version__,
-                "env_id": env.spec.id if env.spec else 'Unknown'}))
-            self.logger = csv.DictWriter(self.f, fieldnames=('r', 'l', 't')+reset_keywords)
-            self.logger.writeheader()
+            self.results_writer = make_results_writer(format, filename,
+                header={"t_start": self.tstart, "gym_version": gym.__version__,
+                        "env_id": env.spec.id if env.spec else 'Unknown'},
+                extra_keys=reset_keywords)
 
         self.reset_keywords = reset_keywords
         self.allow_early_resets = allow_early_resets
-        self.rewards = None
+        self.eprew = 0.
+        self.eplen = 0
         self.needs_reset = True
-        self.episode_rewards = []
-        self.episode_lengths = []
+        self.episode_rewards = deque(maxlen=stats_maxlen)
+        self.episode_lengths = deque(maxlen=stats_maxlen)
+        self.total_episodes = 0
         self.total_steps = 0
         self.current_reset_info = {} # extra info about the current episode, that was passed in during reset()
         if robotics:
@@ -47,7 +47,8 @@ class MonitorRobotics(Wrapper):
     def reset(self, **kwargs):
         if not self.allow_early_resets and not self.needs_reset:
             raise RuntimeError("Tried to reset an environment before done. If you want to allow early resets, wrap your env with MonitorRobotics(env, path, allow_early_resets=True)")
-        self.rewards = []
+        self.eprew = 0.
+        self.eplen = 0
         self.needs_reset = False
         for k in self.reset_keywords:
             v = kwargs.get(k)
@@ -60,69 +61,33 @@ class MonitorRobotics(Wrapper):
         if self.needs_reset:
             raise RuntimeError("Tried to step environment that needs reset")
         ob, rew, done, info = self.env.step(action)
-        self.rewards.append(rew)
+        self.eprew += rew
+        self.eplen += 1
         if done:
             self.needs_reset = True
-            eprew = sum(self.rewards)
-            eplen = len(self.rewards)
+            eprew, eplen = self.eprew, self.eplen
             epinfo = {"r": round(eprew, 6), "l": eplen, "t": round(time.time() - self.tstart, 6)}
             epinfo.update(self.current_reset_info)
-            if self.logger:
-                self.logger.writerow(epinfo)
-                self.f.flush()
+            if self.results_writer:
+                self.results_writer.write_row(epinfo)
             self.episode_rewards.append(eprew)
             self.episode_lengths.append(eplen)
+            self.total_episodes += 1
             info['episode'] = epinfo
         self.total_steps += 1
         return (ob, rew, done, info)
 
     def close(self):
-        if self.f is not None:
-            self.f.close()
+        if self.results_writer is not None:
+            self.results_writer.close()
 
     def get_total_steps(self):
         return self.total_steps
 
     def get_episode_rewards(self):
-        return self.episode_rewards
+        return list(self.episode_rewards)
 
     def get_episode_lengths(self):
-        return self.episode_lengths
+        return list(self.episode_lengths)
 
-class LoadMonitorRoboticsResultsError(Exception):
-    pass
-
-def get_monitor_files(dir):
-    return glob(osp.join(dir, "*" + MonitorRobotics.EXT))
-
-def load_results(dir):
-    import pandas
-    monitor_files = glob(osp.join(dir, "*monitor.*")) # get both csv and (old) json files
-    if not monitor_files:
-        raise LoadMonitorRoboticsResultsError("no monitor files of the form *%s found in %s" % (MonitorRobotics.EXT, dir))
-    dfs = []
-    headers = []
-    for fname in monitor_files:
-        with open(fname, 'rt') as fh:
-            if fname.endswith('csv'):
-                firstline = fh.readline()
-                assert firstline[0] == '#'
-                header = json.loads(firstline[1:])
-                df = pandas.read_csv(fh, index_col=None)
-                headers.append(header)
-            elif fname.endswith('json'): # Deprecated json format
-                episodes = []
-                lines = fh.readlines()
-                header = json.loads(lines[0])
-                headers.append(header)
-                for line in lines[1:]:
-                    episode = json.loads(line)
-                    episodes.append(episode)
-                df = pandas.DataFrame(episodes)
-        df['t'] += header['t_start']
-        dfs.append(df)
-    df = pandas.concat(dfs)
-    df.sort_values('t', inplace=True)
-    df['t'] -= min(header['t_start'] for header in headers)
-    df.headers = headers # HACK to preserve backwards compatibility
-    return df
+LoadMonitorRoboticsResultsError = LoadMonitorResultsError
@@ -0,0 +1,63 @@
+import numpy as np
+import gym
+
+from baselines.bench.monitor import Monitor, load_results, read_binary_monitor
+
+
+class CountingEnv(gym.Env):
+    observation_space = gym.spaces.Box(low=0, high=1, shape=(1,), dtype=np.float32)
+    action_space = gym.spaces.Discrete(2)
+
+    def __init__(self, episode_len):
+        self.episode_len = episode_len
+        self.t = 0
+
+    def reset(self, **kwargs):
+        self.t = 0
+        return np.zeros(1, dtype=np.float32)
+
+    def step(self, action):
+        self.t += 1
+        return np.zeros(1, dtype=np.float32), 0.5, self.t == self.episode_len, {'step': self.t}
+
+
+def run_monitor(path, format, nepisodes, episode_len, **kwargs):
+    env = Monitor(CountingEnv(episode_len), path, format=format, info_keywords=('step',), **kwargs)
+    for _ in range(nepisodes):
+        env.reset()
+        done = False
+        while not done:
+            _, _, done, _ = env.step(0)
+    env.close()
+    return env
+
+
+def test_binary_monitor_matches_csv(tmpdir):
+    csv_dir, bin_dir = tmpdir.mkdir('csv'), tmpdir.mkdir('bin')
+    for rank in range(2):
+        run_monitor(str(csv_dir.join(str(rank))), 'csv', nepisodes=5, episode_len=3 + rank)
+        run_monitor(str(bin_dir.join(str(rank))), 'bin', nepisodes=5, episode_len=3 + rank)
+
+    assert len(bin_dir.listdir()) == 2
+    header, records = read_binary_monitor(str(bin_dir.join('0.monitor.bin')))
+    assert isinstance(records, np.memmap) and len(records) == 5
+    assert 't_start' in header and 'dtype' not in header
+
+    expected, actual = load_results(str(csv_dir)), load_results(str(bin_dir))
+    assert len(actual.headers) == 2
+    assert sorted(actual['l']) == sorted(expected['l'])
+    assert np.allclose(sorted(actual['r']), sorted(expected['r']))
+    assert np.all(np.diff(actual['t']) >= 0)
+
+
+def test_binary_monitor_ignores_partial_record(tmpdir):
+    run_monitor(str(tmpdir.join('0')), 'bin', nepisodes=4, episode_len=2)
+    with open(str(tmpdir.join('0.monitor.bin')), 'ab') as f:
+        f.write(b'\0' * 5)
+    assert len(load_results(str(tmpdir))) == 4
+
+
+def test_monitor_statistics_are_bounded():
+    env = run_monitor(None, 'csv', nepisodes=20, episode_len=2, stats_maxlen=8)
+    assert env.total_episodes == 20 and env.total_steps == 40
+    assert env.get_episode_lengths() == [2] * 8
@@ -0,0 +1,151 @@
+"""
+Discounted returns and GAE(lambda) advantages for on-policy algorithms.
+
+All functions take arrays of shape (T,) or (T, nenvs), time first, and use the
+convention of the runners: news[t] is True when observation t is the first of an
+episode, so the reward of step t is bootstrapped from step t+1 unless news[t+1]
+(or last_news for the last step) is set.
+"""
+import numpy as np
+import scipy.signal
+
+
+# above this many columns a reverse loop over time with vector operations over the
+# columns beats filtering every column separately
+_LFILTER_MAX_COLUMNS = 48
+
+
+def discounted_sum(x, gamma, nonterminal):
+    """
+    computes y along the 0th dimension of x with
+
+        y[T-1] = x[T-1]
+        y[t] = x[t] + gamma * nonterminal[t] * y[t+1]
+
+    i.e. discounted sums that restart wherever nonterminal is 0.
+
+    For a few columns, they are filtered in time-reversed order by a single
+    scipy.signal.lfilter call that ignores the restarts; the part of the filtered sum
+    that leaked across the last restart is then subtracted, which only takes vectorized
+    operations. Wide batches loop over time instead, with every step vectorized
+    over the columns.
+    """
+    x = np.asarray(x)
+    T = x.shape[0]
+    xs = x.reshape(T, -1)
+    nonterminal = np.asarray(nonterminal).reshape(T, -1)
+    if gamma == 0:
+        ys = xs.copy()
+    elif xs.shape[1] > _LFILTER_MAX_COLUMNS:
+        coef = (gamma * nonterminal).astype(xs.dtype)
+        ys = np.empty_like(xs)
+        ys[-1] = xs[-1]
+        for t in range(T - 2, -1, -1):
+            np.multiply(coef[t], ys[t+1], out=ys[t])
+            ys[t] += xs[t]
+    else:
+        restart = nonterminal[::-1] == 0
+        restart[0] = True
+        # in float64, as the subtraction cancels most of the filtered sums
+        filtered = scipy.signal.lfilter([1], [1, -gamma], xs[::-1].astype(np.float64), axis=0)
+        steps = np.arange(T, dtype=np.int32).reshape(T, 1)
+        start = np.maximum.accumulate(np.where(restart, steps, 0), axis=0)
+        leaked = np.take_along_axis(filtered, np.maximum(start - 1, 0), axis=0)
+        leaked[start == 0] = 0.
+        ys = (filtered - np.exp((steps - start + 1) * np.log(gamma)) * leaked)[::-1]
+    return ys.reshape(x.shape)
+
+
+def _next_nonterminal(news, last_news, dtype=np.float32):
+    news = np.asarray(news)
+    nonterminal = np.empty(news.shape, dtype=dtype)
+    nonterminal[:-1] = news[1:]
+    nonterminal[-1] = last_news
+    return np.subtract(1, nonterminal, out=nonterminal)
+
+
+def discounted_returns(rewards, news, last_values, last_news, gamma,
+                       truncated=None, truncated_values=None, dtype=np.float32):
+    """
+    Discounted returns, bootstrapped with last_values at the end of the batch.
+
+    rewards: rewards of steps 0..T-1
+    news: whether observation t starts a new episode
+    last_values, last_news: value and episode start flag of observation T
+    truncated: whether the episode ended at step t by running out of time rather
+        than by reaching a terminal state, in which case the return is bootstrapped
+        with truncated_values[t], the value of the observation the episode ended in
+    """
+    x = np.array(rewards, dtype=np.result_type(rewards, np.float32))
+    nonterminal = _next_nonterminal(news, last_news, x.dtype)
+    x[-1] += gamma * nonterminal[-1] * last_values
+    if truncated is not None:
+        x += gamma * np.asarray(truncated) * truncated_values
+    return discounted_sum(x, gamma, nonterminal).astype(dtype, copy=False)
+
+
+def gae(rewards, values, news, last_values, last_news, gamma, lam,
+        truncated=None, truncated_values=None, dtype=np.float32):
+    """
+    Generalized Advantage Estimation (https://arxiv.org/abs/1506.02438).
+
+    Returns the advantages; the TD(lambda) returns are advantages + values.
+    Arguments are as for discounted_returns, values are the value estimates of
+    observations 0..T-1.
+    """
+    values = np.asarray(values, dtype=np.result_type(rewards, values, np.float32))
+    nonterminal = _next_nonterminal(news, last_news, values.dtype)
+    nextvalues = np.concatenate([values[1:], np.asarray(last_values, dtype=values.dtype).reshape((1,) + values.shape[1:])])
+    # delta = rewards + gamma * nextvalues * nonterminal - values, without temporaries
+    delta = nextvalues
+    delta *= nonterminal
+    delta *= gamma
+    delta += rewards
+    delta -= values
+    if truncated is not None:
+        delta += gamma * np.asarray(truncated) * truncated_values
+    return discounted_sum(delta, gamma * lam, nonterminal).astype(dtype, copy=False)
+
+
+def episode_sums(x, dones, carry=0.):
+    """
+    Sums of x over the episodes that end in the batch, i.e. at every step t with
+    dones[t] set, in the order they end. carry is the sum of the episode running at
+    the start of the batch; it is returned updated with the sum of the episode still
+    running at its end, to be carried into the next batch.
+    """
+    csum = np.cumsum(np.concatenate([[carry], np.asarray(x, dtype=np.float64)]))
+    totals = csum[np.flatnonzero(dones) + 1]
+    sums = np.diff(totals, prepend=0.)
+    return sums, csum[-1] - (totals[-1] if len(totals) else 0.)
+
+
+def _gae_loop(rewards, values, news, last_values, last_news, gamma, lam):
+    # the reverse loop the runners used to run, as a reference for the benchmark
+    nsteps = len(rewards)
+    advs = np.zeros_like(rewards)
+    lastgaelam = 0
+    for t in reversed(range(nsteps)):
+        if t == nsteps - 1:
+            nextnonterminal = 1.0 - last_news
+            nextvalues = last_values
+        else:
+            nextnonterminal = 1.0 - news[t+1]
+            nextvalues = values[t+1]
+        delta = rewards[t] + gamma * nextvalues * nextnonterminal - values[t]
+        advs[t] = lastgaelam = delta + gamma * lam * nextnonterminal * lastgaelam
+    return advs
+
+
+if __name__ == '__main__':
+    import timeit
+    rng = np.random.RandomState(0)
+    for nsteps, nenvs in [(2048, 1), (2048, 8), (2048, 64), (2048, 256)]:
+        rewards = rng.randn(nsteps, nenvs).astype(np.float32)
+        values = rng.randn(nsteps, nenvs).astype(np.float32)
+        news = rng.rand(nsteps, nenvs) < 0.01
+        last_values, last_news = rng.randn(nenvs).astype(np.float32), np.zeros(nenvs, dtype=bool)
+        args = (rewards, values, news, last_values, last_news, 0.99, 0.95)
+        times = [min(timeit.repeat(lambda: fn(*args), number=5, repeat=5)) / 5 for fn in (_gae_loop, gae)]
+        print('nsteps %i x nenvs %i: loop %.2f ms, vectorized %.2f ms, speedup %.1fx' % (
+            nsteps, nenvs, times[0] * 1e3, times[1] * 1e3, times[0] / times[1]))
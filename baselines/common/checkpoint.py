@@ -0,0 +1,165 @@
+"""
+Checkpoints stored as content addressed arrays.
+
+A checkpoint at save_path is a small JSON index mapping every variable name to an
+.npy file in the arrays/ directory next to it. The files are named by a hash of their
+content, so an array that did not change since an earlier checkpoint in the same
+directory (target networks, frozen layers, ...) is not written again, and every array
+can be memory-mapped on load.
+
+The index is not self-contained: a checkpoint is moved or copied together with the
+arrays/ directory next to it, which the other checkpoints of the directory share.
+
+Saves with blocking=False are asynchronous: save_arrays() returns as soon as the arrays
+are queued, a background thread hashes and writes them, and the index is only replaced
+once all of its arrays are on disk. An error of the background write is raised by the
+next save, load_arrays() or wait(), which block until pending saves are done.
+"""
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+ARRAYS_DIR = 'arrays'
+FORMAT = 'baselines-checkpoint-v1'
+# the index is written with the format first, so that it can be recognized from its first bytes
+_INDEX_PREFIX = json.dumps({'format': FORMAT})[:-1].encode()
+
+
+def array_hash(value):
+    h = hashlib.blake2b(digest_size=16)
+    h.update('{}{}'.format(value.dtype.str, value.shape).encode())
+    h.update(np.ascontiguousarray(value).data)
+    return h.hexdigest()
+
+
+def is_checkpoint(path):
+    """Whether path is the index of a checkpoint written by this module."""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(_INDEX_PREFIX)) == _INDEX_PREFIX
+    except OSError:
+        return False
+
+
+def write_checkpoint(save_path, arrays):
+    """Writes the dict arrays (name -> np.ndarray) as a checkpoint, synchronously."""
+    dirname = os.path.dirname(os.path.abspath(save_path))
+    arrays_dir = os.path.join(dirname, ARRAYS_DIR)
+    os.makedirs(arrays_dir, exist_ok=True)
+    previous = _read_index(save_path)['arrays'] if is_checkpoint(save_path) else {}
+    index = {}
+    for name, value in arrays.items():
+        value = np.asarray(value)
+        fname = os.path.join(ARRAYS_DIR, array_hash(value) + '.npy')
+        path = os.path.join(dirname, fname)
+        if not os.path.exists(path):
+            _atomic_write(path, lambda f: np.save(f, value, allow_pickle=False))
+        index[name] = {'file': fname, 'shape': list(value.shape), 'dtype': value.dtype.str}
+    _atomic_write(save_path, lambda f: f.write(json.dumps({'format': FORMAT, 'arrays': index}).encode()))
+    stale = {entry['file'] for entry in previous.values()} - {entry['file'] for entry in index.values()}
+    if stale:
+        _remove_unreferenced(dirname, stale)
+
+
+def read_checkpoint(load_path, mmap=True):
+    """Returns the arrays of the checkpoint at load_path, as read-only memory maps if mmap."""
+    dirname = os.path.dirname(os.path.abspath(load_path))
+    arrays = {}
+    for name, entry in _read_index(load_path)['arrays'].items():
+        # empty arrays cannot be memory-mapped
+        mmap_mode = 'r' if mmap and np.prod(entry['shape']) > 0 else None
+        arrays[name] = np.load(os.path.join(dirname, entry['file']), mmap_mode=mmap_mode, allow_pickle=False)
+    return arrays
+
+
+def _read_index(path):
+    with open(path, 'rb') as f:
+        return json.loads(f.read().decode())
+
+
+def _atomic_write(path, write):
+    tmp_path = '{}.tmp{}'.format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def _remove_unreferenced(dirname, files):
+    # arrays dropped from an overwritten checkpoint may still be used by the other ones
+    for name in os.listdir(dirname):
+        path = os.path.join(dirname, name)
+        if os.path.isfile(path) and is_checkpoint(path):
+            files -= {entry['file'] for entry in _read_index(path)['arrays'].values()}
+    for fname in files:
+        try:
+            os.remove(os.path.join(dirname, fname))
+        except FileNotFoundError:
+            pass
+
+
+class CheckpointWriter(object):
+    """Writes checkpoints in order from a background thread."""
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, save_path, arrays):
+        self._raise_error()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                atexit.register(self.wait)
+        self._queue.put((save_path, arrays))
+
+    def wait(self):
+        """Blocks until all submitted checkpoints are written."""
+        self._queue.join()
+        self._raise_error()
+
+    def _run(self):
+        while True:
+            save_path, arrays = self._queue.get()
+            try:
+                write_checkpoint(save_path, arrays)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+
+_writer = CheckpointWriter()
+
+
+def save_arrays(save_path, arrays, blocking=True):
+    """
+    Saves the dict arrays (name -> np.ndarray) as a checkpoint at save_path. Unless
+    blocking, it is written in the background, and the arrays must not be modified afterwards.
+    """
+    if blocking:
+        wait()
+        write_checkpoint(save_path, arrays)
+    else:
+        _writer.submit(save_path, arrays)
+
+
+def load_arrays(load_path, mmap=True):
+    wait()
+    return read_checkpoint(load_path, mmap=mmap)
+
+
+def wait():
+    """Blocks until all checkpoints saved asynchronously are written."""
+    _writer.wait()
@@ -28,9 +28,14 @@ def make_vec_env(env_id, env_type, num_env, seed,
                  flatten_dict_observations=True,
                  gamestate=None,
                  initializer=None,
-                 force_dummy=False):
+                 force_dummy=False,
+                 in_series=1):
     """
     Create a wrapped, monitored SubprocVecEnv for Atari and MuJoCo.
+
+    in_series: number of environments each worker process steps sequentially. With
+    in_series > 1 a SubprocVecEnv with num_env // in_series processes is created,
+    which pays off when there are many more (cheap) envs than cores.
     """
     wrapper_kwargs = wrapper_kwargs or {}
     env_kwargs = env_kwargs or {}
@@ -54,7 +59,9 @@ def make_vec_env(env_id, env_type, num_env, seed,
         )
 
     set_global_seeds(seed)
-    if not force_dummy and num_env > 1:
+    if not force_dummy and num_env > 1 and in_series > 1:
+        return SubprocVecEnv([make_thunk(i + start_index, initializer=initializer) for i in range(num_env)], in_series=in_series)
+    elif not force_dummy and num_env > 1:
         return ShmemVecEnv([make_thunk(i + start_index, initializer=initializer) for i in range(num_env)])
     else:
         return DummyVecEnv([make_thunk(i + start_index, initializer=None) for i in range(num_env)])
@@ -167,6 +174,7 @@ def common_arg_parser():
     parser.add_argument('--gamestate', help='game state to load (so far only used in retro games)', default=None)
     parser.add_argument('--num_env', help='Number of environment copies being run in parallel. When not specified, set to number of cpus for Atari, and to 1 for Mujoco', default=None, type=int)
     parser.add_argument('--reward_scale', help='Reward scale factor. Default: 1.0', default=1.0, type=float)
+    parser.add_argument('--normalize_sync_every', help='Number of steps between merges of the observation and return normalization statistics of the MPI workers (Mujoco). Default: 1', default=1, type=int)
     parser.add_argument('--save_path', help='Path to save trained model to', default=None, type=str)
     parser.add_argument('--save_video_interval', help='Save video every x steps (0 = disabled)', default=0, type=int)
     parser.add_argument('--save_video_length', help='Length of recorded video. Default: 200', default=200, type=int)
@@ -1,6 +1,7 @@
 import baselines.common.tf_util as U
 import tensorflow as tf
 import numpy as np
+import zlib
 try:
     from mpi4py import MPI
 except ImportError:
@@ -8,19 +9,53 @@ except ImportError:
 
 
 class MpiAdam(object):
-    def __init__(self, var_list, *, beta1=0.9, beta2=0.999, epsilon=1e-08, scale_grad_by_procs=True, comm=None):
+    """
+    Adam whose gradients are averaged over the MPI workers.
+
+    With in_graph=True the moments and the parameter step live in the TF graph: an update
+    only feeds the averaged gradient, instead of pulling the flat parameters to the host
+    and pushing the stepped ones back.
+    """
+    def __init__(self, var_list, *, beta1=0.9, beta2=0.999, epsilon=1e-08, scale_grad_by_procs=True, comm=None,
+                 in_graph=False):
         self.var_list = var_list
         self.beta1 = beta1
         self.beta2 = beta2
         self.epsilon = epsilon
         self.scale_grad_by_procs = scale_grad_by_procs
+        self.in_graph = in_graph
         size = sum(U.numel(v) for v in var_list)
-        self.m = np.zeros(size, 'float32')
-        self.v = np.zeros(size, 'float32')
         self.t = 0
         self.setfromflat = U.SetFromFlat(var_list)
         self.getflat = U.GetFlat(var_list)
         self.comm = MPI.COMM_WORLD if comm is None and MPI is not None else comm
+        if in_graph:
+            self._build_apply(size)
+        else:
+            self.m = np.zeros(size, 'float32')
+            self.v = np.zeros(size, 'float32')
+
+    def _build_apply(self, size):
+        with tf.variable_scope(None, default_name='MpiAdam'):
+            self._g = tf.placeholder(tf.float32, [size], name='g')
+            # bias corrected stepsize
+            self._a = tf.placeholder(tf.float32, [], name='a')
+            # local variables, like the numpy moments they replace: they are not part of
+            # GLOBAL_VARIABLES, so checkpoints saved and loaded through those are unchanged
+            m = tf.Variable(tf.zeros([size]), trainable=False, name='m', collections=[tf.GraphKeys.LOCAL_VARIABLES])
+            v = tf.Variable(tf.zeros([size]), trainable=False, name='v', collections=[tf.GraphKeys.LOCAL_VARIABLES])
+            m_t = tf.assign(m, self.beta1 * m + (1 - self.beta1) * self._g)
+            v_t = tf.assign(v, self.beta2 * v + (1 - self.beta2) * tf.square(self._g))
+            step = (- self._a) * m_t / (tf.sqrt(v_t) + self.epsilon)
+            updates = []
+            start = 0
+            for var in self.var_list:
+                numel = U.numel(var)
+                updates.append(tf.assign_add(var, tf.reshape(step[start:start + numel], U.var_shape(var))))
+                start += numel
+            self._apply = tf.group(*updates)
+            # the moments start at zero, so they are (re)initialized before the first update
+            self._init_moments = tf.variables_initializer([m, v])
 
     def update(self, localg, stepsize):
         if self.t % 100 == 0:
@@ -36,6 +71,12 @@ class MpiAdam(object):
 
         self.t += 1
         a = stepsize * np.sqrt(1 - self.beta2**self.t)/(1 - self.beta1**self.t)
+        if self.in_graph:
+            sess = U.get_session()
+            if self.t == 1:
+                sess.run(self._init_moments)
+            sess.run(self._apply, feed_dict={self._g: globalg, self._a: a})
+            return
         self.m = self.beta1 * self.m + (1 - self.beta1) * globalg
         self.v = self.beta2 * self.v + (1 - self.beta2) * (globalg * globalg)
         step = (- a) * self.m / (np.sqrt(self.v) + self.epsilon)
@@ -49,19 +90,16 @@ class MpiAdam(object):
         self.setfromflat(theta)
 
     def check_synced(self):
+        """Checks that the parameters are the same on all workers, only broadcasting a checksum."""
         if self.comm is None:
             return
-        if self.comm.Get_rank() == 0: # this is root
-            theta = self.getflat()
-            self.comm.Bcast(theta, root=0)
-        else:
-            thetalocal = self.getflat()
-            thetaroot = np.empty_like(thetalocal)
-            self.comm.Bcast(thetaroot, root=0)
-            assert (thetaroot == thetalocal).all(), (thetaroot, thetalocal)
+        checksum = zlib.adler32(self.getflat().tobytes())
+        rootchecksum = self.comm.bcast(checksum, root=0)
+        assert checksum == rootchecksum, 'parameters differ from the ones of rank 0 (checksum {} != {})'.format(
+            checksum, rootchecksum)
 
 @U.in_session
-def test_MpiAdam():
+def test_MpiAdam(in_graph=False):
     np.random.seed(0)
     tf.set_random_seed(0)
 
@@ -87,7 +125,7 @@ def test_MpiAdam():
 
     var_list = [a,b]
     lossandgrad = U.function([], [loss, U.flatgrad(loss, var_list)])
-    adam = MpiAdam(var_list)
+    adam = MpiAdam(var_list, in_graph=in_graph)
 
     losslist_test = []
     for i in range(10):
@@ -98,6 +136,18 @@ def test_MpiAdam():
 
     np.testing.assert_allclose(np.array(losslist_ref), np.array(losslist_test), atol=1e-4)
 
+def test_MpiAdam_in_graph():
+    test_MpiAdam(in_graph=True)
+
+@U.in_session
+def test_MpiAdam_in_graph_keeps_global_variables():
+    a = tf.Variable(np.zeros(3, 'float32'))
+    global_variables = tf.global_variables()
+    MpiAdam([a], in_graph=True)
+    # checkpoints of the global variables, e.g. pi.load_var, are not affected by the moments
+    assert tf.global_variables() == global_variables
+
 
 if __name__ == '__main__':
     test_MpiAdam()
+    test_MpiAdam_in_graph()
@@ -7,45 +7,76 @@ import tensorflow as tf, baselines.common.tf_util as U, numpy as np
 
 class RunningMeanStd(object):
     # https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm
-    def __init__(self, epsilon=1e-2, shape=()):
+    """
+    Running mean and std of the data passed to update(), over all MPI workers.
+
+    sync_every: the sums of the batches passed to update() are accumulated locally and only
+        reduced over the workers and added to the TF variables on every sync_every-th update,
+        or when flush() is called; mean and std lag behind by up to sync_every - 1 batches.
+        All workers have to call update() (and flush()) the same number of times.
+    dtype: precision of the statistics, tf.float32 avoids converting each batch to float64
+    """
+    def __init__(self, epsilon=1e-2, shape=(), sync_every=1, dtype=tf.float64):
 
         self._sum = tf.get_variable(
-            dtype=tf.float64,
+            dtype=dtype,
             shape=shape,
             initializer=tf.constant_initializer(0.0),
             name="runningsum", trainable=False)
         self._sumsq = tf.get_variable(
-            dtype=tf.float64,
+            dtype=dtype,
             shape=shape,
             initializer=tf.constant_initializer(epsilon),
             name="runningsumsq", trainable=False)
         self._count = tf.get_variable(
-            dtype=tf.float64,
+            dtype=dtype,
             shape=(),
             initializer=tf.constant_initializer(epsilon),
             name="count", trainable=False)
         self.shape = shape
+        self.sync_every = sync_every
 
         self.mean = tf.to_float(self._sum / self._count)
         self.std = tf.sqrt( tf.maximum( tf.to_float(self._sumsq / self._count) - tf.square(self.mean) , 1e-2 ))
 
-        newsum = tf.placeholder(shape=self.shape, dtype=tf.float64, name='sum')
-        newsumsq = tf.placeholder(shape=self.shape, dtype=tf.float64, name='var')
-        newcount = tf.placeholder(shape=[], dtype=tf.float64, name='count')
+        newsum = tf.placeholder(shape=self.shape, dtype=dtype, name='sum')
+        newsumsq = tf.placeholder(shape=self.shape, dtype=dtype, name='var')
+        newcount = tf.placeholder(shape=[], dtype=dtype, name='count')
         self.incfiltparams = U.function([newsum, newsumsq, newcount], [],
             updates=[tf.assign_add(self._sum, newsum),
                      tf.assign_add(self._sumsq, newsumsq),
                      tf.assign_add(self._count, newcount)])
 
+        self._dtype = dtype.as_numpy_dtype
+        self._n = int(np.prod(self.shape))
+        # local sum, sum of squares and count since the last flush
+        self._pending = np.zeros(self._n*2+1, self._dtype)
+        self._pending_updates = 0
+
 
     def update(self, x):
-        x = x.astype('float64')
-        n = int(np.prod(self.shape))
-        totalvec = np.zeros(n*2+1, 'float64')
-        addvec = np.concatenate([x.sum(axis=0).ravel(), np.square(x).sum(axis=0).ravel(), np.array([len(x)],dtype='float64')])
+        x = np.asarray(x, dtype=self._dtype).reshape(-1, self._n)
+        n = self._n
+        self._pending[0:n] += x.sum(axis=0)
+        self._pending[n:2*n] += np.einsum('ij,ij->j', x, x)
+        self._pending[2*n] += len(x)
+        self._pending_updates += 1
+        if self._pending_updates >= self.sync_every:
+            self.flush()
+
+    def flush(self):
+        """Adds the statistics accumulated since the last flush, summed over the MPI workers."""
+        if self._pending_updates == 0:
+            return
+        n = self._n
         if MPI is not None:
-            MPI.COMM_WORLD.Allreduce(addvec, totalvec, op=MPI.SUM)
+            totalvec = np.zeros_like(self._pending)
+            MPI.COMM_WORLD.Allreduce(self._pending, totalvec, op=MPI.SUM)
+        else:
+            totalvec = self._pending.copy()
         self.incfiltparams(totalvec[0:n].reshape(self.shape), totalvec[n:2*n].reshape(self.shape), totalvec[2*n])
+        self._pending[:] = 0
+        self._pending_updates = 0
 
 @U.in_session
 def test_runningmeanstd():
@@ -66,6 +97,27 @@ def test_runningmeanstd():
 
         assert np.allclose(ms1, ms2)
 
+@U.in_session
+def test_runningmeanstd_deferred():
+    np.random.seed(0)
+    xs = [np.random.randn(n, 3).astype('float32') for n in (3, 4, 5, 6)]
+    x = np.concatenate(xs, axis=0)
+    for dtype in [tf.float64, tf.float32]:
+        with tf.variable_scope(dtype.name):
+            rms = RunningMeanStd(epsilon=0.0, shape=(3,), sync_every=3, dtype=dtype)
+        U.initialize()
+
+        for xi in xs[:3]:
+            rms.update(xi)
+        ms = [rms.mean.eval(), rms.std.eval()]
+        assert np.allclose(ms, [x[:12].mean(axis=0), x[:12].std(axis=0)], atol=1e-5)
+
+        # the last batch is only added once flushed
+        rms.update(xs[3])
+        assert np.allclose(rms.mean.eval(), ms[0])
+        rms.flush()
+        assert np.allclose([rms.mean.eval(), rms.std.eval()], [x.mean(axis=0), x.std(axis=0)], atol=1e-5)
+
 @U.in_session
 def test_dist():
     np.random.seed(0)
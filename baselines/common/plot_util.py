@@ -1,9 +1,12 @@
 import matplotlib.pyplot as plt
 import os.path as osp
+import hashlib
 import json
 import os
+import re
 import numpy as np
 import pandas
+import scipy.signal
 from collections import defaultdict, namedtuple
 from baselines.bench import monitor
 from baselines.logger import read_json, read_csv
@@ -74,9 +77,30 @@ def one_sided_ema(xolds, yolds, low=None, high=None, n=512, decay_steps=1., low_
     assert len(xolds) == len(yolds), 'length of xolds ({}) and yolds ({}) do not match!'.format(len(xolds), len(yolds))
 
 
-    xolds = xolds.astype('float64')
-    yolds = yolds.astype('float64')
+    xolds = np.asarray(xolds, dtype='float64')
+    yolds = np.asarray(yolds, dtype='float64')
 
+    xnews = np.linspace(low, high, n)
+    decay_period = (high - low) / (n - 1) * decay_steps
+    interstep_decay = np.exp(- 1. / decay_steps)
+    # every old point is added, decayed by its distance to it, at the first new point at or after it
+    inews = np.searchsorted(xnews, xolds, side='left')
+    used = inews < n
+    inews, xolds, yolds = inews[used], xolds[used], yolds[used]
+    decays = np.exp(- (xnews[inews] - xolds) / decay_period)
+    # then decays by interstep_decay at every new point: sum[i] = interstep_decay * sum[i-1] + added[i]
+    decay_filter = ([1.], [1., -interstep_decay])
+    sum_ys = scipy.signal.lfilter(*decay_filter, np.bincount(inews, weights=decays * yolds, minlength=n))
+    count_ys = scipy.signal.lfilter(*decay_filter, np.bincount(inews, weights=decays, minlength=n))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ys = sum_ys / count_ys
+    ys[count_ys < low_counts_threshold] = np.nan
+
+    return xnews, ys, count_ys
+
+def _one_sided_ema_loop(xolds, yolds, low, high, n, decay_steps, low_counts_threshold=1e-8):
+    # the loop one_sided_ema used to run, as a reference for the benchmark
     luoi = 0 # last unused old index
     sum_y = 0.
     count_y = 0.
@@ -149,7 +173,10 @@ def symmetric_ema(xolds, yolds, low=None, high=None, n=512, decay_steps=1., low_
 Result = namedtuple('Result', 'monitor progress dirname metadata')
 Result.__new__.__defaults__ = (None,) * len(Result._fields)
 
-def load_results(root_dir_or_dirs, enable_progress=True, enable_monitor=True, verbose=False):
+_MONITOR_RE = re.compile(r'(\d+\.)?(\d+\.)?monitor\.(csv|bin)')
+
+def load_results(root_dir_or_dirs, enable_progress=True, enable_monitor=True, verbose=False,
+                 columns=None, cache_dir=None, num_workers=None):
     '''
     load summaries of runs from a list of directories (including subdirectories)
     Arguments:
@@ -160,65 +187,213 @@ def load_results(root_dir_or_dirs, enable_progress=True, enable_monitor=True, ve
 
     verbose: bool - if True, will print out list of directories from which the data is loaded. Default: False
 
+    columns: list - if given, only these columns of the progress and monitor data are loaded. Default: None (all columns)
+
+    cache_dir: str - if given, the parsed progress and monitor data of every run is kept in a columnar cache in a
+                     subdirectory of cache_dir, and runs whose files did not change (same sizes and modification times)
+                     are loaded from memory-mapped arrays instead of being parsed again. Default: None (no cache)
+
+    num_workers: int - number of processes parsing the runs that are not in the cache. Default: None (one per cpu)
+
 
     Returns:
     List of Result objects with the following fields:
          - dirname - path to the directory data was loaded from
          - metadata - run metadata (such as command-line arguments and anything else in metadata.json file
-         - monitor - if enable_monitor is True, this field contains pandas dataframe with loaded monitor.csv file (or aggregate of all *.monitor.csv files in the directory)
+         - monitor - if enable_monitor is True, this field contains pandas dataframe with loaded monitor.csv file (or aggregate of all *.monitor.csv files in the directory),
+                     with the monitor file headers in its headers attribute
          - progress - if enable_progress is True, this field contains pandas dataframe with loaded progress.csv file
     '''
-    import re
     if isinstance(root_dir_or_dirs, str):
         rootdirs = [osp.expanduser(root_dir_or_dirs)]
     else:
         rootdirs = [osp.expanduser(d) for d in root_dir_or_dirs]
-    allresults = []
+    if cache_dir is not None:
+        cache_dir = osp.abspath(osp.expanduser(cache_dir))
+    runs = []
     for rootdir in rootdirs:
         assert osp.exists(rootdir), "%s doesn't exist"%rootdir
         for dirname, dirs, files in os.walk(rootdir):
             if '-proc' in dirname:
                 files[:] = []
                 continue
-            monitor_re = re.compile(r'(\d+\.)?(\d+\.)?monitor\.csv')
+            if cache_dir is not None:
+                dirs[:] = [d for d in dirs if osp.abspath(osp.join(dirname, d)) != cache_dir]
             if set(['metadata.json', 'monitor.json', 'progress.json', 'progress.csv']).intersection(files) or \
-               any([f for f in files if monitor_re.match(f)]):  # also match monitor files like 0.1.monitor.csv
+               any([f for f in files if _MONITOR_RE.match(f)]):  # also match monitor files like 0.1.monitor.csv
                 # used to be uncommented, which means do not go deeper than current directory if any of the data files
                 # are found
                 # dirs[:] = []
-                result = {'dirname' : dirname}
-                if "metadata.json" in files:
-                    with open(osp.join(dirname, "metadata.json"), "r") as fh:
-                        result['metadata'] = json.load(fh)
-                progjson = osp.join(dirname, "progress.json")
-                progcsv = osp.join(dirname, "progress.csv")
-                if enable_progress:
-                    if osp.exists(progjson):
-                        result['progress'] = pandas.DataFrame(read_json(progjson))
-                    elif osp.exists(progcsv):
-                        try:
-                            result['progress'] = read_csv(progcsv)
-                        except pandas.errors.EmptyDataError:
-                            print('skipping progress file in ', dirname, 'empty data')
-                    else:
-                        if verbose: print('skipping %s: no progress file'%dirname)
-
-                if enable_monitor:
-                    try:
-                        result['monitor'] = pandas.DataFrame(monitor.load_results(dirname))
-                    except monitor.LoadMonitorResultsError:
-                        print('skipping %s: no monitor files'%dirname)
-                    except Exception as e:
-                        print('exception loading monitor file in %s: %s'%(dirname, e))
-
-                if result.get('monitor') is not None or result.get('progress') is not None:
-                    allresults.append(Result(**result))
-                    if verbose:
-                        print('successfully loaded %s'%dirname)
+                runs.append((dirname, sorted(files)))
+
+    load_args = (enable_progress, enable_monitor, verbose, columns, cache_dir)
+    stale = [run for run in runs if not (cache_dir and _cache_is_fresh(*run, enable_progress, enable_monitor, cache_dir))]
+    parsed = {}
+    if len(stale) > 1 and num_workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            futures = [pool.submit(_load_run, dirname, files, *load_args) for dirname, files in stale]
+            parsed = {dirname: future.result() for (dirname, _), future in zip(stale, futures)}
+
+    allresults = []
+    for dirname, files in runs:
+        result = parsed[dirname] if dirname in parsed else _load_run(dirname, files, *load_args)
+        if result is not None:
+            # the headers attribute does not survive pickling the frame in a worker
+            headers = result.pop('monitor_headers', None)
+            if headers is not None:
+                result['monitor'].headers = headers
+            allresults.append(Result(**result))
+            if verbose:
+                print('successfully loaded %s'%dirname)
 
     if verbose: print('loaded %i results'%len(allresults))
     return allresults
 
+def _load_run(dirname, files, enable_progress, enable_monitor, verbose, columns, cache_dir):
+    result = {'dirname' : dirname}
+    if "metadata.json" in files:
+        with open(osp.join(dirname, "metadata.json"), "r") as fh:
+            result['metadata'] = json.load(fh)
+    if enable_progress:
+        progress_files = _progress_files(files)
+        if progress_files:
+            try:
+                result['progress'] = _load_frame(dirname, 'progress', progress_files, _read_progress, columns, cache_dir)
+            except pandas.errors.EmptyDataError:
+                print('skipping progress file in ', dirname, 'empty data')
+        else:
+            if verbose: print('skipping %s: no progress file'%dirname)
+
+    if enable_monitor:
+        try:
+            result['monitor'] = _load_frame(dirname, 'monitor', _monitor_files(files),
+                                            monitor.load_results, columns, cache_dir)
+            result['monitor_headers'] = getattr(result['monitor'], 'headers', None)
+        except monitor.LoadMonitorResultsError:
+            print('skipping %s: no monitor files'%dirname)
+        except Exception as e:
+            print('exception loading monitor file in %s: %s'%(dirname, e))
+
+    if result.get('monitor') is not None or result.get('progress') is not None:
+        return result
+    return None
+
+def _progress_files(files):
+    if 'progress.json' in files:
+        return ['progress.json']
+    if 'progress.csv' in files:
+        # including the segments progress.csv.1, progress.csv.2, ... that read_csv appends
+        return ['progress.csv'] + [f for f in files if f.startswith('progress.csv.') and f[len('progress.csv.'):].isdigit()]
+    return []
+
+def _read_progress(dirname):
+    if osp.exists(osp.join(dirname, 'progress.json')):
+        return pandas.DataFrame(read_json(osp.join(dirname, 'progress.json')))
+    return read_csv(osp.join(dirname, 'progress.csv'))
+
+def _monitor_files(files):
+    return [f for f in files if f.endswith('monitor.json') or f.endswith('monitor.csv') or f.endswith(monitor.Monitor.BIN_EXT)]
+
+# ================================================================
+# Columnar cache of the parsed files of a run
+# ================================================================
+
+def _sources_key(dirname, fnames):
+    key = []
+    for fname in fnames:
+        st = os.stat(osp.join(dirname, fname))
+        key.append([fname, st.st_size, st.st_mtime_ns])
+    return key
+
+def _run_cache_dir(dirname, cache_dir):
+    return osp.join(cache_dir, hashlib.sha1(osp.abspath(dirname).encode()).hexdigest())
+
+def _cache_meta(cachedir, kind):
+    try:
+        with open(osp.join(cachedir, kind + '.index.json'), 'rt') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+def _cache_is_fresh(dirname, files, enable_progress, enable_monitor, cache_dir):
+    kinds = []
+    if enable_progress and _progress_files(files):
+        kinds.append(('progress', _progress_files(files)))
+    if enable_monitor and _monitor_files(files):
+        kinds.append(('monitor', _monitor_files(files)))
+    for kind, fnames in kinds:
+        meta = _cache_meta(_run_cache_dir(dirname, cache_dir), kind)
+        if meta is None or meta['key'] != _sources_key(dirname, fnames):
+            return False
+    return True
+
+def _load_frame(dirname, kind, fnames, read_fn, columns, cache_dir):
+    """The parsed files of a run, from the cache if they did not change since they were cached."""
+    if cache_dir:
+        cachedir = _run_cache_dir(dirname, cache_dir)
+        key = _sources_key(dirname, fnames)
+        meta = _cache_meta(cachedir, kind)
+        if meta is not None and meta['key'] == key:
+            df = pandas.DataFrame({column: _load_column(osp.join(cachedir, fname))
+                                   for column, fname in meta['columns'] if columns is None or column in columns},
+                                  copy=False)
+            if 'headers' in meta:
+                df.headers = meta['headers']
+            return df
+    df = read_fn(dirname)
+    if cache_dir:
+        try:
+            _write_cache(cachedir, kind, key, df)
+        except (OSError, TypeError, ValueError) as e:
+            print('could not cache %s of %s: %s'%(kind, dirname, e))
+    if columns is not None:
+        headers = getattr(df, 'headers', None)
+        df = df[[column for column in df.columns if column in columns]]
+        if headers is not None:
+            df.headers = headers
+    return df
+
+def _load_column(path):
+    if path.endswith('.json'):
+        with open(path, 'rt') as fh:
+            return np.array(json.load(fh), dtype=object)
+    try:
+        # copy on write, so that the frames can be modified as parsed ones
+        return np.load(path, mmap_mode='c')
+    except ValueError:
+        # empty arrays cannot be memory-mapped
+        return np.load(path)
+
+def _write_cache(cachedir, kind, key, df):
+    os.makedirs(cachedir, exist_ok=True)
+    old = _cache_meta(cachedir, kind)
+    # new column files get new names, so the old ones stay valid until the index is replaced
+    prefix = '%s.%i.'%(kind, (old or {}).get('version', 0) + 1)
+    meta = {'key': key, 'version': (old or {}).get('version', 0) + 1, 'columns': []}
+    if hasattr(df, 'headers'):
+        meta['headers'] = df.headers
+    for i, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            # as json rather than pickled, the values have to be strings, numbers or None
+            fname = prefix + '%i.json'%i
+            with open(osp.join(cachedir, fname), 'wt') as fh:
+                json.dump(values.tolist(), fh)
+        else:
+            fname = prefix + '%i.npy'%i
+            np.save(osp.join(cachedir, fname), values, allow_pickle=False)
+        meta['columns'].append([column, fname])
+    tmp = osp.join(cachedir, '%s.index.json.tmp%i'%(kind, os.getpid()))
+    with open(tmp, 'wt') as fh:
+        json.dump(meta, fh)
+    os.replace(tmp, osp.join(cachedir, kind + '.index.json'))
+    for _, fname in (old or {}).get('columns', []):
+        try:
+            os.remove(osp.join(cachedir, fname))
+        except OSError:
+            pass
+
 COLORS = ['blue', 'green', 'red', 'cyan', 'magenta', 'yellow', 'black', 'purple', 'pink',
         'brown', 'orange', 'teal',  'lightblue', 'lime', 'lavender', 'turquoise',
         'darkgreen', 'tan', 'salmon', 'gold',  'darkred', 'darkblue']
@@ -432,3 +607,15 @@ def test_smooth():
     plt.show()
 
 
+if __name__ == '__main__':
+    import timeit
+    rng = np.random.RandomState(0)
+    for nold, nnew in [(10000, 512), (1000000, 512)]:
+        xolds = np.cumsum(rng.rand(nold))
+        yolds = np.sin(xolds / 100.) + rng.randn(nold)
+        args = (xolds, yolds, xolds[0], xolds[-1], nnew, 10.)
+        number = 1 if nold > 100000 else 5
+        times = [min(timeit.repeat(lambda: fn(*args), number=number, repeat=3)) / number
+                 for fn in (_one_sided_ema_loop, one_sided_ema)]
+        print('%i points -> %i: loop %.1f ms, vectorized %.1f ms, speedup %.0fx' % (
+            nold, nnew, times[0] * 1e3, times[1] * 1e3, times[0] / times[1]))
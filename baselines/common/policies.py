@@ -3,7 +3,7 @@ from baselines.common import tf_util
 from baselines.a2c.utils import fc
 from baselines.common.distributions import make_pdtype
 from baselines.common.input import observation_placeholder, encode_observation
-from baselines.common.tf_util import adjust_shape
+from baselines.common.tf_util import make_shape_adjuster
 from baselines.common.mpi_running_mean_std import RunningMeanStd
 from baselines.common.models import get_network_builder
 
@@ -64,14 +64,18 @@ class PolicyWithValue(object):
             self.vf = fc(vf_latent, 'vf', 1)
             self.vf = self.vf[:,0]
 
+        # placeholders that can be fed through the extra_feed of step and value
+        self._placeholders = {name: inpt for name, inpt in self.__dict__.items()
+                              if isinstance(inpt, tf.Tensor) and inpt.op.type == 'Placeholder' and inpt is not self.X}
+        self._adjusters = {inpt: make_shape_adjuster(inpt) for inpt in [self.X] + list(self._placeholders.values())}
+
     def _evaluate(self, variables, observation, **extra_feed):
         sess = self.sess
-        feed_dict = {self.X: adjust_shape(self.X, observation)}
+        feed_dict = {self.X: self._adjusters[self.X](observation)}
         for inpt_name, data in extra_feed.items():
-            if inpt_name in self.__dict__.keys():
-                inpt = self.__dict__[inpt_name]
-                if isinstance(inpt, tf.Tensor) and inpt._op.type == 'Placeholder':
-                    feed_dict[inpt] = adjust_shape(inpt, data)
+            if inpt_name in self._placeholders:
+                inpt = self._placeholders[inpt_name]
+                feed_dict[inpt] = self._adjusters[inpt](data)
 
         return sess.run(variables, feed_dict)
 
@@ -17,3 +17,39 @@ class AbstractEnvRunner(ABC):
     def run(self):
         raise NotImplementedError
 
+
+class AbstractAsyncEnvRunner(AbstractEnvRunner):
+    """
+    Runner for an AsyncVecEnv. Instead of stepping all envs in lockstep, every env is
+    sent its next action as soon as it reports back (batch_size envs at a time) until it
+    has taken nsteps steps, so a slow env only delays its own part of the rollout.
+    """
+    def __init__(self, *, env, model, nsteps, batch_size):
+        super().__init__(env=env, model=model, nsteps=nsteps)
+        assert self.states is None, 'recurrent policies are not supported by asynchronous runners'
+        self.batch_size = batch_size
+        self.dones = np.zeros(self.nenv, dtype=np.bool_)
+
+    def rollout(self, act, observe):
+        """
+        Step every env nsteps times.
+
+        act(env_ids, t) returns the actions for the envs env_ids, whose current
+        observations in self.obs have not been acted on yet; t holds the index of
+        the step each of them is at.
+        observe(env_ids, t, rewards, dones, infos) is called when envs report back,
+        after self.obs and self.dones have been updated.
+        """
+        t = np.zeros(self.nenv, dtype=np.int64)
+        env_ids = np.arange(self.nenv)
+        while True:
+            env_ids = env_ids[t[env_ids] < self.nsteps]
+            if len(env_ids):
+                self.env.step_async(act(env_ids, t[env_ids]), env_ids)
+            if self.env.num_pending == 0:
+                break
+            obs, rewards, dones, infos, env_ids = self.env.step_wait_partial(self.batch_size)
+            self.obs[env_ids] = obs
+            self.dones[env_ids] = dones
+            observe(env_ids, t[env_ids], rewards, dones, infos)
+            t[env_ids] += 1
@@ -4,21 +4,77 @@ from baselines.common.tf_util import get_session
 
 class RunningMeanStd(object):
     # https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm
-    def __init__(self, epsilon=1e-4, shape=()):
+    """
+    With an MPI communicator comm, the batches of all its workers are merged, so that
+    they keep identical statistics. sync_every sets how many update() calls are
+    accumulated locally between these reductions (see MomentsSync).
+    """
+    def __init__(self, epsilon=1e-4, shape=(), comm=None, sync_every=1):
         self.mean = np.zeros(shape, 'float64')
         self.var = np.ones(shape, 'float64')
         self.count = epsilon
+        self.sync = MomentsSync(shape, comm, sync_every)
 
     def update(self, x):
-        batch_mean = np.mean(x, axis=0)
-        batch_var = np.var(x, axis=0)
-        batch_count = x.shape[0]
-        self.update_from_moments(batch_mean, batch_var, batch_count)
+        if self.sync.add(x, self.mean):
+            self.flush()
+
+    def flush(self):
+        """Merges the batches accumulated since the last reduction into the statistics."""
+        if self.sync.pending:
+            self.update_from_moments(*self.sync.reduce(self.mean))
 
     def update_from_moments(self, batch_mean, batch_var, batch_count):
         self.mean, self.var, self.count = update_mean_var_count_from_moments(
             self.mean, self.var, self.count, batch_mean, batch_var, batch_count)
 
+    def set_moments(self, mean, var, count):
+        self.mean, self.var, self.count = np.asarray(mean, 'float64'), np.asarray(var, 'float64'), count
+
+class MomentsSync(object):
+    """
+    Moments of the batches added since the last reduce(), merged over the workers of comm.
+
+    The count, sum and sum of squares of the batches are accumulated in one float64
+    vector, which reduce() sums over the workers with a single Allreduce, every
+    sync_every batches. The sums are taken relative to shift, the running mean the
+    moments are going to be merged into: it is identical on all workers and constant
+    until the reduction, and keeps the sum of squares from cancelling out.
+    """
+    def __init__(self, shape=(), comm=None, sync_every=1):
+        self.shape = shape
+        self.comm = comm if comm is not None and comm.Get_size() > 1 else None
+        self.sync_every = sync_every
+        self._n = int(np.prod(shape))
+        self._sums = np.zeros(2 * self._n + 1, 'float64')
+        self.pending = 0
+
+    def add(self, x, shift):
+        """Adds the batch x, returns whether the moments are due to be reduced."""
+        x = np.asarray(x, 'float64').reshape(-1, self._n) - np.reshape(shift, self._n)
+        n = self._n
+        self._sums[0] += len(x)
+        self._sums[1:n+1] += x.sum(axis=0)
+        self._sums[n+1:] += np.einsum('ij,ij->j', x, x)
+        self.pending += 1
+        return self.pending >= self.sync_every
+
+    def reduce(self, shift):
+        """Mean, variance and count of the batches added on all workers since the last call."""
+        if self.comm is not None:
+            from mpi4py import MPI
+            sums = np.empty_like(self._sums)
+            self.comm.Allreduce(self._sums, sums, op=MPI.SUM)
+        else:
+            sums = self._sums.copy()
+        n = self._n
+        count = sums[0]
+        shifted_mean = sums[1:n+1] / count
+        var = np.maximum(sums[n+1:] / count - np.square(shifted_mean), 0)
+        self._sums[:] = 0
+        self.pending = 0
+        return (np.reshape(shift, n) + shifted_mean).reshape(self.shape), var.reshape(self.shape), count
+
 def update_mean_var_count_from_moments(mean, var, count, batch_mean, batch_var, batch_count):
     delta = batch_mean - mean
     tot_count = count + batch_count
@@ -39,8 +95,9 @@ class TfRunningMeanStd(object):
     TensorFlow variables-based implmentation of computing running mean and std
     Benefit of this implementation is that it can be saved / loaded together with the tensorflow model
     '''
-    def __init__(self, epsilon=1e-4, shape=(), scope=''):
+    def __init__(self, epsilon=1e-4, shape=(), scope='', comm=None, sync_every=1):
         sess = get_session()
+        self.sync = MomentsSync(shape, comm, sync_every)
 
         self._new_mean = tf.placeholder(shape=shape, dtype=tf.float64)
         self._new_var = tf.placeholder(shape=shape, dtype=tf.float64)
@@ -66,16 +123,23 @@ class TfRunningMeanStd(object):
         self.mean, self.var, self.count = self.sess.run([self._mean, self._var, self._count])
 
     def update(self, x):
-        batch_mean = np.mean(x, axis=0)
-        batch_var = np.var(x, axis=0)
-        batch_count = x.shape[0]
+        if self.sync.add(x, self.mean):
+            self.flush()
+
+    def flush(self):
+        """Merges the batches accumulated since the last reduction into the statistics."""
+        if not self.sync.pending:
+            return
+        batch_mean, batch_var, batch_count = self.sync.reduce(self.mean)
 
         new_mean, new_var, new_count = update_mean_var_count_from_moments(self.mean, self.var, self.count, batch_mean, batch_var, batch_count)
+        self.set_moments(new_mean, new_var, new_count)
 
+    def set_moments(self, mean, var, count):
         self.sess.run(self.update_ops, feed_dict={
-            self._new_mean: new_mean,
-            self._new_var: new_var,
-            self._new_count: new_count
+            self._new_mean: mean,
+            self._new_var: var,
+            self._new_count: count
         })
 
         self._set_mean_var_count()
@@ -99,6 +163,18 @@ def test_runningmeanstd():
 
         np.testing.assert_allclose(ms1, ms2)
 
+def test_runningmeanstd_sync_every():
+    x = np.random.randn(10, 3) * 5 + 100
+    rms = RunningMeanStd(epsilon=0.0, shape=(3,), sync_every=4)
+    for i in range(3):
+        rms.update(x[i:i+1])
+    np.testing.assert_allclose(rms.mean, 0)
+    rms.update(x[3:6])
+    np.testing.assert_allclose([rms.mean, rms.var], [x[:6].mean(axis=0), x[:6].var(axis=0)])
+    rms.update(x[6:])
+    rms.flush()
+    np.testing.assert_allclose([rms.mean, rms.var], [x.mean(axis=0), x.var(axis=0)])
+
 def test_tf_runningmeanstd():
     for (x1, x2, x3) in [
         (np.random.randn(3), np.random.randn(4), np.random.randn(5)),
@@ -1,4 +1,4 @@
-import operator
+import numpy as np
 
 
 class SegmentTree(object):
@@ -11,7 +11,9 @@ class SegmentTree(object):
         important differences:
 
             a) setting item's value is slightly slower.
-               It is O(lg capacity) instead of O(1).
+               It is O(lg capacity) instead of O(1). Setting an array of
+               indices updates the tree level by level in O(lg capacity)
+               vectorized operations.
             b) user has access to an efficient ( O(log segment size) )
                `reduce` operation which reduces `operation` over
                a contiguous subsequence of items in the array.
@@ -21,7 +23,9 @@ class SegmentTree(object):
         capacity: int
             Total size of the array - must be a power of two.
         operation: lambda obj, obj -> obj
-            and operation for combining elements (eg. sum, max)
+            and operation for combining elements (eg. sum, max).
+            It has to work elementwise on arrays (eg. np.add, np.minimum)
+            so that batched updates can reduce a whole tree level at once
             must form a mathematical group together with the set of
             possible values for array elements (i.e. be associative)
         neutral_element: obj
@@ -30,23 +34,9 @@ class SegmentTree(object):
         """
         assert capacity > 0 and capacity & (capacity - 1) == 0, "capacity must be positive and a power of 2."
         self._capacity = capacity
-        self._value = [neutral_element for _ in range(2 * capacity)]
+        self._value = np.full(2 * capacity, neutral_element, dtype=np.float64)
         self._operation = operation
-
-    def _reduce_helper(self, start, end, node, node_start, node_end):
-        if start == node_start and end == node_end:
-            return self._value[node]
-        mid = (node_start + node_end) // 2
-        if end <= mid:
-            return self._reduce_helper(start, end, 2 * node, node_start, mid)
-        else:
-            if mid + 1 <= start:
-                return self._reduce_helper(start, end, 2 * node + 1, mid + 1, node_end)
-            else:
-                return self._operation(
-                    self._reduce_helper(start, mid, 2 * node, node_start, mid),
-                    self._reduce_helper(mid + 1, end, 2 * node + 1, mid + 1, node_end)
-                )
+        self._neutral_element = neutral_element
 
     def reduce(self, start=0, end=None):
         """Returns result of applying `self.operation`
@@ -70,23 +60,50 @@ class SegmentTree(object):
             end = self._capacity
         if end < 0:
             end += self._capacity
-        end -= 1
-        return self._reduce_helper(start, end, 1, 0, self._capacity - 1)
+        # walk up from the leaves of the half-open range [start, end)
+        result = self._neutral_element
+        start += self._capacity
+        end += self._capacity
+        while start < end:
+            if start & 1:
+                result = self._operation(result, self._value[start])
+                start += 1
+            if end & 1:
+                end -= 1
+                result = self._operation(result, self._value[end])
+            start //= 2
+            end //= 2
+        return result
 
     def __setitem__(self, idx, val):
-        # index of the leaf
-        idx += self._capacity
+        if np.ndim(idx) == 0:
+            # index of the leaf
+            idx += self._capacity
+            self._value[idx] = val
+            idx //= 2
+            while idx >= 1:
+                self._value[idx] = self._operation(
+                    self._value[2 * idx],
+                    self._value[2 * idx + 1]
+                )
+                idx //= 2
+            return
+        # batched update: all touched nodes of one level are recomputed at once
+        idx = np.asarray(idx) + self._capacity
+        if idx.size == 0:
+            return
         self._value[idx] = val
-        idx //= 2
-        while idx >= 1:
+        idx = np.unique(idx // 2)
+        while idx[-1] >= 1:
             self._value[idx] = self._operation(
                 self._value[2 * idx],
                 self._value[2 * idx + 1]
             )
-            idx //= 2
+            idx = np.unique(idx // 2)
 
     def __getitem__(self, idx):
-        assert 0 <= idx < self._capacity
+        idx = np.asarray(idx)
+        assert np.all(0 <= idx) and np.all(idx < self._capacity)
         return self._value[self._capacity + idx]
 
 
@@ -94,7 +111,7 @@ class SumSegmentTree(SegmentTree):
     def __init__(self, capacity):
         super(SumSegmentTree, self).__init__(
             capacity=capacity,
-            operation=operator.add,
+            operation=np.add,
             neutral_element=0.0
         )
 
@@ -112,30 +129,33 @@ class SumSegmentTree(SegmentTree):
 
         Parameters
         ----------
-        perfixsum: float
-            upperbound on the sum of array prefix
+        perfixsum: float or np.array
+            upperbound on the sum of array prefix. If an array is given,
+            all the lookups descend the tree together.
 
         Returns
         -------
-        idx: int
+        idx: int or np.array
             highest index satisfying the prefixsum constraint
         """
-        assert 0 <= prefixsum <= self.sum() + 1e-5
-        idx = 1
-        while idx < self._capacity:  # while non-leaf
-            if self._value[2 * idx] > prefixsum:
-                idx = 2 * idx
-            else:
-                prefixsum -= self._value[2 * idx]
-                idx = 2 * idx + 1
-        return idx - self._capacity
+        scalar = np.ndim(prefixsum) == 0
+        prefixsum = np.array(prefixsum, dtype=np.float64, ndmin=1)
+        assert np.all(0 <= prefixsum) and np.all(prefixsum <= self.sum() + 1e-5)
+        idx = np.ones(len(prefixsum), dtype=np.int64)
+        while idx[0] < self._capacity:  # while non-leaf
+            left = self._value[2 * idx]
+            go_right = left <= prefixsum
+            prefixsum -= np.where(go_right, left, 0.)
+            idx = 2 * idx + go_right
+        idx -= self._capacity
+        return int(idx[0]) if scalar else idx
 
 
 class MinSegmentTree(SegmentTree):
     def __init__(self, capacity):
         super(MinSegmentTree, self).__init__(
             capacity=capacity,
-            operation=min,
+            operation=np.minimum,
             neutral_element=float('inf')
         )
 
@@ -0,0 +1,105 @@
+"""
+Segment generation on a VecEnv for the algorithms that sample fixed-length segments
+of experience (trpo_mpi, ppo1, gail).
+
+The segments hold the same keys as the single env traj_segment_generators of these
+algorithms, but every per-step array is laid out as (nsteps, nenvs, ...), so that one
+process steps all the envs of a SubprocVecEnv / ShmemVecEnv with batched policy
+evaluations. The arrays stay time first for add_vtarg_and_adv, which then flattens
+them with flatten_segment into the single batch the optimizers expect.
+"""
+import numpy as np
+
+from baselines.common.advantage import episode_sums
+
+
+def vec_traj_segment_generator(act, venv, horizon, reward_giver=None):
+    """
+    Yields segments of horizon steps in total, horizon // venv.num_envs per env.
+
+    act: function from a batch of observations to (actions, value predictions)
+    reward_giver: GAIL discriminator; if given, "rew" holds its rewards, which are
+        evaluated for the whole segment at once, the env rewards only go into the
+        "ep_true_rets" episode returns
+    """
+    nenvs = venv.num_envs
+    assert horizon % nenvs == 0, 'horizon {} is not a multiple of the number of envs {}'.format(horizon, nenvs)
+    nsteps = horizon // nenvs
+
+    ac = np.array([venv.action_space.sample() for _ in range(nenvs)])
+    new = np.ones(nenvs, dtype=np.bool_)
+    ob = venv.reset()
+
+    cur_ep_ret = np.zeros(nenvs)
+    cur_ep_len = np.zeros(nenvs, dtype=np.int64)
+    cur_ep_disc_ret = np.zeros(nenvs)
+    ep_rets = []
+    ep_lens = []
+
+    obs = np.zeros((nsteps,) + ob.shape, dtype=ob.dtype)
+    rews = np.zeros((nsteps, nenvs), 'float32')
+    vpreds = np.zeros((nsteps, nenvs), 'float32')
+    news = np.zeros((nsteps, nenvs), 'int32')
+    acs = np.zeros((nsteps,) + ac.shape, dtype=ac.dtype)
+    prevacs = acs.copy()
+
+    t = 0
+    while True:
+        prevac = ac
+        ac, vpred = act(ob)
+        if t > 0 and t % nsteps == 0:
+            seg = {"ob": obs, "rew": rews, "vpred": vpreds, "new": news,
+                   "ac": acs, "prevac": prevacs, "nextvpred": vpred * (1 - new),
+                   "ep_rets": ep_rets, "ep_lens": ep_lens}
+            if reward_giver is not None:
+                rews[:] = np.reshape(reward_giver.get_reward(obs.reshape((horizon,) + ob.shape[1:]),
+                                                             acs.reshape(horizon, -1)), (nsteps, nenvs))
+                dones = np.concatenate([news[1:], new[None]])
+                disc_rets = []
+                for e in range(nenvs):
+                    sums, cur_ep_disc_ret[e] = episode_sums(rews[:, e], dones[:, e], cur_ep_disc_ret[e])
+                    disc_rets.extend(sums)
+                seg.update(ep_rets=disc_rets, ep_true_rets=ep_rets)
+            yield seg
+            # the value function was trained on the segment
+            _, vpred = act(ob)
+            # Be careful!!! if you change the downstream algorithm to aggregate
+            # several of these batches, then be sure to do a deepcopy
+            ep_rets = []
+            ep_lens = []
+        i = t % nsteps
+        obs[i] = ob
+        vpreds[i] = vpred
+        news[i] = new
+        acs[i] = ac
+        prevacs[i] = prevac
+
+        # the envs reset themselves at the end of an episode
+        ob, rew, new, _ = venv.step(ac)
+        new = np.asarray(new, dtype=np.bool_)
+        if reward_giver is None:
+            rews[i] = rew
+
+        cur_ep_ret += rew
+        cur_ep_len += 1
+        if new.any():
+            ep_rets.extend(cur_ep_ret[new])
+            ep_lens.extend(cur_ep_len[new])
+            cur_ep_ret[new] = 0
+            cur_ep_len[new] = 0
+        t += 1
+
+
+def flatten_segment(seg):
+    """
+    Reshapes the per-step arrays of a segment from vec_traj_segment_generator to
+    (nsteps * nenvs, ...) in place, env by env so that trajectories stay contiguous.
+    Segments of a single env are left as they are.
+    """
+    shape = np.shape(seg["new"])
+    if len(shape) < 2:
+        return seg
+    for key, value in seg.items():
+        if isinstance(value, np.ndarray) and value.shape[:2] == shape:
+            seg[key] = value.swapaxes(0, 1).reshape((-1,) + value.shape[2:])
+    return seg
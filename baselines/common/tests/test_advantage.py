@@ -0,0 +1,60 @@
+import numpy as np
+
+from baselines.common.advantage import discounted_sum, discounted_returns, episode_sums, gae, _gae_loop
+
+
+def test_discounted_sum_restarts():
+    gamma = 0.9
+    x = np.array([1.0, 2.0, 3.0, 4.0])
+    nonterminal = np.array([1.0, 1.0, 0.0, 1.0])
+    assert np.allclose(discounted_sum(x, gamma, nonterminal), [
+        1 + gamma * 2 + gamma**2 * 3,
+        2 + gamma * 3,
+        3,
+        4
+    ])
+
+
+def test_gae_matches_loop():
+    rng = np.random.RandomState(0)
+    for shape in [(100,), (100, 7)]:
+        rewards = rng.randn(*shape).astype(np.float32)
+        values = rng.randn(*shape).astype(np.float32)
+        news = rng.rand(*shape) < 0.1
+        last_values = np.asarray(rng.randn(*shape[1:]), dtype=np.float32)
+        last_news = np.asarray(rng.rand(*shape[1:]) < 0.5)
+        for lam in [0.0, 0.95, 1.0]:
+            expected = _gae_loop(rewards, values, news, last_values, last_news, 0.99, lam)
+            actual = gae(rewards, values, news, last_values, last_news, 0.99, lam)
+            assert actual.dtype == np.float32 and actual.shape == shape
+            assert np.allclose(actual, expected, atol=1e-5)
+        # with lambda = 1 the TD(lambda) returns are the discounted returns
+        returns = discounted_returns(rewards, news, last_values, last_news, 0.99)
+        assert np.allclose(returns, expected + values, atol=1e-5)
+
+
+def test_truncation_bootstraps_from_final_value():
+    rewards = np.ones(4)
+    news = np.array([0, 0, 1, 0])
+    truncated = np.array([0, 1, 0, 0])
+    returns = discounted_returns(rewards, news, 0., 0, 0.5, truncated=truncated, truncated_values=10.)
+    assert np.allclose(returns, [1 + 0.5 * (1 + 0.5 * 10), 1 + 0.5 * 10, 1.5, 1])
+    advs = gae(rewards, np.zeros(4), news, 0., 0, 0.5, 1.0, truncated=truncated, truncated_values=10.)
+    assert np.allclose(advs, returns)
+
+
+def test_episode_sums():
+    rng = np.random.RandomState(0)
+    x = rng.randn(50)
+    dones = rng.rand(50) < 0.2
+    sums, carry = episode_sums(x, dones, carry=1.5)
+    expected, ret = [], 1.5
+    for r, done in zip(x, dones):
+        ret += r
+        if done:
+            expected.append(ret)
+            ret = 0.
+    np.testing.assert_allclose(sums, expected)
+    np.testing.assert_allclose(carry, ret)
+    sums, carry = episode_sums(x[:3], np.zeros(3, bool), carry=1.)
+    assert len(sums) == 0 and np.isclose(carry, 1. + x[:3].sum())
@@ -0,0 +1,55 @@
+import os
+
+import numpy as np
+
+from baselines.common import checkpoint
+
+
+def _arrays_dir_files(dirname):
+    return sorted(os.listdir(os.path.join(dirname, checkpoint.ARRAYS_DIR)))
+
+
+def test_checkpoint_roundtrip(tmpdir):
+    arrays = {'pi/w:0': np.random.randn(3, 4).astype(np.float32),
+              'pi/b:0': np.zeros(4, np.float32),
+              'step:0': np.array(7, np.int64),
+              'empty:0': np.zeros((0, 2))}
+    path = str(tmpdir.join('00001'))
+    checkpoint.save_arrays(path, arrays)
+    loaded = checkpoint.load_arrays(path)
+
+    assert checkpoint.is_checkpoint(path)
+    assert sorted(loaded) == sorted(arrays)
+    for name, value in arrays.items():
+        assert loaded[name].dtype == value.dtype
+        np.testing.assert_array_equal(loaded[name], value)
+    assert isinstance(loaded['pi/w:0'], np.memmap)
+
+
+def test_checkpoint_skips_unchanged_arrays(tmpdir):
+    dirname = str(tmpdir)
+    target = np.random.randn(100).astype(np.float32)
+    checkpoint.save_arrays(os.path.join(dirname, '00001'), {'target:0': target, 'w:0': np.ones(3)}, blocking=False)
+    checkpoint.wait()
+    target_file = os.path.join(dirname, checkpoint.ARRAYS_DIR, checkpoint.array_hash(target) + '.npy')
+    mtime = os.stat(target_file).st_mtime_ns
+
+    checkpoint.save_arrays(os.path.join(dirname, '00002'), {'target:0': target, 'w:0': np.full(3, 2.)}, blocking=False)
+    checkpoint.wait()
+    assert os.stat(target_file).st_mtime_ns == mtime
+    assert len(_arrays_dir_files(dirname)) == 3
+
+
+def test_checkpoint_overwrite_removes_unreferenced_arrays(tmpdir):
+    dirname = str(tmpdir)
+    shared = np.arange(5.)
+    checkpoint.save_arrays(os.path.join(dirname, 'other'), {'a:0': shared})
+    best = os.path.join(dirname, 'best')
+    for i in range(4):
+        checkpoint.save_arrays(best, {'a:0': shared, 'b:0': np.full(2, float(i))}, blocking=False)
+    checkpoint.wait()
+
+    assert len(_arrays_dir_files(dirname)) == 2
+    np.testing.assert_array_equal(checkpoint.load_arrays(best)['b:0'], [3., 3.])
+    np.testing.assert_array_equal(checkpoint.load_arrays(os.path.join(dirname, 'other'))['a:0'], shared)
+    assert not checkpoint.is_checkpoint(os.path.join(dirname, checkpoint.ARRAYS_DIR, _arrays_dir_files(dirname)[0]))
@@ -0,0 +1,70 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from baselines import logger
+
+
+def test_async_output_format(tmpdir):
+    # a flush interval longer than the test, so only close() writes the records out
+    path = str(tmpdir.join('progress.json'))
+    fmt = logger.AsyncOutputFormat(logger.JSONOutputFormat(path), flush_interval=60.)
+    for i in range(100):
+        fmt.writekvs({'i': i, 'x': i / 2})
+    fmt.close()
+    df = logger.read_json(path)
+    np.testing.assert_array_equal(df['i'], np.arange(100))
+    np.testing.assert_array_equal(df['x'], np.arange(100) / 2)
+
+
+@pytest.mark.parametrize('segmented', (False, True))
+def test_csv_new_keys(tmpdir, segmented):
+    path = str(tmpdir.join('progress.csv'))
+    fmt = logger.AsyncOutputFormat(logger.CSVOutputFormat(path, segmented=segmented), flush_interval=60.)
+    for i in range(9):
+        kvs = {'a': i}
+        if i >= 3:
+            kvs['b'] = 10 * i
+        if i >= 6:
+            kvs['c'] = 100 * i
+        fmt.writekvs(kvs)
+    fmt.close()
+    assert os.path.exists(path + '.2') == segmented
+    df = logger.read_csv(path)
+    assert list(df.columns) == ['a', 'b', 'c']
+    np.testing.assert_array_equal(df['a'], np.arange(9))
+    np.testing.assert_array_equal(df['b'], [np.nan] * 3 + [10 * i for i in range(3, 9)])
+    np.testing.assert_array_equal(df['c'], [np.nan] * 6 + [100 * i for i in range(6, 9)])
+
+
+def test_csv_rerun_drops_segments(tmpdir):
+    # a second run into the same file does not read the segments of the first one
+    path = str(tmpdir.join('progress.csv'))
+    fmt = logger.CSVOutputFormat(path, segmented=True)
+    fmt.writekvs({'a': 0})
+    fmt.writekvs({'a': 1, 'b': 2})
+    fmt.close()
+    assert os.path.exists(path + '.1')
+    fmt = logger.CSVOutputFormat(path, segmented=True)
+    fmt.writekvs({'a': 5})
+    fmt.close()
+    assert not os.path.exists(path + '.1')
+    df = logger.read_csv(path)
+    assert list(df.columns) == ['a'] and list(df['a']) == [5]
+
+
+def test_flush_at_exit(tmpdir):
+    # the rows still queued when the process exits are written by the atexit hook
+    script = '\n'.join([
+        'from baselines import logger',
+        'logger.configure(dir=%r, format_strs=["csv"], flush_interval=60.)' % str(tmpdir),
+        'for i in range(50):',
+        '    logger.logkv("i", i)',
+        '    logger.dumpkvs()',
+    ])
+    subprocess.check_call([sys.executable, '-c', script], timeout=60)
+    df = logger.read_csv(str(tmpdir.join('progress.csv')))
+    np.testing.assert_array_equal(df['i'], np.arange(50))
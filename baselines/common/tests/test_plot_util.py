@@ -15,3 +15,38 @@ def test_plot_util():
     _, axes = pu.plot_results(data, tiling='symmetric'); assert axes.shape==(2,2)
     _, axes = pu.plot_results(data, split_fn=lambda _: ''); assert len(axes) == 1
 
+
+
+def test_one_sided_ema_matches_loop():
+    import numpy as np
+    rng = np.random.RandomState(0)
+    xs = np.sort(rng.rand(1000) * 100)
+    ys = rng.randn(1000)
+    for low, high, n, decay_steps in [(xs[0], xs[-1], 512, 1.), (xs[0], xs[-1], 50, 10.), (20., 60., 300, 3.)]:
+        expected = pu._one_sided_ema_loop(xs, ys, low, high, n, decay_steps)
+        actual = pu.one_sided_ema(xs, ys, low, high, n, decay_steps)
+        for e, a in zip(expected, actual):
+            np.testing.assert_allclose(a, e, rtol=1e-9, equal_nan=True)
+
+
+def test_load_results_cache(tmpdir):
+    import os
+    import numpy as np
+    from baselines.bench.monitor import ResultsWriter
+    for i in range(3):
+        writer = ResultsWriter(str(tmpdir.mkdir('run%i' % i).join('0')), header={'t_start': 0.})
+        for step in range(10):
+            writer.write_row({'r': float(step * i), 'l': step + 1, 't': step * 0.1})
+        writer.close()
+
+    cache_dir = str(tmpdir.join('cache'))
+    parsed = pu.load_results(str(tmpdir), enable_progress=False, cache_dir=cache_dir, num_workers=2)
+    assert len(parsed) == 3 and len(os.listdir(cache_dir)) == 3
+    assert not any(os.path.exists(os.path.join(r.dirname, '.plot_cache')) for r in parsed)
+    cached = pu.load_results(str(tmpdir), enable_progress=False, columns=['r', 'l'], cache_dir=cache_dir)
+    key = lambda r: r.dirname
+    for p, c in zip(sorted(parsed, key=key), sorted(cached, key=key)):
+        assert list(c.monitor.columns) == ['r', 'l']
+        np.testing.assert_array_equal(c.monitor.r, p.monitor.r)
+        np.testing.assert_array_equal(c.monitor.l, p.monitor.l)
+        assert c.monitor.headers == p.monitor.headers == [{'t_start': 0.}]
@@ -95,9 +95,38 @@ def test_max_interval_tree():
     assert np.isclose(tree.min(3, 4), 3.0)
 
 
+def test_batched_set_and_prefixsum_idx():
+    rng = np.random.RandomState(0)
+    batched, scalar = SumSegmentTree(16), SumSegmentTree(16)
+    batched_min, scalar_min = MinSegmentTree(16), MinSegmentTree(16)
+    idxes = rng.randint(0, 16, size=40)
+    vals = rng.uniform(0.1, 2.0, size=40)
+
+    # assign one index at a time so duplicated indexes resolve the same way in both trees
+    for idx, val in zip(idxes, vals):
+        batched[np.array([idx])] = np.array([val])
+        batched_min[np.array([idx])] = np.array([val])
+        scalar[idx] = val
+        scalar_min[idx] = val
+    batched[np.arange(4)] = np.array([0.5, 1.0, 1.5, 2.0])
+    batched_min[np.arange(4)] = np.array([0.5, 1.0, 1.5, 2.0])
+    for i, val in enumerate([0.5, 1.0, 1.5, 2.0]):
+        scalar[i] = val
+        scalar_min[i] = val
+
+    assert np.allclose(batched[np.arange(16)], [scalar[i] for i in range(16)])
+    for start, end in [(0, None), (3, 11), (5, 6), (0, -1)]:
+        assert np.isclose(batched.sum(start, end), scalar.sum(start, end))
+        assert np.isclose(batched_min.min(start, end), scalar_min.min(start, end))
+
+    masses = rng.uniform(0, scalar.sum(), size=64)
+    assert list(batched.find_prefixsum_idx(masses)) == [scalar.find_prefixsum_idx(m) for m in masses]
+
+
 if __name__ == '__main__':
     test_tree_set()
     test_tree_set_overlap()
     test_prefixsum_idx()
     test_prefixsum_idx2()
     test_max_interval_tree()
+    test_batched_set_and_prefixsum_idx()
@@ -0,0 +1,68 @@
+import numpy as np
+
+from baselines.common.advantage import gae
+from baselines.common.segments import vec_traj_segment_generator, flatten_segment
+from baselines.common.tests.envs.identity_env import BoxIdentityEnv
+from baselines.common.vec_env.dummy_vec_env import DummyVecEnv
+
+
+class RewardGiver(object):
+    def get_reward(self, obs, acs):
+        return np.sum(obs * acs, axis=1, keepdims=True)
+
+
+def _act(obs):
+    return -obs, obs.sum(axis=1)
+
+
+def _disc_rets(seg, k, episode_lens, running):
+    # the discriminator returns of segment k, summed step by step for one env after the other
+    nsteps = len(seg["rew"])
+    rets = []
+    for e, n in enumerate(episode_lens):
+        for t in range(nsteps):
+            running[e] += seg["rew"][t, e]
+            if (k * nsteps + t + 1) % n == 0:
+                rets.append(running[e])
+                running[e] = 0
+    return rets
+
+
+def test_vec_segments():
+    episode_lens = [3, 5, 7]
+    venv = DummyVecEnv([lambda n=n: BoxIdentityEnv((2,), episode_len=n) for n in episode_lens])
+    nsteps = 105
+    gen = vec_traj_segment_generator(_act, venv, nsteps * venv.num_envs, reward_giver=RewardGiver())
+    running = np.zeros(len(episode_lens))
+    for k in range(2):
+        seg = next(gen)
+        np.testing.assert_allclose(seg["ep_rets"], _disc_rets(seg, k, episode_lens, running), rtol=1e-5)
+        assert seg["ob"].shape == (nsteps, 3, 2) and seg["rew"].shape == (nsteps, 3)
+        np.testing.assert_array_equal(seg["ac"], -seg["ob"])
+        np.testing.assert_allclose(seg["rew"], -np.sum(seg["ob"] ** 2, axis=2), rtol=1e-5)
+        # every env ran a whole number of its episodes
+        assert sorted(seg["ep_lens"]) == sorted(sum([[n] * (nsteps // n) for n in episode_lens], []))
+        assert len(seg["ep_rets"]) == len(seg["ep_true_rets"]) == len(seg["ep_lens"])
+        for e, n in enumerate(episode_lens):
+            np.testing.assert_array_equal(np.flatnonzero(seg["new"][:, e]), np.arange(0, nsteps, n))
+
+    seg["adv"] = gae(seg["rew"], seg["vpred"], seg["new"], seg["nextvpred"], 0, 0.99, 0.95)
+    ob, adv = seg["ob"].copy(), seg["adv"].copy()
+    flatten_segment(seg)
+    assert seg["ob"].shape == (nsteps * 3, 2) and seg["new"].shape == seg["adv"].shape == (nsteps * 3,)
+    np.testing.assert_array_equal(seg["ob"][nsteps:2 * nsteps], ob[:, 1])
+    np.testing.assert_array_equal(seg["adv"][nsteps:2 * nsteps], adv[:, 1])
+    assert seg["nextvpred"].shape == (3,)
+
+
+def test_vec_segments_carry_disc_rets():
+    # segments of 16 steps end in the middle of episodes
+    episode_lens = [3, 5, 7]
+    venv = DummyVecEnv([lambda n=n: BoxIdentityEnv((2,), episode_len=n) for n in episode_lens])
+    nsteps = 16
+    gen = vec_traj_segment_generator(_act, venv, nsteps * venv.num_envs, reward_giver=RewardGiver())
+    running = np.zeros(len(episode_lens))
+    for k in range(5):
+        seg = next(gen)
+        np.testing.assert_allclose(seg["ep_rets"], _disc_rets(seg, k, episode_lens, running), rtol=1e-5)
+        assert len(seg["ep_rets"]) == len(seg["ep_true_rets"])
@@ -1,8 +1,11 @@
 # tests for tf_util
+import numpy as np
 import tensorflow as tf
 from baselines.common.tf_util import (
     function,
     initialize,
+    load_variables,
+    save_variables,
     single_threaded_session
 )
 
@@ -37,6 +40,39 @@ def test_multikwargs():
             assert lin(2, 2) == 10
 
 
+def test_function_adjusts_shapes():
+    with tf.Graph().as_default():
+        x = tf.placeholder(tf.float32, (None, 3), name="x")
+        counter = tf.Variable(0, name="counter")
+        f = function([x], tf.reduce_sum(x, axis=1), updates=[tf.assign_add(counter, 1)])
+
+        with single_threaded_session() as sess:
+            sess.run(tf.global_variables_initializer())
+            np.testing.assert_allclose(f(np.ones((2, 3), np.float32)), [3., 3.])
+            np.testing.assert_allclose(f([1., 2., 3.]), [6.])
+            np.testing.assert_allclose(f(x=np.ones((1, 3), np.float32)), [3.])
+            assert sess.run(counter) == 3
+
+
+def test_load_variables_reuses_assign(tmpdir):
+    path = str(tmpdir.join('params'))
+    for _ in range(2):
+        # the assign op of the previous graph is not reused
+        graph = tf.Graph()
+        with graph.as_default():
+            v = tf.Variable(np.zeros(3, np.float32), name="v")
+            with single_threaded_session() as sess:
+                sess.run(tf.global_variables_initializer())
+                save_variables(path, variables=[v])
+                load_variables(path, variables=[v])
+                nops = len(graph.get_operations())
+                sess.run(tf.assign(v, np.ones(3, np.float32)))
+                load_variables(path, variables=[v])
+                np.testing.assert_allclose(sess.run(v), np.zeros(3))
+                assert len(graph.get_operations()) == nops + 2
+
+
 if __name__ == '__main__':
     test_function()
     test_multikwargs()
+    test_function_adjusts_shapes()
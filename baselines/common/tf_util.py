@@ -5,6 +5,7 @@ import os
 import functools
 import collections
 import multiprocessing
+from baselines.common import checkpoint
 
 def switch(condition, then_expression, else_expression):
     """Switches between two operations depending on a scalar value (int or bool).
@@ -190,19 +191,19 @@ class _Function(object):
         self.update_group = tf.group(*updates)
         self.outputs_update = list(outputs) + [self.update_group]
         self.givens = {} if givens is None else givens
+        self._adjusters = {inpt: make_shape_adjuster(inpt) for inpt in inputs if not hasattr(inpt, 'make_feed_dict')}
+        self._givens_feed = {inpt: adjust_shape(inpt, value) for inpt, value in self.givens.items()}
 
     def _feed_input(self, feed_dict, inpt, value):
         if hasattr(inpt, 'make_feed_dict'):
             feed_dict.update(inpt.make_feed_dict(value))
         else:
-            feed_dict[inpt] = adjust_shape(inpt, value)
+            feed_dict[inpt] = self._adjusters[inpt](value)
 
     def __call__(self, *args, **kwargs):
         assert len(args) + len(kwargs) <= len(self.inputs), "Too many arguments provided"
-        feed_dict = {}
         # Update feed dict with givens.
-        for inpt in self.givens:
-            feed_dict[inpt] = adjust_shape(inpt, feed_dict.get(inpt, self.givens[inpt]))
+        feed_dict = dict(self._givens_feed)
         # Update the args
         for inpt, value in zip(self.inputs, args):
             self._feed_input(feed_dict, inpt, value)
@@ -342,46 +343,60 @@ def save_state(fname, sess=None):
 # The methods above and below are clearly doing the same thing, and in a rather similar way
 # TODO: ensure there is no subtle differences and remove one
 
-def save_variables(save_path, variables=None, sess=None):
-    import joblib
+def save_variables(save_path, variables=None, sess=None, blocking=True):
+    """
+    Saves the variables as a checkpoint of baselines.common.checkpoint: the values are
+    fetched in one session call, and written by a background thread if not blocking.
+    The file at save_path indexes arrays in the arrays/ directory next to it, both have
+    to be kept together.
+    """
     sess = sess or get_session()
     variables = variables or tf.get_collection(tf.GraphKeys.GLOBAL_VARIABLES)
 
     ps = sess.run(variables)
     save_dict = {v.name: value for v, value in zip(variables, ps)}
-    dirname = os.path.dirname(save_path)
-    if any(dirname):
-        os.makedirs(dirname, exist_ok=True)
-    joblib.dump(save_dict, save_path)
+    checkpoint.save_arrays(save_path, save_dict, blocking=blocking)
 
-def save_trpo_variables(save_path, variables=None, sess=None):
-    import joblib
+def save_trpo_variables(save_path, variables=None, sess=None, blocking=True):
     sess = sess or get_session()
     variables = variables or tf.get_collection(tf.GraphKeys.GLOBAL_VARIABLES)
 
     ps = sess.run(variables)
     save_dict = {v.name[3:]: value for v, value in zip(variables, ps)}
-    dirname = os.path.dirname(save_path)
-    if any(dirname):
-        os.makedirs(dirname, exist_ok=True)
-    joblib.dump(save_dict, save_path)
+    checkpoint.save_arrays(save_path, save_dict, blocking=blocking)
 
 def load_variables(load_path, variables=None, sess=None):
-    import joblib
     sess = sess or get_session()
     variables = variables or tf.get_collection(tf.GraphKeys.GLOBAL_VARIABLES)
 
-    loaded_params = joblib.load(os.path.expanduser(load_path))
-    restores = []
+    load_path = os.path.expanduser(load_path)
+    checkpoint.wait()
+    if checkpoint.is_checkpoint(load_path):
+        loaded_params = checkpoint.read_checkpoint(load_path)
+    else:
+        # checkpoints of earlier versions are joblib dumps
+        import joblib
+        loaded_params = joblib.load(load_path)
     if isinstance(loaded_params, list):
         assert len(loaded_params) == len(variables), 'number of variables loaded mismatches len(variables)'
-        for d, v in zip(loaded_params, variables):
-            restores.append(v.assign(d))
+        values = loaded_params
     else:
-        for v in variables:
-            restores.append(v.assign(loaded_params[v.name]))
-
-    sess.run(restores)
+        values = [loaded_params[v.name] for v in variables]
+
+    placeholders, restore = _grouped_assign(sess.graph, variables)
+    sess.run(restore, feed_dict=dict(zip(placeholders, values)))
+
+def _grouped_assign(graph, variables):
+    """One op assigning fed values to all variables, built once per list of variables."""
+    # cached on the graph, so that it goes away with the graph
+    cache = graph.__dict__.setdefault('_baselines_grouped_assigns', {})
+    key = tuple(variables)
+    if key not in cache:
+        with graph.as_default(), tf.name_scope('load_variables'):
+            placeholders = [tf.placeholder(v.dtype.base_dtype, v.shape) for v in variables]
+            restore = tf.group(*[tf.assign(v, p) for v, p in zip(variables, placeholders)])
+        cache[key] = placeholders, restore
+    return cache[key]
 
 # ================================================================
 # Shape adjustment for feeding into tf placeholders
@@ -413,6 +428,30 @@ def adjust_shape(placeholder, data):
     return np.reshape(data, placeholder_shape)
 
 
+def make_shape_adjuster(placeholder):
+    '''
+    adjust_shape for a single placeholder, with the shape of the placeholder looked up once.
+    Arrays whose shape already matches the placeholder are returned as they are.
+    '''
+    if placeholder.shape.ndims is None:
+        return lambda data: data
+    shape = placeholder.shape.as_list()
+    placeholder_shape = [x or -1 for x in shape]
+
+    def adjust(data):
+        if isinstance(data, np.ndarray):
+            if data.ndim == len(shape) and all(s is None or s == d for s, d in zip(shape, data.shape)):
+                return data
+        elif isinstance(data, list):
+            data = np.array(data)
+        else:
+            return data
+        assert _check_shape(placeholder_shape, data.shape), \
+            'Shape of data {} is not compatible with shape of the placeholder {}'.format(data.shape, placeholder_shape)
+        return np.reshape(data, placeholder_shape)
+    return adjust
+
+
 def _check_shape(placeholder_shape, data_shape):
     ''' check if two shapes are compatible (i.e. differ only by dimensions of size 1, or by the batch dimension)'''
 
@@ -0,0 +1,83 @@
+from multiprocessing.connection import wait
+
+import numpy as np
+from .subproc_vec_env import SubprocVecEnv, _concat_obs
+
+
+class AsyncVecEnv(SubprocVecEnv):
+    """
+    SubprocVecEnv that can step any subset of its environments and collect the results
+    of whichever environments finish first, in the style of EnvPool's send / recv(batch_size).
+    Use it when the step latency of the environments varies a lot, so that a single slow
+    environment does not stall all the others on every step.
+
+    step_async(actions) followed by step_wait() behaves like SubprocVecEnv.
+    """
+    def __init__(self, env_fns, spaces=None, context='spawn'):
+        super().__init__(env_fns, spaces=spaces, context=context)
+        self.pending = np.zeros(self.num_envs, dtype=np.bool_)
+        self._env_ids = {remote: env_id for env_id, remote in enumerate(self.remotes)}
+
+    @property
+    def num_pending(self):
+        return int(self.pending.sum())
+
+    def step_async(self, actions, env_ids=None):
+        """
+        Tell the environments env_ids (all of them if None) to start taking a step with
+        the given actions. None of these environments may still have a step pending.
+        """
+        self._assert_not_closed()
+        if env_ids is None:
+            env_ids = np.arange(self.num_envs)
+        assert len(actions) == len(env_ids)
+        for env_id, action in zip(env_ids, actions):
+            assert not self.pending[env_id], 'env {} is already stepping'.format(env_id)
+            self.remotes[env_id].send(('step', [action]))
+            self.pending[env_id] = True
+        self.waiting = True
+
+    def step_wait(self):
+        """
+        Wait for all pending environments. Results are ordered by env id.
+        """
+        obs, rews, dones, infos, env_ids = self.step_wait_partial(self.num_pending)
+        order = np.argsort(env_ids)
+        if isinstance(obs, dict):
+            obs = {k: v[order] for k, v in obs.items()}
+        else:
+            obs = obs[order]
+        return obs, rews[order], dones[order], tuple(infos[i] for i in order)
+
+    def step_wait_partial(self, batch_size):
+        """
+        Wait until batch_size of the pending environments have finished their step
+        (all of them if fewer are pending).
+
+        Returns (obs, rews, dones, infos, env_ids) for those environments, in the
+        order in which they finished. The other environments keep stepping.
+        """
+        self._assert_not_closed()
+        batch_size = min(batch_size, self.num_pending)
+        assert batch_size > 0, 'no environment is stepping'
+        ready = []
+        while len(ready) < batch_size:
+            stepping = [self.remotes[env_id] for env_id in np.flatnonzero(self.pending) if env_id not in ready]
+            ready.extend(self._env_ids[remote] for remote in wait(stepping))
+        env_ids = np.array(ready[:batch_size])
+        results = [self.remotes[env_id].recv() for env_id in env_ids]
+        self.pending[env_ids] = False
+        self.waiting = self.pending.any()
+        obs, rews, dones, infos = zip(*results)
+        return _concat_obs(obs), np.concatenate(rews), np.concatenate(dones), sum(infos, ()), env_ids
+
+    def reset(self):
+        if self.pending.any():
+            self.step_wait_partial(self.num_pending)
+        return super().reset()
+
+    def close_extras(self):
+        if not self.closed and self.pending.any():
+            self.step_wait_partial(self.num_pending)
+        self.waiting = False
+        super().close_extras()
@@ -11,21 +11,35 @@ from baselines import logger
 from .util import dict_to_obs, obs_space_info, obs_to_dict
 
 _NP_TO_CT = {np.float32: ctypes.c_float,
+             np.float64: ctypes.c_double,
              np.int32: ctypes.c_int32,
+             np.int64: ctypes.c_int64,
              np.int8: ctypes.c_int8,
              np.uint8: ctypes.c_char,
-             np.bool: ctypes.c_bool}
+             np.bool_: ctypes.c_bool}
+
+# how long to block on a worker before checking that it is still alive
+_WORKER_POLL_TIMEOUT = 5.0
 
 
 class ShmemVecEnv(VecEnv):
     """
     Optimized version of SubprocVecEnv that uses shared variables to communicate observations.
+
+    Observations, rewards, dones and (when the action space allows it) actions live in
+    shared arrays of shape (num_envs, ...). A step is triggered by releasing a per-worker
+    semaphore and completion is signalled on a single shared semaphore; the pipes only
+    carry non-empty infos and the rare reset/render/close commands.
     """
 
-    def __init__(self, env_fns, spaces=None, context='spawn'):
+    def __init__(self, env_fns, spaces=None, context='spawn', copy_obs=True):
         """
         If you don't specify observation_space, we'll have to create a dummy
         environment to get it.
+
+        If copy_obs is False, step_wait() and reset() return views into the shared
+        observation buffer that stay valid until the next call to step_async() or reset(),
+        and step_wait() returns the rewards and dones in arrays it reuses at every step.
         """
         ctx = mp.get_context(context)
         if spaces:
@@ -38,18 +52,46 @@ class ShmemVecEnv(VecEnv):
                 dummy.close()
                 del dummy
         VecEnv.__init__(self, len(env_fns), observation_space, action_space)
+        self.copy_obs = copy_obs
         self.obs_keys, self.obs_shapes, self.obs_dtypes = obs_space_info(observation_space)
-        self.obs_bufs = [
-            {k: ctx.Array(_NP_TO_CT[self.obs_dtypes[k].type], int(np.prod(self.obs_shapes[k]))) for k in self.obs_keys}
-            for _ in env_fns]
+        self.obs_bufs = {k: ctx.Array(_NP_TO_CT[self.obs_dtypes[k].type], self.num_envs * int(np.prod(self.obs_shapes[k])))
+                         for k in self.obs_keys}
+        # float64 like the rewards of gym envs, so they are not rounded on the way
+        self.rew_buf = ctx.Array(ctypes.c_double, self.num_envs)
+        self.done_buf = ctx.Array(ctypes.c_bool, self.num_envs)
+        self.info_flag_buf = ctx.Array(ctypes.c_bool, self.num_envs)
+        act_dtype = getattr(action_space, 'dtype', None)
+        if act_dtype is not None and np.dtype(act_dtype).type in _NP_TO_CT:
+            self.act_shape, self.act_dtype = action_space.shape, np.dtype(act_dtype)
+            self.act_buf = ctx.Array(_NP_TO_CT[self.act_dtype.type], self.num_envs * int(np.prod(self.act_shape)))
+        else:
+            # actions of structured spaces are sent through the pipes
+            self.act_shape, self.act_dtype, self.act_buf = None, None, None
+        self.step_sems = [ctx.Semaphore(0) for _ in env_fns]
+        self.done_sem = ctx.Semaphore(0)
+
+        self._obs_views = {k: _shared_view(self.obs_bufs[k], self.obs_dtypes[k], (self.num_envs,) + tuple(self.obs_shapes[k]))
+                           for k in self.obs_keys}
+        self._rews = _shared_view(self.rew_buf, np.float64, (self.num_envs,))
+        self._dones = _shared_view(self.done_buf, np.bool_, (self.num_envs,))
+        self._rews_out = np.empty_like(self._rews)
+        self._dones_out = np.empty_like(self._dones)
+        self._info_flags = _shared_view(self.info_flag_buf, np.bool_, (self.num_envs,))
+        self._acts = None
+        if self.act_buf is not None:
+            self._acts = _shared_view(self.act_buf, self.act_dtype, (self.num_envs,) + tuple(self.act_shape))
+
         self.parent_pipes = []
         self.procs = []
         with clear_mpi_env_vars():
-            for env_fn, obs_buf in zip(env_fns, self.obs_bufs):
+            for index, (env_fn, step_sem) in enumerate(zip(env_fns, self.step_sems)):
                 wrapped_fn = CloudpickleWrapper(env_fn)
                 parent_pipe, child_pipe = ctx.Pipe()
                 proc = ctx.Process(target=_subproc_worker,
-                            args=(child_pipe, parent_pipe, wrapped_fn, obs_buf, self.obs_shapes, self.obs_dtypes, self.obs_keys))
+                            args=(child_pipe, parent_pipe, wrapped_fn, index, self.num_envs, step_sem, self.done_sem,
+                                  self.obs_bufs, self.obs_shapes, self.obs_dtypes, self.obs_keys,
+                                  self.rew_buf, self.done_buf, self.info_flag_buf,
+                                  self.act_buf, self.act_shape, self.act_dtype))
                 proc.daemon = True
                 self.procs.append(proc)
                 self.parent_pipes.append(parent_pipe)
@@ -62,25 +104,40 @@ class ShmemVecEnv(VecEnv):
         if self.waiting_step:
             logger.warn('Called reset() while waiting for the step to complete')
             self.step_wait()
+        self._send_all('reset')
         for pipe in self.parent_pipes:
-            pipe.send(('reset', None))
-        return self._decode_obses([pipe.recv() for pipe in self.parent_pipes])
+            pipe.recv()
+        return self._decode_obses()
 
     def step_async(self, actions):
         assert len(actions) == len(self.parent_pipes)
-        for pipe, act in zip(self.parent_pipes, actions):
-            pipe.send(('step', act))
+        if self._acts is not None:
+            self._acts[...] = actions
+            for sem in self.step_sems:
+                sem.release()
+        else:
+            for pipe, sem, act in zip(self.parent_pipes, self.step_sems, actions):
+                pipe.send(('step', act))
+                sem.release()
+        self.waiting_step = True
 
     def step_wait(self):
-        outs = [pipe.recv() for pipe in self.parent_pipes]
-        obs, rews, dones, infos = zip(*outs)
-        return self._decode_obses(obs), np.array(rews), np.array(dones), infos
+        for _ in range(self.num_envs):
+            self._acquire_done()
+        self.waiting_step = False
+        infos = [pipe.recv() if flag else {} for pipe, flag in zip(self.parent_pipes, self._info_flags)]
+        if self.copy_obs:
+            rews, dones = self._rews.copy(), self._dones.copy()
+        else:
+            rews, dones = self._rews_out, self._dones_out
+            np.copyto(rews, self._rews)
+            np.copyto(dones, self._dones)
+        return self._decode_obses(), rews, dones, infos
 
     def close_extras(self):
         if self.waiting_step:
             self.step_wait()
-        for pipe in self.parent_pipes:
-            pipe.send(('close', None))
+        self._send_all('close')
         for pipe in self.parent_pipes:
             pipe.recv()
             pipe.close()
@@ -88,44 +145,76 @@ class ShmemVecEnv(VecEnv):
             proc.join()
 
     def get_images(self, mode='human'):
-        for pipe in self.parent_pipes:
-            pipe.send(('render', None))
+        self._send_all('render')
         return [pipe.recv() for pipe in self.parent_pipes]
 
-    def _decode_obses(self, obs):
-        result = {}
-        for k in self.obs_keys:
+    def _send_all(self, cmd):
+        for pipe, sem in zip(self.parent_pipes, self.step_sems):
+            pipe.send((cmd, None))
+            sem.release()
+
+    def _acquire_done(self):
+        while not self.done_sem.acquire(timeout=_WORKER_POLL_TIMEOUT):
+            if not all(proc.is_alive() for proc in self.procs):
+                raise RuntimeError('ShmemVecEnv worker died while stepping')
 
-            bufs = [b[k] for b in self.obs_bufs]
-            o = [np.frombuffer(b.get_obj(), dtype=self.obs_dtypes[k]).reshape(self.obs_shapes[k]) for b in bufs]
-            result[k] = np.array(o)
+    def _decode_obses(self):
+        if self.copy_obs:
+            result = {k: v.copy() for k, v in self._obs_views.items()}
+        else:
+            result = dict(self._obs_views)
         return dict_to_obs(result)
 
 
-def _subproc_worker(pipe, parent_pipe, env_fn_wrapper, obs_bufs, obs_shapes, obs_dtypes, keys):
+def _shared_view(buf, dtype, shape):
+    return np.frombuffer(buf.get_obj(), dtype=dtype).reshape(shape)
+
+
+def _subproc_worker(pipe, parent_pipe, env_fn_wrapper, index, num_envs, step_sem, done_sem,
+                    obs_bufs, obs_shapes, obs_dtypes, keys, rew_buf, done_buf, info_flag_buf,
+                    act_buf, act_shape, act_dtype):
     """
     Control a single environment instance using IPC and
     shared memory.
     """
+    obs_views = {k: _shared_view(obs_bufs[k], obs_dtypes[k], (num_envs,) + tuple(obs_shapes[k]))[index] for k in keys}
+    rews = _shared_view(rew_buf, np.float64, (num_envs,))
+    dones = _shared_view(done_buf, np.bool_, (num_envs,))
+    info_flags = _shared_view(info_flag_buf, np.bool_, (num_envs,))
+    acts = None
+    if act_buf is not None:
+        acts = _shared_view(act_buf, act_dtype, (num_envs,) + tuple(act_shape))
+
     def _write_obs(maybe_dict_obs):
         flatdict = obs_to_dict(maybe_dict_obs)
         for k in keys:
-            dst = obs_bufs[k].get_obj()
-            dst_np = np.frombuffer(dst, dtype=obs_dtypes[k]).reshape(obs_shapes[k])  # pylint: disable=W0212
-            np.copyto(dst_np, flatdict[k])
+            np.copyto(obs_views[k], flatdict[k])
 
     env = env_fn_wrapper.x()
     parent_pipe.close()
     try:
         while True:
-            cmd, data = pipe.recv()
+            step_sem.acquire()
+            if pipe.poll():
+                cmd, data = pipe.recv()
+            else:
+                cmd, data = 'step', acts[index].copy()
             if cmd == 'reset':
-                pipe.send(_write_obs(env.reset()))
+                _write_obs(env.reset())
+                pipe.send(None)
             elif cmd == 'step':
                 obs, reward, done, info = env.step(data)
                 if done:
                     obs = env.reset()
-                pipe.send((_write_obs(obs), reward, done, info))
+                _write_obs(obs)
+                rews[index] = reward
+                dones[index] = done
+                info_flags[index] = bool(info)
+                done_sem.release()
+                # the parent only reads infos after every worker has signalled,
+                # so sending after the release cannot fill up the pipe and deadlock
+                if info:
+                    pipe.send(info)
             elif cmd == 'render':
                 pipe.send(env.render(mode='rgb_array'))
             elif cmd == 'close':
@@ -8,6 +8,9 @@ import pytest
 from .dummy_vec_env import DummyVecEnv
 from .shmem_vec_env import ShmemVecEnv
 from .subproc_vec_env import SubprocVecEnv
+from .async_vec_env import AsyncVecEnv
+from .vec_frame_stack import VecFrameStack
+from .vec_normalize import VecNormalize, find_vec_normalize
 from baselines.common.tests.test_with_mpi import with_mpi
 
 
@@ -44,7 +47,7 @@ def assert_venvs_equal(venv1, venv2, num_steps):
         venv2.close()
 
 
-@pytest.mark.parametrize('klass', (ShmemVecEnv, SubprocVecEnv))
+@pytest.mark.parametrize('klass', (ShmemVecEnv, SubprocVecEnv, AsyncVecEnv))
 @pytest.mark.parametrize('dtype', ('uint8', 'float32'))
 def test_vec_env(klass, dtype):  # pylint: disable=R0914
     """
@@ -67,6 +70,189 @@ def test_vec_env(klass, dtype):  # pylint: disable=R0914
     assert_venvs_equal(env1, env2, num_steps=num_steps)
 
 
+def test_subproc_vec_env_in_series():
+    """
+    Test that SubprocVecEnv running several environments
+    per worker process is equivalent to DummyVecEnv.
+    """
+    fns = [(lambda seed=seed: SimpleEnv(seed, (2, 3), 'float32')) for seed in range(6)]
+    assert_venvs_equal(DummyVecEnv(fns), SubprocVecEnv(fns, in_series=3), num_steps=20)
+
+
+def test_async_vec_env_partial():
+    """
+    Test that AsyncVecEnv steps subsets of its environments
+    and hands back finished environments with their ids.
+    """
+    shape = (2, 3)
+    num_envs = 4
+    fns = [(lambda seed=seed: SimpleEnv(seed, shape, 'float32')) for seed in range(num_envs)]
+    env2 = AsyncVecEnv(fns)
+    try:
+        env2.reset()
+        actions = np.ones((num_envs,) + shape, dtype='float32')
+        env2.step_async(actions[:3], [3, 0, 2])
+        obs, rews, dones, infos, env_ids = env2.step_wait_partial(2)
+        assert len(env_ids) == 2 and env2.num_pending == 1
+        env2.step_async(actions[:2], env_ids)
+        env2.step_async(actions[:1], [1])
+        seen = list(env_ids)
+        while env2.num_pending:
+            obs, rews, dones, infos, env_ids = env2.step_wait_partial(3)
+            seen.extend(env_ids)
+        assert sorted(seen) == sorted([0, 2, 3] + [1] + seen[:2])
+        assert obs.shape[1:] == shape and len(obs) == len(rews) == len(dones) == len(infos) == len(env_ids)
+    finally:
+        env2.close()
+
+
+def test_vec_frame_stack():
+    """
+    Test that VecFrameStack produces the same stacks as
+    rolling the whole buffer by one frame and zeroing it
+    on episode ends.
+    """
+    nstack, num_envs, shape = 3, 4, (2, 3)
+    fns = [(lambda seed=seed: SimpleEnv(seed, shape, 'uint8')) for seed in range(num_envs)]
+    venv = VecFrameStack(DummyVecEnv(fns), nstack)
+    expected = np.zeros((num_envs,) + shape[:-1] + (shape[-1] * nstack,), dtype='uint8')
+    obs = venv.reset()
+    expected[..., -shape[-1]:] = obs[..., -shape[-1]:]
+    assert np.array_equal(obs, expected)
+    venv.venv.action_space.seed(0)
+    for _ in range(10):
+        actions = np.array([venv.venv.action_space.sample() for _ in range(num_envs)])
+        obs, _, news, _ = venv.step(actions)
+        frames = obs[..., -shape[-1]:]
+        expected = np.roll(expected, shift=-shape[-1], axis=-1)
+        expected[news] = 0
+        expected[..., -shape[-1]:] = frames
+        assert np.array_equal(obs, expected)
+        assert obs is venv.stackedobs
+
+
+def test_shmem_vec_env_no_copy():
+    """
+    Test that ShmemVecEnv returning views of its shared
+    observation buffer is equivalent to DummyVecEnv.
+    """
+    fns = [(lambda seed=seed: SimpleEnv(seed, (2, 3), 'float32')) for seed in range(4)]
+    assert_venvs_equal(DummyVecEnv(fns), ShmemVecEnv(fns, copy_obs=False), num_steps=20)
+
+
+@pytest.mark.parametrize('copy_obs', (True, False))
+def test_shmem_vec_env_rewards(copy_obs):
+    """
+    Test that ShmemVecEnv passes rewards on in float64,
+    and reuses its reward arrays only without copy_obs.
+    """
+    num_envs = 4
+    fns = [(lambda seed=seed: SimpleEnv(seed, (2, 3), 'float32')) for seed in range(num_envs)]
+    venv = ShmemVecEnv(fns, copy_obs=copy_obs)
+    try:
+        venv.reset()
+        actions = np.zeros((num_envs, 2, 3), dtype='float32')
+        _, rews, _, _ = venv.step(actions)
+        # SimpleEnv(seed) rewards 1 / (seed + 1) for its first step
+        assert rews.dtype == np.float64
+        assert np.array_equal(rews, 1 / np.arange(1, num_envs + 1))
+        _, rews2, _, _ = venv.step(actions)
+        assert (rews2 is rews) != copy_obs
+    finally:
+        venv.close()
+
+
+def _normalized_venv(**kwargs):
+    fns = [(lambda seed=seed: SimpleEnv(seed, (2, 3), 'float32')) for seed in range(4)]
+    return VecNormalize(DummyVecEnv(fns), **kwargs)
+
+
+def _step_randomly(venv, num_steps):
+    venv.reset()
+    venv.action_space.seed(0)
+    for _ in range(num_steps):
+        venv.step(np.array([venv.action_space.sample() for _ in range(venv.num_envs)]))
+
+
+def _assert_states_equal(state1, state2):
+    assert state1.keys() == state2.keys()
+    for name in state1:
+        for x1, x2 in zip(state1[name], state2[name]):
+            np.testing.assert_array_equal(x1, x2)
+
+
+def test_vec_normalize_save_load(tmpdir):
+    """
+    Test that the statistics VecNormalize saves are the
+    ones another VecNormalize loads.
+    """
+    venv1 = _normalized_venv()
+    _step_randomly(venv1, 10)
+    path = str(tmpdir.join('model' + '.vecnormalize'))
+    venv1.save(path)
+    venv2 = _normalized_venv()
+    venv2.load(path)
+    _assert_states_equal(venv1.get_state(), venv2.get_state())
+    obs = np.random.uniform(0, 0xFF, size=(4, 2, 3))
+    np.testing.assert_array_equal(venv1._obfilt(obs), venv2._obfilt(obs))
+
+
+def test_vec_normalize_set_state():
+    """
+    Test that set_state restores the statistics get_state
+    returns, and that missing statistics are left as they are.
+    """
+    venv1 = _normalized_venv()
+    _step_randomly(venv1, 10)
+    venv2 = _normalized_venv()
+    venv2.set_state(venv1.get_state())
+    _assert_states_equal(venv1.get_state(), venv2.get_state())
+    ret_rms = venv2.get_state()['ret_rms']
+    venv2.set_state({'ob_rms': None, 'ret_rms': (np.zeros(()), np.ones(()), 1.)})
+    np.testing.assert_array_equal(venv2.ob_rms.mean, venv1.ob_rms.mean)
+    assert venv2.ret_rms.count == 1. and venv2.ret_rms.count != ret_rms[2]
+
+
+def test_vec_normalize_frozen():
+    """
+    Test that a frozen VecNormalize normalizes with
+    statistics it does not update.
+    """
+    venv = _normalized_venv()
+    _step_randomly(venv, 10)
+    state = venv.get_state()
+    venv.frozen = True
+    _step_randomly(venv, 10)
+    _assert_states_equal(venv.get_state(), state)
+
+
+def test_vec_normalize_sync_every():
+    """
+    Test that accumulating the batches between merges ends
+    in the statistics of updating them at every step.
+    """
+    venv1 = _normalized_venv()
+    venv2 = _normalized_venv(sync_every=5)
+    _step_randomly(venv1, 10)
+    _step_randomly(venv2, 10)
+    for rms1, rms2 in [(venv1.ob_rms, venv2.ob_rms), (venv1.ret_rms, venv2.ret_rms)]:
+        rms2.flush()
+        np.testing.assert_allclose(rms1.count, rms2.count)
+        np.testing.assert_allclose(rms1.mean, rms2.mean)
+        np.testing.assert_allclose(rms1.var, rms2.var)
+
+
+def test_find_vec_normalize():
+    """
+    Test that find_vec_normalize finds VecNormalize under
+    other wrappers, and only there.
+    """
+    venv = _normalized_venv()
+    assert find_vec_normalize(VecFrameStack(venv, 2)) is venv
+    assert find_vec_normalize(venv) is venv
+    assert find_vec_normalize(venv.venv) is None
+
+
 class SimpleEnv(gym.Env):
     """
     An environment with a pre-determined observation space
@@ -112,3 +298,21 @@ def test_mpi_with_subprocvecenv():
     venv.close()
     assert ob.shape == (nenv,) + shape
 
+
+
+@with_mpi()
+def test_mpi_vec_normalize():
+    """
+    Test that the workers of a VecNormalize with sync_every
+    end up with identical statistics of all their steps.
+    """
+    from mpi4py import MPI
+    comm = MPI.COMM_WORLD
+    fns = [(lambda seed=seed: SimpleEnv(seed, (2, 3), 'float32')) for seed in range(comm.Get_rank(), 4, comm.Get_size())]
+    venv = VecNormalize(DummyVecEnv(fns), comm=comm, sync_every=5)
+    _step_randomly(venv, 10)
+    venv.ob_rms.flush()
+    means = comm.allgather(venv.ob_rms.mean)
+    np.testing.assert_allclose(means[0], means[1])
+    # the reset and the 10 steps of all 4 envs
+    np.testing.assert_allclose(venv.ob_rms.count, 1e-4 + 11 * 4)
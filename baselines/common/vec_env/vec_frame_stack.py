@@ -5,6 +5,12 @@ from gym import spaces
 class VecFrameStack(VecEnvWrapper):
     """
     Vectorized environment base class
+
+    The frames are stacked in place in a persistent contiguous buffer, oldest frame
+    first: a step shifts the whole buffer by one frame with a single flat copy, which
+    moves every frame of a pixel into the slot of the frame before it, and then writes
+    the new frames into the last slots. The buffer is returned by every step and reset,
+    so the returned observations have to be copied to be kept.
     """
     def __init__(self, venv, nstack):
         self.venv = venv
@@ -18,11 +24,14 @@ class VecFrameStack(VecEnvWrapper):
 
     def step_wait(self):
         obs, rews, news, infos = self.venv.step_wait()
-        self.stackedobs = np.roll(self.stackedobs, shift=-1, axis=-1)
-        for (i, new) in enumerate(news):
-            if new:
-                self.stackedobs[i] = 0
-        self.stackedobs[..., -obs.shape[-1]:] = obs
+        nc = obs.shape[-1]
+        flat = self.stackedobs.reshape(-1)
+        # the slices overlap, numpy copies them as if through a temporary
+        flat[:-nc] = flat[nc:]
+        resets = np.asarray(news, dtype=bool)
+        if resets.any():
+            self.stackedobs[resets] = 0
+        self.stackedobs[..., -nc:] = obs
         return self.stackedobs, rews, news, infos
 
     def reset(self):
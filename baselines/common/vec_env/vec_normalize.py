@@ -1,26 +1,39 @@
 from . import VecEnvWrapper
 import numpy as np
+import pickle
+
+# suffix of the file the statistics are saved to next to a model checkpoint
+STATE_SUFFIX = '.vecnormalize'
 
 class VecNormalize(VecEnvWrapper):
     """
     Vectorized environment base class
+
+    Normalizes observations and rewards with running statistics.
+
+    comm: MPI communicator whose workers merge their batches into identical statistics
+    sync_every: number of steps the batches are accumulated locally between these merges,
+        the workers have to step the same number of times
+    frozen: normalize with the current statistics without updating them, e.g. for evaluation
     """
 
-    def __init__(self, venv, ob=True, ret=True, clipob=10., cliprew=10., gamma=0.99, epsilon=1e-8, use_tf=False):
+    def __init__(self, venv, ob=True, ret=True, clipob=10., cliprew=10., gamma=0.99, epsilon=1e-8, use_tf=False,
+                 comm=None, sync_every=1, frozen=False):
         VecEnvWrapper.__init__(self, venv)
         if use_tf:
             from baselines.common.running_mean_std import TfRunningMeanStd
-            self.ob_rms = TfRunningMeanStd(shape=self.observation_space.shape, scope='ob_rms') if ob else None
-            self.ret_rms = TfRunningMeanStd(shape=(), scope='ret_rms') if ret else None
+            self.ob_rms = TfRunningMeanStd(shape=self.observation_space.shape, scope='ob_rms', comm=comm, sync_every=sync_every) if ob else None
+            self.ret_rms = TfRunningMeanStd(shape=(), scope='ret_rms', comm=comm, sync_every=sync_every) if ret else None
         else:
             from baselines.common.running_mean_std import RunningMeanStd
-            self.ob_rms = RunningMeanStd(shape=self.observation_space.shape) if ob else None
-            self.ret_rms = RunningMeanStd(shape=()) if ret else None
+            self.ob_rms = RunningMeanStd(shape=self.observation_space.shape, comm=comm, sync_every=sync_every) if ob else None
+            self.ret_rms = RunningMeanStd(shape=(), comm=comm, sync_every=sync_every) if ret else None
         self.clipob = clipob
         self.cliprew = cliprew
         self.ret = np.zeros(self.num_envs)
         self.gamma = gamma
         self.epsilon = epsilon
+        self.frozen = frozen
 
     def step_wait(self):
         """
@@ -30,12 +43,7 @@ class VecNormalize(VecEnvWrapper):
         where 'news' is a boolean vector indicating whether each element is new.
         """
         obs, rews, news, infos = self.venv.step_wait()
-        self.ret = self.ret * self.gamma + rews
-        obs = self._obfilt(obs)
-        if self.ret_rms:
-            self.ret_rms.update(self.ret)
-            rews = np.clip(rews / np.sqrt(self.ret_rms.var + self.epsilon), -self.cliprew, self.cliprew)
-        self.ret[news] = 0.
+        obs, rews = self._filt(obs, rews, news)
         return obs, rews, news, infos
 
     def step_wait_collisions(self):
@@ -46,27 +54,29 @@ class VecNormalize(VecEnvWrapper):
         where 'news' is a boolean vector indicating whether each element is new.
         """
         obs, rews, news, collisions, infos = self.venv.step_wait_collisions()
-        self.ret = self.ret * self.gamma + rews
-        obs = self._obfilt(obs)
-        if self.ret_rms:
-            self.ret_rms.update(self.ret)
-            rews = np.clip(rews / np.sqrt(self.ret_rms.var + self.epsilon), -self.cliprew, self.cliprew)
-        self.ret[news] = 0.
+        obs, rews = self._filt(obs, rews, news)
         return obs, rews, news, collisions, infos
 
     def step_wait_runtime(self):
         obs, rews, news, infos = self.venv.step_wait_runtime()
-        self.ret = self.ret * self.gamma + rews
+        obs, rews = self._filt(obs, rews, news)
+        return obs, rews, news, infos
+
+    def _filt(self, obs, rews, news):
+        self.ret *= self.gamma
+        self.ret += rews
         obs = self._obfilt(obs)
         if self.ret_rms:
-            self.ret_rms.update(self.ret)
+            if not self.frozen:
+                self.ret_rms.update(self.ret)
             rews = np.clip(rews / np.sqrt(self.ret_rms.var + self.epsilon), -self.cliprew, self.cliprew)
         self.ret[news] = 0.
-        return obs, rews, news, infos
+        return obs, rews
 
     def _obfilt(self, obs):
         if self.ob_rms:
-            self.ob_rms.update(obs)
+            if not self.frozen:
+                self.ob_rms.update(obs)
             obs = np.clip((obs - self.ob_rms.mean) / np.sqrt(self.ob_rms.var + self.epsilon), -self.clipob, self.clipob)
             return obs
         else:
@@ -74,7 +84,8 @@ class VecNormalize(VecEnvWrapper):
 
     def _obfilt_run(self, obs):
         if self.ob_rms:
-            self.ob_rms.update(obs)
+            if not self.frozen:
+                self.ob_rms.update(obs)
             obs = np.clip(self.ob_rms.mean + obs * np.sqrt(self.ob_rms.var + self.epsilon), -self.clipob, self.clipob)
 
         return obs
@@ -83,3 +94,30 @@ class VecNormalize(VecEnvWrapper):
         self.ret = np.zeros(self.num_envs)
         obs = self.venv.reset()
         return self._obfilt(obs)
+
+    def get_state(self):
+        """The normalization statistics, as (mean, var, count) of the observations and returns."""
+        return {name: None if rms is None else (rms.mean, rms.var, rms.count)
+                for name, rms in [('ob_rms', self.ob_rms), ('ret_rms', self.ret_rms)]}
+
+    def set_state(self, state):
+        for name, rms in [('ob_rms', self.ob_rms), ('ret_rms', self.ret_rms)]:
+            if rms is not None and state.get(name) is not None:
+                rms.set_moments(*state[name])
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            pickle.dump(self.get_state(), f)
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            self.set_state(pickle.load(f))
+
+
+def find_vec_normalize(venv):
+    """The VecNormalize wrapper in the chain of wrappers of venv, None if there is none."""
+    while venv is not None:
+        if isinstance(venv, VecNormalize):
+            return venv
+        venv = getattr(venv, 'venv', None)
+    return None
@@ -1,6 +1,15 @@
 import numpy as np
 
 
+def _ring_write(data, start, vs):
+    """Writes vs to data[start:start+len(vs)], wrapping around the end of data. Slices are
+    much faster to assign to than an index array for large rows."""
+    n = len(vs)
+    first = min(n, len(data) - start)
+    data[start:start+first] = vs[:first]
+    data[:n-first] = vs[first:]
+
+
 class RingBuffer(object):
     def __init__(self, maxlen, shape, dtype='float32'):
         self.maxlen = maxlen
@@ -31,6 +40,14 @@ class RingBuffer(object):
             raise RuntimeError()
         self.data[(self.start + self.length - 1) % self.maxlen] = v
 
+    def append_batch(self, vs):
+        n = len(vs)
+        assert n <= self.maxlen
+        _ring_write(self.data, (self.start + self.length) % self.maxlen, np.asarray(vs))
+        if self.length + n > self.maxlen:
+            self.start = (self.start + self.length + n - self.maxlen) % self.maxlen
+        self.length = min(self.length + n, self.maxlen)
+
 
 def array_min2d(x):
     x = np.array(x)
@@ -78,6 +95,127 @@ class Memory(object):
         self.observations1.append(obs1)
         self.terminals1.append(terminal1)
 
+    def append_batch(self, obs0, action, reward, obs1, terminal1, training=True):
+        """Appends one transition per env of a vectorized env."""
+        if not training:
+            return
+
+        self.observations0.append_batch(obs0)
+        self.actions.append_batch(action)
+        self.rewards.append_batch(np.reshape(reward, (-1, 1)))
+        self.observations1.append_batch(obs1)
+        self.terminals1.append_batch(np.reshape(terminal1, (-1, 1)))
+
     @property
     def nb_entries(self):
         return len(self.observations0)
+
+
+class DedupMemory(object):
+    """
+    Memory that stores every observation once. Transitions are appended in batches of one
+    transition per env of a vectorized env, and the obs1 of a transition is normally the
+    obs0 of the next transition of the same env: every entry only keeps its obs0 and the
+    index of the entry holding its obs1. The obs1 of the latest transition of each env is
+    kept aside until that env appends again.
+
+    If an env appends an obs0 that is not the obs1 it appended last (e.g. after a manual
+    reset), its pending obs1 is written to an entry of its own that is never sampled.
+    """
+    def __init__(self, limit, action_shape, observation_shape):
+        self.limit = limit
+        self.observations = np.zeros((limit,) + observation_shape, dtype='float32')
+        self.actions = np.zeros((limit,) + action_shape, dtype='float32')
+        self.rewards = np.zeros((limit, 1), dtype='float32')
+        self.terminals1 = np.zeros((limit, 1), dtype='float32')
+        # index of the entry holding obs1, or -1 - env for the pending obs1 of env
+        self.next_idxs = np.zeros(limit, dtype=np.int64)
+        self.is_transition = np.zeros(limit, dtype=np.bool_)
+        self.nb_entries = 0
+        self.nb_writes = 0
+        self.pending_obs1 = None
+        self.pending_idxs = None
+        self.pending_writes = None
+        self._last_obs1 = None
+
+    def _allocate(self, n):
+        assert n <= self.limit
+        idxs = (self.nb_writes + np.arange(n)) % self.limit
+        self.nb_writes += n
+        self.nb_entries = min(self.nb_entries + n, self.limit)
+        return idxs
+
+    def sample(self, batch_size):
+        batch_idxs = np.random.randint(self.nb_entries, size=batch_size)
+        # entries that only hold a pending obs1 are rare, draw again until none are left
+        while True:
+            redraw = ~self.is_transition[batch_idxs]
+            if not redraw.any():
+                break
+            batch_idxs[redraw] = np.random.randint(self.nb_entries, size=redraw.sum())
+
+        next_idxs = self.next_idxs[batch_idxs]
+        obs1_batch = np.empty((batch_size,) + self.observations.shape[1:], dtype=self.observations.dtype)
+        stored = next_idxs >= 0
+        obs1_batch[stored] = self.observations[next_idxs[stored]]
+        obs1_batch[~stored] = self.pending_obs1[-1 - next_idxs[~stored]]
+
+        result = {
+            'obs0': array_min2d(self.observations[batch_idxs]),
+            'obs1': array_min2d(obs1_batch),
+            'rewards': self.rewards[batch_idxs],
+            'actions': array_min2d(self.actions[batch_idxs]),
+            'terminals1': self.terminals1[batch_idxs],
+        }
+        return result
+
+    def append(self, obs0, action, reward, obs1, terminal1, training=True):
+        self.append_batch([obs0], [action], [reward], [obs1], [terminal1], training=training)
+
+    def append_batch(self, obs0, action, reward, obs1, terminal1, training=True):
+        """Appends one transition per env of a vectorized env, the envs always in the same order."""
+        if not training:
+            return
+
+        nenvs = len(obs0)
+        if self.pending_obs1 is not None:
+            # the pending obs1 of an env can only be linked while its transition is not overwritten
+            alive = self.nb_writes - self.pending_writes <= self.limit
+        if self.pending_obs1 is None or len(self.pending_obs1) != nenvs:
+            if self.pending_obs1 is not None:
+                self._flush_pending(alive)
+            self.pending_obs1 = np.zeros((nenvs,) + self.observations.shape[1:], dtype=self.observations.dtype)
+            self.pending_idxs = np.zeros(nenvs, dtype=np.int64)
+            self.pending_writes = np.zeros(nenvs, dtype=np.int64)
+            continues = np.zeros(nenvs, dtype=np.bool_)
+        else:
+            if obs0 is self._last_obs1:
+                # the usual obs = new_obs of the training loop
+                continues = alive
+            else:
+                same = np.asarray(obs0, dtype=self.pending_obs1.dtype) == self.pending_obs1
+                continues = alive & same.reshape(nenvs, -1).all(axis=1)
+            self._flush_pending(~continues & alive)
+
+        idxs = self._allocate(nenvs)
+        _ring_write(self.observations, idxs[0], np.asarray(obs0))
+        self.actions[idxs] = action
+        self.rewards[idxs, 0] = reward
+        self.terminals1[idxs, 0] = terminal1
+        self.is_transition[idxs] = True
+        self.next_idxs[idxs] = -1 - np.arange(nenvs)
+        self.next_idxs[self.pending_idxs[continues]] = idxs[continues]
+
+        self.pending_obs1[...] = obs1
+        self.pending_idxs[...] = idxs
+        self.pending_writes[...] = self.nb_writes - nenvs + np.arange(nenvs)
+        self._last_obs1 = obs1
+
+    def _flush_pending(self, envs):
+        """Writes the pending obs1 of envs to entries of their own."""
+        if not envs.any():
+            return
+        idxs = self._allocate(envs.sum())
+        self.observations[idxs] = self.pending_obs1[envs]
+        self.is_transition[idxs] = False
+        self.next_idxs[self.pending_idxs[envs]] = idxs
@@ -0,0 +1,54 @@
+import numpy as np
+
+from baselines.ddpg.memory import Memory, DedupMemory
+
+KEYS = ['obs0', 'actions', 'rewards', 'obs1', 'terminals1']
+
+
+def run_vec_env(memories, nenvs=3, nsteps=40, obs_shape=(2, 2), seed=0):
+    rng = np.random.RandomState(seed)
+    obs = rng.randn(nenvs, *obs_shape)
+    for t in range(nsteps):
+        action = rng.randn(nenvs, 1)
+        reward = rng.randn(nenvs)
+        done = rng.rand(nenvs) < 0.2
+        new_obs = rng.randn(nenvs, *obs_shape)
+        for memory in memories:
+            memory.append_batch(obs, action, reward, new_obs, done)
+        obs = new_obs
+        if t == nsteps // 2:
+            # a reset outside of the env steps breaks the chain of observations
+            obs = rng.randn(nenvs, *obs_shape)
+
+
+def as_rows(batch):
+    return set(map(tuple, np.concatenate([batch[k].reshape(len(batch[k]), -1) for k in KEYS], axis=1)))
+
+
+def all_transitions(memory):
+    buffers = [memory.observations0, memory.actions, memory.rewards, memory.observations1, memory.terminals1]
+    return as_rows({k: buf.get_batch(np.arange(len(buf))) for k, buf in zip(KEYS, buffers)})
+
+
+def test_dedup_memory_matches_memory():
+    for limit in [1000, 50]:
+        memory = Memory(limit, action_shape=(1,), observation_shape=(2, 2))
+        dedup = DedupMemory(limit, action_shape=(1,), observation_shape=(2, 2))
+        run_vec_env([memory, dedup])
+
+        batch = dedup.sample(5000)
+        for k, v in memory.sample(10).items():
+            assert batch[k].shape[1:] == v.shape[1:]
+        assert as_rows(batch) <= all_transitions(memory)
+        if limit == 1000:
+            # every observation is stored once, plus the 3 obs1 before the reset
+            assert as_rows(batch) == all_transitions(memory)
+            assert dedup.nb_entries == memory.nb_entries + 3
+
+
+def test_ring_buffer_append_batch():
+    memory = Memory(5, action_shape=(1,), observation_shape=(1,))
+    memory.append_batch(np.arange(4).reshape(4, 1), np.zeros((4, 1)), np.arange(4), np.arange(4).reshape(4, 1), np.zeros(4))
+    memory.append_batch(np.arange(4, 7).reshape(3, 1), np.zeros((3, 1)), np.arange(4, 7), np.arange(4, 7).reshape(3, 1), np.zeros(3))
+    assert memory.nb_entries == 5
+    assert list(memory.rewards.get_batch(np.arange(5))[:, 0]) == [2, 3, 4, 5, 6]
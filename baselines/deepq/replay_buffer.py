@@ -1,46 +1,131 @@
 import numpy as np
-import random
 
 from baselines.common.segment_tree import SumSegmentTree, MinSegmentTree
 
 
 class ReplayBuffer(object):
-    def __init__(self, size):
+    def __init__(self, size, frame_stack=None):
         """Create Replay buffer.
 
+        Transitions are stored column-wise: one preallocated ndarray per field
+        (obs_t, action, reward, obs_tp1, done) of shape (size, *field_shape).
+        The arrays are allocated lazily from the shapes and dtypes of the first
+        transition added (rewards and done flags are always float32), so
+        sampling reduces to a single fancy-indexed gather per field.
+
         Parameters
         ----------
         size: int
             Max number of transitions to store in the buffer. When the buffer
             overflows the old memories are dropped.
+        frame_stack: int or None
+            if set, observations are stacks of `frame_stack` frames along the
+            last axis (as produced by atari_wrappers.FrameStack) and every
+            frame is stored only once in a circular frame store. obs_t and
+            obs_tp1 are rebuilt from frame indices at sample time; stacks that
+            reach back past the start of an episode repeat its first frame,
+            the same way FrameStack.reset fills the stack. The obs_t passed to
+            `add` must either be the obs_tp1 of the previous transition or a
+            freshly reset stack of identical frames. The obs_tp1 of a
+            transition that is followed by a reset is only kept until the
+            next `add`, after that it is rebuilt from the reset frame; it is
+            masked out of the TD target by `done` anyway.
         """
-        self._storage = []
+        self._storage = None
         self._maxsize = size
         self._next_idx = 0
+        self._num_in_buffer = 0
+
+        self._frame_stack = frame_stack
+        self._frames = None
+        # newest frame of obs_t of each transition, obs_tp1 is the following frame
+        self._frame_idx = None
+        # number of preceding frames of the same episode, capped at frame_stack - 1
+        self._frame_depth = None
+        self._next_frame = 0
+        self._last_obs_tp1 = None
 
     def __len__(self):
-        return len(self._storage)
+        return self._num_in_buffer
 
-    def add(self, obs_t, action, reward, obs_tp1, done):
-        data = (obs_t, action, reward, obs_tp1, done)
+    def _allocate(self, data):
+        # rewards and done flags are float32 whatever the first transition holds, so that
+        # an int first reward or a bool first done does not truncate the later ones
+        float_columns = (1, 2) if self._frame_stack is not None else (2, 4)
+        self._storage = []
+        for i, x in enumerate(data):
+            x = np.asarray(x)
+            dtype = np.float32 if i in float_columns else x.dtype
+            self._storage.append(np.empty((self._maxsize,) + x.shape, dtype=dtype))
+
+    def _allocate_frames(self, obs):
+        obs = np.asarray(obs)
+        assert obs.shape[-1] % self._frame_stack == 0, "last axis has to hold frame_stack frames"
+        frame_shape = obs.shape[:-1] + (obs.shape[-1] // self._frame_stack,)
+        # every transition adds one frame and reads frame_stack + 1 frames
+        num_frames = self._maxsize + self._frame_stack
+        self._frames = np.empty((num_frames,) + frame_shape, dtype=obs.dtype)
+        self._frame_depth = np.zeros(num_frames, dtype=np.int64)
+        self._frame_idx = np.empty(self._maxsize, dtype=np.int64)
 
-        if self._next_idx >= len(self._storage):
-            self._storage.append(data)
+    def _split_frames(self, obs):
+        obs = np.asarray(obs)
+        return np.stack(np.split(obs, self._frame_stack, axis=-1))
+
+    def _add_frames(self, obs_t, obs_tp1):
+        if self._frames is None:
+            self._allocate_frames(obs_t)
+        num_frames = len(self._frames)
+        # the newest frame of obs_t is the previous obs_tp1, unless an episode starts
+        idx = (self._next_frame - 1) % num_frames
+        continues = self._last_obs_tp1 is not None and (
+            obs_t is self._last_obs_tp1 or np.array_equal(obs_t, self._last_obs_tp1))
+        if not continues:
+            frames = self._split_frames(obs_t)
+            assert np.all(frames == frames[-1]), \
+                "obs_t has to continue the previous obs_tp1 or start a new episode"
+            self._frames[idx] = frames[-1]
+            self._frame_depth[idx] = 0
+        next_idx = (idx + 1) % num_frames
+        self._frames[next_idx] = self._split_frames(obs_tp1)[-1]
+        self._frame_depth[next_idx] = min(self._frame_depth[idx] + 1, self._frame_stack - 1)
+        self._next_frame = (next_idx + 1) % num_frames
+        self._last_obs_tp1 = obs_tp1
+        return idx
+
+    def _stack_frames(self, idxes):
+        # ages of the stacked frames, oldest first as in LazyFrames
+        ages = np.arange(self._frame_stack - 1, -1, -1)
+        offsets = np.minimum(ages[None, :], self._frame_depth[idxes][:, None])
+        frames = self._frames[(idxes[:, None] - offsets) % len(self._frames)]
+        # [batch, frame_stack, ..., c] -> [batch, ..., frame_stack * c]
+        frames = np.moveaxis(frames, 1, -2)
+        return frames.reshape(frames.shape[:-2] + (-1,))
+
+    def add(self, obs_t, action, reward, obs_tp1, done):
+        if self._frame_stack is not None:
+            frame_idx = self._add_frames(obs_t, obs_tp1)
+            self._frame_idx[self._next_idx] = frame_idx
+            data = (action, reward, done)
         else:
-            self._storage[self._next_idx] = data
+            data = (obs_t, action, reward, obs_tp1, done)
+
+        if self._storage is None:
+            self._allocate(data)
+        for column, x in zip(self._storage, data):
+            column[self._next_idx] = x
         self._next_idx = (self._next_idx + 1) % self._maxsize
+        self._num_in_buffer = min(self._num_in_buffer + 1, self._maxsize)
 
     def _encode_sample(self, idxes):
-        obses_t, actions, rewards, obses_tp1, dones = [], [], [], [], []
-        for i in idxes:
-            data = self._storage[i]
-            obs_t, action, reward, obs_tp1, done = data
-            obses_t.append(np.array(obs_t, copy=False))
-            actions.append(np.array(action, copy=False))
-            rewards.append(reward)
-            obses_tp1.append(np.array(obs_tp1, copy=False))
-            dones.append(done)
-        return np.array(obses_t), np.array(actions), np.array(rewards), np.array(obses_tp1), np.array(dones)
+        idxes = np.asarray(idxes)
+        if self._frame_stack is None:
+            return tuple(column[idxes] for column in self._storage)
+        actions, rewards, dones = (column[idxes] for column in self._storage)
+        frame_idxes = self._frame_idx[idxes]
+        obses_t = self._stack_frames(frame_idxes)
+        obses_tp1 = self._stack_frames((frame_idxes + 1) % len(self._frames))
+        return obses_t, actions, rewards, obses_tp1, dones
 
     def sample(self, batch_size):
         """Sample a batch of experiences.
@@ -64,12 +149,12 @@ class ReplayBuffer(object):
             done_mask[i] = 1 if executing act_batch[i] resulted in
             the end of an episode and 0 otherwise.
         """
-        idxes = [random.randint(0, len(self._storage) - 1) for _ in range(batch_size)]
+        idxes = np.random.randint(0, len(self), size=batch_size)
         return self._encode_sample(idxes)
 
 
 class PrioritizedReplayBuffer(ReplayBuffer):
-    def __init__(self, size, alpha):
+    def __init__(self, size, alpha, frame_stack=None):
         """Create Prioritized Replay buffer.
 
         Parameters
@@ -80,12 +165,14 @@ class PrioritizedReplayBuffer(ReplayBuffer):
         alpha: float
             how much prioritization is used
             (0 - no prioritization, 1 - full prioritization)
+        frame_stack: int or None
+            store each stacked frame only once, see ReplayBuffer.__init__
 
         See Also
         --------
         ReplayBuffer.__init__
         """
-        super(PrioritizedReplayBuffer, self).__init__(size)
+        super(PrioritizedReplayBuffer, self).__init__(size, frame_stack=frame_stack)
         assert alpha >= 0
         self._alpha = alpha
 
@@ -105,14 +192,10 @@ class PrioritizedReplayBuffer(ReplayBuffer):
         self._it_min[idx] = self._max_priority ** self._alpha
 
     def _sample_proportional(self, batch_size):
-        res = []
-        p_total = self._it_sum.sum(0, len(self._storage) - 1)
+        p_total = self._it_sum.sum(0, len(self) - 1)
         every_range_len = p_total / batch_size
-        for i in range(batch_size):
-            mass = random.random() * every_range_len + i * every_range_len
-            idx = self._it_sum.find_prefixsum_idx(mass)
-            res.append(idx)
-        return res
+        mass = (np.random.random(size=batch_size) + np.arange(batch_size)) * every_range_len
+        return self._it_sum.find_prefixsum_idx(mass)
 
     def sample(self, batch_size, beta):
         """Sample a batch of experiences.
@@ -147,22 +230,18 @@ class PrioritizedReplayBuffer(ReplayBuffer):
             Array of shape (batch_size,) and dtype np.float32
             denoting importance weight of each sampled transition
         idxes: np.array
-            Array of shape (batch_size,) and dtype np.int32
+            Array of shape (batch_size,) and dtype np.int64
             idexes in buffer of sampled experiences
         """
         assert beta > 0
 
         idxes = self._sample_proportional(batch_size)
 
-        weights = []
         p_min = self._it_min.min() / self._it_sum.sum()
-        max_weight = (p_min * len(self._storage)) ** (-beta)
+        max_weight = (p_min * len(self)) ** (-beta)
 
-        for idx in idxes:
-            p_sample = self._it_sum[idx] / self._it_sum.sum()
-            weight = (p_sample * len(self._storage)) ** (-beta)
-            weights.append(weight / max_weight)
-        weights = np.array(weights)
+        p_sample = self._it_sum[idxes] / self._it_sum.sum()
+        weights = (p_sample * len(self)) ** (-beta) / max_weight
         encoded_sample = self._encode_sample(idxes)
         return tuple(list(encoded_sample) + [weights, idxes])
 
@@ -181,11 +260,12 @@ class PrioritizedReplayBuffer(ReplayBuffer):
             transitions at the sampled idxes denoted by
             variable `idxes`.
         """
+        idxes = np.asarray(idxes)
+        priorities = np.asarray(priorities)
         assert len(idxes) == len(priorities)
-        for idx, priority in zip(idxes, priorities):
-            assert priority > 0
-            assert 0 <= idx < len(self._storage)
-            self._it_sum[idx] = priority ** self._alpha
-            self._it_min[idx] = priority ** self._alpha
+        assert np.all(priorities > 0)
+        assert np.all(0 <= idxes) and np.all(idxes < len(self))
+        self._it_sum[idxes] = priorities ** self._alpha
+        self._it_min[idxes] = priorities ** self._alpha
 
-            self._max_priority = max(self._max_priority, priority)
+        self._max_priority = max(self._max_priority, np.max(priorities))
@@ -0,0 +1,82 @@
+import numpy as np
+
+from baselines.deepq.replay_buffer import ReplayBuffer, PrioritizedReplayBuffer
+
+
+def test_replay_buffer_wraps_around():
+    buf = ReplayBuffer(4)
+    for i in range(6):
+        buf.add(np.full((2, 2), i, dtype=np.uint8), i, float(i), np.full((2, 2), i + 1, dtype=np.uint8), 0.)
+
+    assert len(buf) == 4
+    obses_t, actions, rewards, obses_tp1, dones = buf._encode_sample([0, 1, 2, 3])
+    assert obses_t.dtype == np.uint8 and obses_t.shape == (4, 2, 2)
+    assert list(actions) == [4, 5, 2, 3]
+    assert np.allclose(rewards, [4., 5., 2., 3.])
+    assert np.all(obses_tp1[:, 0, 0] == [5, 6, 3, 4])
+
+
+def test_replay_buffer_sample_shapes():
+    buf = ReplayBuffer(100)
+    for i in range(10):
+        buf.add(np.ones(3) * i, i % 2, 1., np.ones(3) * (i + 1), float(i == 9))
+
+    obses_t, actions, rewards, obses_tp1, dones = buf.sample(32)
+    assert obses_t.shape == (32, 3) and obses_tp1.shape == (32, 3)
+    assert actions.shape == rewards.shape == dones.shape == (32,)
+    assert np.allclose(obses_tp1 - obses_t, 1.)
+
+
+def test_prioritized_replay_buffer_priorities():
+    buf = PrioritizedReplayBuffer(8, alpha=1.0)
+    for i in range(8):
+        buf.add(np.ones(2) * i, i, 0., np.ones(2) * i, 0.)
+
+    buf.update_priorities(np.arange(8), np.array([1e-6] * 3 + [1.] + [1e-6] * 4))
+    obses_t, actions, rewards, obses_tp1, dones, weights, idxes = buf.sample(16, beta=0.5)
+    assert weights.shape == idxes.shape == (16,)
+    assert np.all(idxes == 3) and np.all(actions == 3)
+    assert np.allclose(weights, weights[0])
+
+
+def test_frame_stack_replay_buffer_matches_full_storage():
+    rng = np.random.RandomState(0)
+    nstack, size = 4, 16
+    full, dedup = ReplayBuffer(size), ReplayBuffer(size, frame_stack=nstack)
+
+    def stacked(frames):
+        return np.concatenate(frames[-nstack:], axis=-1)
+
+    frames = [rng.randint(0, 255, size=(3, 3, 1), dtype=np.uint8)] * nstack
+    obs = stacked(frames)
+    for t in range(50):
+        frames = frames + [rng.randint(0, 255, size=(3, 3, 1), dtype=np.uint8)]
+        new_obs = stacked(frames)
+        done = float(t % 7 == 6)
+        full.add(obs, t, 1., new_obs, done)
+        dedup.add(obs, t, 1., new_obs, done)
+        obs = new_obs
+        if done:
+            frames = [rng.randint(0, 255, size=(3, 3, 1), dtype=np.uint8)] * nstack
+            obs = stacked(frames)
+
+    idxes = np.arange(size)
+    expected, actual = full._encode_sample(idxes), dedup._encode_sample(idxes)
+    for i in range(5):
+        assert expected[i].shape == actual[i].shape
+    assert np.array_equal(expected[0], actual[0])
+    # the terminal next observation is only masked out by done, so it is not kept
+    not_done = expected[4] == 0
+    assert np.array_equal(expected[3][not_done], actual[3][not_done])
+    assert np.array_equal(expected[1], actual[1])
+
+
+def test_replay_buffer_keeps_float_rewards():
+    for buf in [ReplayBuffer(4), ReplayBuffer(4, frame_stack=2)]:
+        obs = np.zeros((2, 2), dtype=np.uint8)
+        buf.add(obs, 0, 0, obs, False)
+        buf.add(obs, 1, 0.5, obs, True)
+
+        obses_t, actions, rewards, obses_tp1, dones = buf._encode_sample([0, 1])
+        assert rewards.dtype == dones.dtype == np.float32
+        assert np.allclose(rewards, [0., 0.5]) and np.allclose(dones, [0., 1.])
@@ -35,7 +35,9 @@ def learn(env,
             max_steps = 200,
             update_repeat = 5,
             max_episodes = 1000,
-            outdir="/tmp/rosrl/experiments/continuous/deepqnaf/"):
+            outdir="/tmp/rosrl/experiments/continuous/deepqnaf/",
+            buffer_size = 1000000,
+            log_interval = 1000):
 
     # # set random seed
     # tf.set_random_seed(123)
@@ -84,7 +86,8 @@ def learn(env,
 
     agent = NAF(sess, env, strategy, pred_network, target_network,
                 discount, batch_size, learning_rate,
-                max_steps, update_repeat, max_episodes, outdir)
+                max_steps, update_repeat, max_episodes, outdir,
+                buffer_size=buffer_size, log_interval=log_interval)
     #agent.run(conf.monitor, conf.display, conf.is_train)
     agent.run(False, False, True)
     #agent.run2(conf.monitor, conf.display, True)
@@ -8,6 +8,7 @@ import numpy as np
 import tensorflow as tf
 from collections import deque
 from tensorflow.contrib.framework import get_variables
+from baselines.deepq.replay_buffer import ReplayBuffer
 
 from .utils_time import get_timestamp
 
@@ -22,7 +23,7 @@ class NAF(object):
                discount, batch_size,
                learning_rate,
                max_steps, update_repeat, max_episodes,
-               outdir):
+               outdir, buffer_size=1000000, log_interval=1000):
 
     self.outdir = outdir
     self.sess = sess
@@ -40,12 +41,10 @@ class NAF(object):
     self.max_steps = max_steps
     self.update_repeat = update_repeat
     self.max_episodes = max_episodes
+    self.log_interval = log_interval
 
-    self.prestates = []
-    self.actions = []
-    self.rewards = []
-    self.poststates = []
-    self.terminals = []
+    # preallocated ring buffer, sampling a minibatch costs O(batch_size)
+    self.memory = ReplayBuffer(buffer_size)
 
     with tf.name_scope('optimizer'):
       self.target_y = tf.placeholder(tf.float32, [None], name='target_y')
@@ -100,15 +99,13 @@ class NAF(object):
             action = self.predict(state)
 
             # 2. step
-            self.prestates.append(state)
+            prestate = state
             state, reward, terminal, _ = self.env.step(action)
 
             # Tensorboard, capture per-episode rewards
             summary = tf.Summary(value=[tf.Summary.Value(tag="Episode Reward", simple_value = reward)])
             summary_writer.add_summary(summary, it)
 
-            self.poststates.append(state)
-
             terminal = True if t == self.max_steps - 1 else terminal
 
             # 3. perceive
@@ -116,7 +113,7 @@ class NAF(object):
             if is_train:
 
               #q, v, a, l, it = self.perceive(state, reward, action, terminal, it)
-              q, v, a, l, it = self.perceive(state, reward, action, terminal, it, episode_rewards, episode_rewards_100)
+              q, v, a, l, it = self.perceive(prestate, state, reward, action, terminal, it, episode_rewards, episode_rewards_100)
 
               #if self.stat:
                 #self.stat.on_step(action, reward, terminal, q, v, a, l)
@@ -251,14 +248,17 @@ class NAF(object):
     return self.strategy.add_noise(u, {'idx_episode': self.idx_episode})
 
   #def perceive(self, state, reward, action, terminal, it):
-  def perceive(self, state, reward, action, terminal, it, episode_rewards, episode_rewards_100):
-    self.rewards.append(reward)
-    self.actions.append(action)
+  def perceive(self, prestate, state, reward, action, terminal, it, episode_rewards, episode_rewards_100):
+    self.remember(prestate, state, reward, action, terminal)
 
     #return self.q_learning_minibatch(it)
     return self.q_learning_minibatch(it, episode_rewards, episode_rewards_100)
 
 
+  def remember(self, prestate, state, reward, action, terminal):
+    # rewards are continuous, they must not take the dtype of an integral first reward
+    self.memory.add(prestate, action, float(reward), state, float(terminal))
+
   #def q_learning_minibatch(self, it):
   def q_learning_minibatch(self, it, episode_rewards, episode_rewards_100):
     q_list = []
@@ -270,7 +270,7 @@ class NAF(object):
     for iteration in range(self.update_repeat):
 
       it = it + 1
-      if len(episode_rewards) > 0:
+      if len(episode_rewards) > 0 and it % self.log_interval == 0:
           logger.record_tabular("EpRewMean", np.mean(episode_rewards))
           logger.record_tabular("EpRewStd", np.std(episode_rewards))
           logger.record_tabular("EpRewMean100", np.mean(episode_rewards_100))
@@ -279,15 +279,7 @@ class NAF(object):
           logger.dump_tabular()
 
 
-      if len(self.rewards) >= self.batch_size:
-        indexes = np.random.choice(len(self.rewards), size=self.batch_size)
-      else:
-        indexes = np.arange(len(self.rewards))
-
-      x_t = np.array(self.prestates)[indexes]
-      x_t_plus_1 = np.array(self.poststates)[indexes]
-      r_t = np.array(self.rewards)[indexes]
-      u_t = np.array(self.actions)[indexes]
+      x_t, u_t, r_t, x_t_plus_1, _ = self.memory.sample(self.batch_size)
 
       v = self.target_network.predict_v(x_t_plus_1, u_t)
       target_y = self.discount * np.squeeze(v) + r_t
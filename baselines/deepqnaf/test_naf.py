@@ -0,0 +1,18 @@
+import numpy as np
+
+from baselines.deepq.replay_buffer import ReplayBuffer
+from baselines.deepqnaf.naf import NAF
+
+
+def test_naf_memory_keeps_float_rewards():
+    # only the replay memory of the agent is needed, not its networks
+    naf = NAF.__new__(NAF)
+    naf.memory = ReplayBuffer(10)
+    state = np.zeros(3)
+    naf.remember(state, state, 0, np.zeros(1), False)
+    naf.remember(state, state, -0.25, np.zeros(1), False)
+    naf.remember(state, state, np.float32(1.5), np.zeros(1), True)
+
+    _, _, rewards, _, terminals = naf.memory._encode_sample([0, 1, 2])
+    np.testing.assert_allclose(rewards, [0., -0.25, 1.5])
+    np.testing.assert_allclose(terminals, [0., 0., 1.])
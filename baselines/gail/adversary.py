@@ -18,8 +18,12 @@ def logit_bernoulli_entropy(logits):
     return ent
 
 class TransitionClassifier(object):
-    def __init__(self, env, hidden_size, entcoeff=0.001, lr_rate=1e-3, scope="adversary"):
+    def __init__(self, env, hidden_size, entcoeff=0.001, lr_rate=1e-3, scope="adversary",
+                 obs_rms_sync_every=1, obs_rms_dtype=tf.float64):
+        # obs_rms_sync_every, obs_rms_dtype: see baselines.common.mpi_running_mean_std.RunningMeanStd
         self.scope = scope
+        self.obs_rms_sync_every = obs_rms_sync_every
+        self.obs_rms_dtype = obs_rms_dtype
         self.observation_shape = env.observation_space.shape
         self.actions_shape = env.action_space.shape
         self.input_shape = tuple([o+a for o, a in zip(self.observation_shape, self.actions_shape)])
@@ -65,7 +69,8 @@ class TransitionClassifier(object):
                 tf.get_variable_scope().reuse_variables()
 
             with tf.variable_scope("obfilter"):
-                self.obs_rms = RunningMeanStd(shape=self.observation_shape)
+                self.obs_rms = RunningMeanStd(shape=self.observation_shape, sync_every=self.obs_rms_sync_every,
+                                              dtype=self.obs_rms_dtype)
             obs = (obs_ph - self.obs_rms.mean) / self.obs_rms.std
             _input = tf.concat([obs, acs_ph], axis=1)  # concatenate the two input -> form a transition
             p_h1 = tf.contrib.layers.fully_connected(_input, self.hidden_size, activation_fn=tf.nn.tanh)
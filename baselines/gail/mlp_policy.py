@@ -22,7 +22,9 @@ class MlpPolicy(object):
             self._init(*args, **kwargs)
             self.scope = tf.get_variable_scope().name
 
-    def _init(self, ob_space, ac_space, hid_size, num_hid_layers, gaussian_fixed_var=True):
+    def _init(self, ob_space, ac_space, hid_size, num_hid_layers, gaussian_fixed_var=True,
+              ob_rms_sync_every=1, ob_rms_dtype=tf.float64):
+        # ob_rms_sync_every, ob_rms_dtype: see baselines.common.mpi_running_mean_std.RunningMeanStd
         assert isinstance(ob_space, gym.spaces.Box)
 
         self.pdtype = pdtype = make_pdtype(ac_space)
@@ -31,7 +33,7 @@ class MlpPolicy(object):
         ob = U.get_placeholder(name="ob", dtype=tf.float32, shape=[sequence_length] + list(ob_space.shape))
 
         with tf.variable_scope("obfilter"):
-            self.ob_rms = RunningMeanStd(shape=ob_space.shape)
+            self.ob_rms = RunningMeanStd(shape=ob_space.shape, sync_every=ob_rms_sync_every, dtype=ob_rms_dtype)
 
         obz = tf.clip_by_value((ob - self.ob_rms.mean) / self.ob_rms.std, -5.0, 5.0)
         last_out = obz
@@ -65,6 +67,9 @@ class MlpPolicy(object):
         ac1, vpred1 = self._act(stochastic, ob[None])
         return ac1[0], vpred1[0]
 
+    def act_batch(self, stochastic, obs):
+        return self._act(stochastic, obs)
+
     def get_variables(self):
         return tf.get_collection(tf.GraphKeys.GLOBAL_VARIABLES, self.scope)
 
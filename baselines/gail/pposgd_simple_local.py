@@ -9,13 +9,18 @@ from baselines.common.mpi_moments import mpi_moments
 from mpi4py import MPI
 from collections import deque
 from baselines.gail.statistics import stats
+from baselines.common.advantage import gae, episode_sums
+from baselines.common.segments import vec_traj_segment_generator, flatten_segment
+from baselines.common.vec_env import VecEnv
 
 def traj_segment_generator(pi, env, reward_giver, horizon, stochastic):
+    if isinstance(env, VecEnv):
+        yield from vec_traj_segment_generator(lambda ob: pi.act_batch(stochastic, ob), env, horizon, reward_giver)
+        return
     # Initialize state variables
     t = 0
     ac = env.action_space.sample()
     new = True
-    rew = 0.0
     true_rew = 0.0
     ob = env.reset()
 
@@ -43,12 +48,15 @@ def traj_segment_generator(pi, env, reward_giver, horizon, stochastic):
         # before returning segment [0, T-1] so we get the correct
         # terminal value
         if t > 0 and t % horizon == 0:
+            # discriminator rewards of the whole segment in one batch; step i is done
+            # when observation i + 1 starts a new episode
+            rews[:] = np.ravel(reward_giver.get_reward(obs, acs))
+            ep_rets, cur_ep_ret = episode_sums(rews, np.append(news[1:], new), cur_ep_ret)
             yield {"ob": obs, "rew": rews, "vpred": vpreds, "new": news,
                    "ac": acs, "prevac": prevacs, "nextvpred": vpred * (1 - new),
                    "ep_rets": ep_rets, "ep_lens": ep_lens, "ep_true_rets": ep_true_rets}
             # Be careful!!! if you change the downstream algorithm to aggregate
             # several of these batches, then be sure to do a deepcopy
-            ep_rets = []
             ep_true_rets = []
             ep_lens = []
         i = t % horizon
@@ -58,36 +66,24 @@ def traj_segment_generator(pi, env, reward_giver, horizon, stochastic):
         acs[i] = ac
         prevacs[i] = prevac
 
-        rew = reward_giver.get_reward(ob, ac)
         ob, true_rew, new, _ = env.step(ac)
-        rews[i] = rew
         true_rews[i] = true_rew
 
-        cur_ep_ret += rew
         cur_ep_true_ret += true_rew
         cur_ep_len += 1
         if new:
-            ep_rets.append(cur_ep_ret)
             ep_true_rets.append(cur_ep_true_ret)
             ep_lens.append(cur_ep_len)
-            cur_ep_ret = 0
             cur_ep_true_ret = 0
             cur_ep_len = 0
             ob = env.reset()
         t += 1
 
 def add_vtarg_and_adv(seg, gamma, lam):
-    new = np.append(seg["new"], 0) # last element is only used for last vtarg, but we already zeroed it if last new = 1
-    vpred = np.append(seg["vpred"], seg["nextvpred"])
-    T = len(seg["rew"])
-    seg["adv"] = gaelam = np.ones(T, 'float32')
-    rew = seg["rew"]
-    lastgaelam = 0
-    for t in reversed(range(T)):
-        nonterminal = 1-new[t+1]
-        delta = rew[t] + gamma * vpred[t+1] * nonterminal - vpred[t]
-        gaelam[t] = lastgaelam = delta + gamma * lam * nonterminal * lastgaelam
+    # nextvpred is already zeroed if the last new = 1, so the last observation never starts an episode
+    seg["adv"] = gae(seg["rew"], seg["vpred"], seg["new"], seg["nextvpred"], 0, gamma, lam)
     seg["tdlamret"] = seg["adv"] + seg["vpred"]
+    flatten_segment(seg)
 
 def learn(env, policy_fn, reward_giver, expert_dataset,
         pretrained, pretrained_weight, *,
@@ -135,8 +131,8 @@ def learn(env, policy_fn, reward_giver, expert_dataset,
 
     var_list = pi.get_trainable_variables()
     lossandgrad = U.function([ob, ac, atarg, ret, lrmult], losses + [U.flatgrad(total_loss, var_list)])
-    adam = MpiAdam(var_list, epsilon=adam_epsilon)
-    d_adam = MpiAdam(reward_giver.get_trainable_variables())
+    adam = MpiAdam(var_list, epsilon=adam_epsilon, in_graph=True)
+    d_adam = MpiAdam(reward_giver.get_trainable_variables(), in_graph=True)
 
     assign_old_eq_new = U.function([],[], updates=[tf.assign(oldv, newv)
         for (oldv, newv) in zipsame(oldpi.get_variables(), pi.get_variables())])
@@ -9,6 +9,7 @@ from mpi4py import MPI
 from tqdm import tqdm
 
 import numpy as np
+import tensorflow as tf
 import gym
 
 from baselines.gail import mlp_policy
@@ -41,6 +42,9 @@ def argsparser():
     # Network Configuration (Using MLP Policy)
     parser.add_argument('--policy_hidden_size', type=int, default=100)
     parser.add_argument('--adversary_hidden_size', type=int, default=100)
+    # Observation normalization: statistics are merged over the MPI workers every this many updates
+    parser.add_argument('--rms_sync_every', type=int, default=1)
+    boolean_flag(parser, 'rms_float32', default=False, help='keep the observation statistics in float32')
     # Algorithms Configuration
     parser.add_argument('--algo', type=str, choices=['trpo', 'ppo'], default='trpo')
     parser.add_argument('--max_kl', type=float, default=0.01)
@@ -73,9 +77,12 @@ def main(args):
     set_global_seeds(args.seed)
     env = gym.make(args.env_id)
 
+    rms_dtype = tf.float32 if args.rms_float32 else tf.float64
+
     def policy_fn(name, ob_space, ac_space, reuse=False):
         return mlp_policy.MlpPolicy(name=name, ob_space=ob_space, ac_space=ac_space,
-                                    reuse=reuse, hid_size=args.policy_hidden_size, num_hid_layers=2)
+                                    reuse=reuse, hid_size=args.policy_hidden_size, num_hid_layers=2,
+                                    ob_rms_sync_every=args.rms_sync_every, ob_rms_dtype=rms_dtype)
     env = bench.Monitor(env, logger.get_dir() and
                         osp.join(logger.get_dir(), "monitor.json"))
     env.seed(args.seed)
@@ -86,7 +93,8 @@ def main(args):
 
     if args.task == 'train':
         dataset = Mujoco_Dset(expert_path=args.expert_path, traj_limitation=args.traj_limitation)
-        reward_giver = TransitionClassifier(env, args.adversary_hidden_size, entcoeff=args.adversary_entcoeff)
+        reward_giver = TransitionClassifier(env, args.adversary_hidden_size, entcoeff=args.adversary_entcoeff,
+                                            obs_rms_sync_every=args.rms_sync_every, obs_rms_dtype=rms_dtype)
         train(env,
               args.seed,
               policy_fn,
@@ -18,15 +18,20 @@ from baselines.common import colorize
 from baselines.common.mpi_adam import MpiAdam
 from baselines.common.cg import cg
 from baselines.gail.statistics import stats
+from baselines.common.advantage import gae, episode_sums
+from baselines.common.segments import vec_traj_segment_generator, flatten_segment
+from baselines.common.vec_env import VecEnv
 
 
 def traj_segment_generator(pi, env, reward_giver, horizon, stochastic):
+    if isinstance(env, VecEnv):
+        yield from vec_traj_segment_generator(lambda ob: pi.act_batch(stochastic, ob), env, horizon, reward_giver)
+        return
 
     # Initialize state variables
     t = 0
     ac = env.action_space.sample()
     new = True
-    rew = 0.0
     true_rew = 0.0
     ob = env.reset()
 
@@ -53,13 +58,16 @@ def traj_segment_generator(pi, env, reward_giver, horizon, stochastic):
         # before returning segment [0, T-1] so we get the correct
         # terminal value
         if t > 0 and t % horizon == 0:
+            # discriminator rewards of the whole segment in one batch; step i is done
+            # when observation i + 1 starts a new episode
+            rews[:] = np.ravel(reward_giver.get_reward(obs, acs))
+            ep_rets, cur_ep_ret = episode_sums(rews, np.append(news[1:], new), cur_ep_ret)
             yield {"ob": obs, "rew": rews, "vpred": vpreds, "new": news,
                    "ac": acs, "prevac": prevacs, "nextvpred": vpred * (1 - new),
                    "ep_rets": ep_rets, "ep_lens": ep_lens, "ep_true_rets": ep_true_rets}
             _, vpred = pi.act(stochastic, ob)
             # Be careful!!! if you change the downstream algorithm to aggregate
             # several of these batches, then be sure to do a deepcopy
-            ep_rets = []
             ep_true_rets = []
             ep_lens = []
         i = t % horizon
@@ -69,19 +77,14 @@ def traj_segment_generator(pi, env, reward_giver, horizon, stochastic):
         acs[i] = ac
         prevacs[i] = prevac
 
-        rew = reward_giver.get_reward(ob, ac)
         ob, true_rew, new, _ = env.step(ac)
-        rews[i] = rew
         true_rews[i] = true_rew
 
-        cur_ep_ret += rew
         cur_ep_true_ret += true_rew
         cur_ep_len += 1
         if new:
-            ep_rets.append(cur_ep_ret)
             ep_true_rets.append(cur_ep_true_ret)
             ep_lens.append(cur_ep_len)
-            cur_ep_ret = 0
             cur_ep_true_ret = 0
             cur_ep_len = 0
             ob = env.reset()
@@ -89,17 +92,10 @@ def traj_segment_generator(pi, env, reward_giver, horizon, stochastic):
 
 
 def add_vtarg_and_adv(seg, gamma, lam):
-    new = np.append(seg["new"], 0)  # last element is only used for last vtarg, but we already zeroed it if last new = 1
-    vpred = np.append(seg["vpred"], seg["nextvpred"])
-    T = len(seg["rew"])
-    seg["adv"] = gaelam = np.empty(T, 'float32')
-    rew = seg["rew"]
-    lastgaelam = 0
-    for t in reversed(range(T)):
-        nonterminal = 1-new[t+1]
-        delta = rew[t] + gamma * vpred[t+1] * nonterminal - vpred[t]
-        gaelam[t] = lastgaelam = delta + gamma * lam * nonterminal * lastgaelam
+    # nextvpred is already zeroed if the last new = 1, so the last observation never starts an episode
+    seg["adv"] = gae(seg["rew"], seg["vpred"], seg["new"], seg["nextvpred"], 0, gamma, lam)
     seg["tdlamret"] = seg["adv"] + seg["vpred"]
+    flatten_segment(seg)
 
 
 def learn(env, policy_func, reward_giver, expert_dataset, rank,
@@ -149,8 +145,8 @@ def learn(env, policy_func, reward_giver, expert_dataset, rank,
     var_list = [v for v in all_var_list if v.name.startswith("pi/pol") or v.name.startswith("pi/logstd")]
     vf_var_list = [v for v in all_var_list if v.name.startswith("pi/vff")]
     assert len(var_list) == len(vf_var_list) + 1
-    d_adam = MpiAdam(reward_giver.get_trainable_variables())
-    vfadam = MpiAdam(vf_var_list)
+    d_adam = MpiAdam(reward_giver.get_trainable_variables(), in_graph=True)
+    vfadam = MpiAdam(vf_var_list, in_graph=True)
 
     get_flat = U.GetFlat(var_list)
     set_from_flat = U.SetFromFlat(var_list)
@@ -305,6 +301,8 @@ def learn(env, policy_func, reward_giver, expert_dataset, rank,
                             pi.ob_rms.update(mbob)  # update running mean/std for policy
                         g = allmean(compute_vflossandgrad(mbob, mbret))
                         vfadam.update(g, vf_stepsize)
+                if hasattr(pi, "ob_rms"):
+                    pi.ob_rms.flush()  # the statistics deferred by sync_every
 
         g_losses = meanlosses
         for (lossname, lossval) in zip(loss_names, meanlosses):
@@ -325,6 +323,8 @@ def learn(env, policy_func, reward_giver, expert_dataset, rank,
             *newlosses, g = reward_giver.lossandgrad(ob_batch, ac_batch, ob_expert, ac_expert)
             d_adam.update(allmean(g), d_stepsize)
             d_losses.append(newlosses)
+        if hasattr(reward_giver, "obs_rms"):
+            reward_giver.obs_rms.flush()
         logger.log(fmt_row(13, np.mean(d_losses, axis=0)))
 
         lrlocal = (seg["ep_lens"], seg["ep_rets"], seg["ep_true_rets"])  # local values
@@ -1,3 +1,4 @@
+import threading
 from collections import OrderedDict
 
 import numpy as np
@@ -25,7 +26,7 @@ class DDPG(object):
                  Q_lr, pi_lr, norm_eps, norm_clip, max_u, action_l2, clip_obs, scope, T,
                  rollout_batch_size, subtract_goals, relative_goals, clip_pos_returns, clip_return,
                  bc_loss, q_filter, num_demo, demo_batch_size, prm_loss_weight, aux_loss_weight,
-                 sample_transitions, gamma, reuse=False, **kwargs):
+                 sample_transitions, gamma, reuse=False, buffer_dtype='float32', prefetch=0, **kwargs):
         """Implementation of DDPG that is used in combination with Hindsight Experience Replay (HER).
             Added functionality to use demonstrations for training to Overcome exploration problem.
 
@@ -61,6 +62,9 @@ class DDPG(object):
             demo_batch_size: number of samples to be used from the demonstrations buffer, per mpi thread
             prm_loss_weight: Weight corresponding to the primary loss
             aux_loss_weight: Weight corresponding to the auxilliary loss also called the cloning loss
+            buffer_dtype (str): dtype the replay buffers store episodes with
+            prefetch (int): number of batches a background thread samples and stages ahead of
+                train(), 0 to sample them in train()
         """
         if self.clip_return is None:
             self.clip_return = np.inf
@@ -87,12 +91,16 @@ class DDPG(object):
         with tf.variable_scope(self.scope):
             self.staging_tf = StagingArea(
                 dtypes=[tf.float32 for _ in self.stage_shapes.keys()],
-                shapes=list(self.stage_shapes.values()))
+                shapes=list(self.stage_shapes.values()),
+                capacity=self.prefetch)
             self.buffer_ph_tf = [
                 tf.placeholder(tf.float32, shape=shape) for shape in self.stage_shapes.values()]
             self.stage_op = self.staging_tf.put(self.buffer_ph_tf)
+            self.clear_staging_op = self.staging_tf.clear()
 
             self._create_network(reuse=reuse)
+        self._prefetch_thread = None
+        self._prefetch_stop = threading.Event()
 
         # Configure the replay buffer.
         buffer_shapes = {key: (self.T-1 if key != 'o' else self.T, *input_shapes[key])
@@ -101,10 +109,10 @@ class DDPG(object):
         buffer_shapes['ag'] = (self.T, self.dimg)
 
         buffer_size = (self.buffer_size // self.rollout_batch_size) * self.rollout_batch_size
-        self.buffer = ReplayBuffer(buffer_shapes, buffer_size, self.T, self.sample_transitions)
+        self.buffer = ReplayBuffer(buffer_shapes, buffer_size, self.T, self.sample_transitions, np.dtype(self.buffer_dtype))
 
         global DEMO_BUFFER
-        DEMO_BUFFER = ReplayBuffer(buffer_shapes, buffer_size, self.T, self.sample_transitions) #initialize the demo buffer; in the same way as the primary data buffer
+        DEMO_BUFFER = ReplayBuffer(buffer_shapes, buffer_size, self.T, self.sample_transitions, np.dtype(self.buffer_dtype)) #initialize the demo buffer; in the same way as the primary data buffer
 
     def _random_action(self, n):
         return np.random.uniform(low=-self.max_u, high=self.max_u, size=(n, self.dimu))
@@ -196,8 +204,6 @@ class DDPG(object):
 
             if update_stats:
                 # add transitions to normalizer to normalize the demo data as well
-                episode['o_2'] = episode['o'][:, 1:, :]
-                episode['ag_2'] = episode['ag'][:, 1:, :]
                 num_normalizing_transitions = transitions_in_episode_batch(episode)
                 transitions = self.sample_transitions(episode, num_normalizing_transitions)
 
@@ -224,8 +230,6 @@ class DDPG(object):
 
         if update_stats:
             # add transitions to normalizer
-            episode_batch['o_2'] = episode_batch['o'][:, 1:, :]
-            episode_batch['ag_2'] = episode_batch['ag'][:, 1:, :]
             num_normalizing_transitions = transitions_in_episode_batch(episode_batch)
             transitions = self.sample_transitions(episode_batch, num_normalizing_transitions)
 
@@ -266,10 +270,7 @@ class DDPG(object):
             global DEMO_BUFFER
             transitions_demo = DEMO_BUFFER.sample(self.demo_batch_size) #sample from the demo buffer
             for k, values in transitions_demo.items():
-                rolloutV = transitions[k].tolist()
-                for v in values:
-                    rolloutV.append(v.tolist())
-                transitions[k] = np.array(rolloutV)
+                transitions[k] = np.concatenate([transitions[k], values])
         else:
             transitions = self.buffer.sample(self.batch_size) #otherwise only sample from primary buffer
 
@@ -287,8 +288,34 @@ class DDPG(object):
         assert len(self.buffer_ph_tf) == len(batch)
         self.sess.run(self.stage_op, feed_dict=dict(zip(self.buffer_ph_tf, batch)))
 
+    def start_prefetch(self):
+        """Starts the thread that keeps self.prefetch batches staged. put() blocks once the
+        staging area is full, so the thread only samples as fast as train() consumes.
+        """
+        assert self.prefetch > 0 and self._prefetch_thread is None
+        self._prefetch_stop.clear()
+        self._prefetch_thread = threading.Thread(target=self._prefetch_loop, daemon=True)
+        self._prefetch_thread.start()
+
+    def _prefetch_loop(self):
+        while not self._prefetch_stop.is_set():
+            self.stage_batch()
+
+    def stop_prefetch(self):
+        if self._prefetch_thread is None:
+            return
+        self._prefetch_stop.set()
+        # unblock a pending put
+        self.sess.run(self.clear_staging_op)
+        self._prefetch_thread.join()
+        self._prefetch_thread = None
+        self.sess.run(self.clear_staging_op)
+
     def train(self, stage=True):
-        if stage:
+        if self.prefetch > 0:
+            if self._prefetch_thread is None:
+                self.start_prefetch()
+        elif stage:
             self.stage_batch()
         critic_loss, actor_loss, Q_grad, pi_grad = self._grads()
         self._update(Q_grad, pi_grad)
@@ -301,6 +328,7 @@ class DDPG(object):
         self.sess.run(self.update_target_net_op)
 
     def clear_buffer(self):
+        self.stop_prefetch()
         self.buffer.clear_buffer()
 
     def _vars(self, scope):
@@ -420,7 +448,7 @@ class DDPG(object):
         """
         excluded_subnames = ['_tf', '_op', '_vars', '_adam', 'buffer', 'sess', '_stats',
                              'main', 'target', 'lock', 'env', 'sample_transitions',
-                             'stage_shapes', 'create_actor_critic']
+                             'stage_shapes', 'create_actor_critic', '_prefetch']
 
         state = {k: v for k, v in self.__dict__.items() if all([not subname in k for subname in excluded_subnames])}
         state['buffer_size'] = self.buffer_size
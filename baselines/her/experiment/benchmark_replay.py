@@ -0,0 +1,49 @@
+import time
+
+import click
+import numpy as np
+
+from baselines.her.her_sampler import make_sample_her_transitions
+from baselines.her.replay_buffer import ReplayBuffer
+
+
+def reward_fun(ag_2, g, info):  # vectorized, as in the Fetch environments
+    return -(np.linalg.norm(ag_2 - g, axis=-1) > 0.05).astype(np.float32)
+
+
+def make_buffer(dtype, size_in_transitions, T, dimo, dimg, dimu):
+    # the shapes DDPG uses: 'o' and 'ag' are one step longer than the other keys
+    buffer_shapes = {'o': (T + 1, dimo), 'ag': (T + 1, dimg), 'g': (T, dimg), 'u': (T, dimu),
+                     'info_is_success': (T, 1)}
+    sample_transitions = make_sample_her_transitions('future', 4, reward_fun)
+    buffer = ReplayBuffer(buffer_shapes, size_in_transitions, T, sample_transitions, dtype)
+    for _ in range(buffer.size // 100):
+        buffer.store_episode({key: np.random.randn(100, *shape) for key, shape in buffer_shapes.items()})
+    return buffer
+
+
+def benchmark(dtype, size, T, batch_size, n_batches, dimo=25, dimg=3, dimu=4):
+    """Returns the bytes per transition and the samples/sec of a full buffer, for FetchPush
+    sized observations by default."""
+    buffer = make_buffer(dtype, size, T, dimo, dimg, dimu)
+    nbytes = sum(buf.nbytes for buf in buffer.buffers.values())
+    buffer.sample(batch_size)
+    tstart = time.time()
+    for _ in range(n_batches):
+        buffer.sample(batch_size)
+    return nbytes / buffer.get_current_size(), n_batches * batch_size / (time.time() - tstart)
+
+
+@click.command()
+@click.option('--size', type=int, default=int(1E6), help='replay buffer size in transitions')
+@click.option('--T', 'T', type=int, default=50)
+@click.option('--batch_size', type=int, default=256)
+@click.option('--n_batches', type=int, default=1000)
+def main(size, T, batch_size, n_batches):
+    for dtype in ['float64', 'float32']:
+        bytes_per_transition, samples_per_sec = benchmark(np.dtype(dtype), size, T, batch_size, n_batches)
+        print('{}: {:.0f} bytes per transition, {:.0f} samples/sec'.format(dtype, bytes_per_transition, samples_per_sec))
+
+
+if __name__ == '__main__':
+    main()
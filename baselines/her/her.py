@@ -81,6 +81,7 @@ def train(*, policy, rollout_worker, evaluator,
         if rank != 0:
             assert local_uniform[0] != root_uniform[0]
 
+    policy.stop_prefetch()
     return policy
 
 
@@ -1,5 +1,8 @@
 import numpy as np
 
+# keys whose episodes are T+1 long, and the key of their next time step
+_NEXT_KEYS = {'o': 'o_2', 'ag': 'ag_2'}
+
 
 def make_sample_her_transitions(replay_strategy, replay_k, reward_fun):
     """Creates a sample function that can be used for HER experience replay.
@@ -17,7 +20,9 @@ def make_sample_her_transitions(replay_strategy, replay_k, reward_fun):
         future_p = 0
 
     def _sample_her_transitions(episode_batch, batch_size_in_transitions):
-        """episode_batch is {key: array(buffer_size x T x dim_key)}
+        """episode_batch is {key: array(buffer_size x T x dim_key)}, except for 'o' and 'ag'
+        which are T+1 long. 'o_2' and 'ag_2' are gathered from them, together with 'o'
+        and 'ag', and any 'o_2' or 'ag_2' in episode_batch is ignored.
         """
         T = episode_batch['u'].shape[1]
         rollout_batch_size = episode_batch['u'].shape[0]
@@ -26,8 +31,14 @@ def make_sample_her_transitions(replay_strategy, replay_k, reward_fun):
         # Select which episodes and time steps to use.
         episode_idxs = np.random.randint(0, rollout_batch_size, batch_size)
         t_samples = np.random.randint(T, size=batch_size)
-        transitions = {key: episode_batch[key][episode_idxs, t_samples].copy()
-                       for key in episode_batch.keys()}
+        # fancy indexing already returns copies
+        transitions = {key: episode_batch[key][episode_idxs, t_samples]
+                       for key in episode_batch.keys() if key not in _NEXT_KEYS.values()}
+        # one read per T+1 long key for both time steps of the transition
+        t_pairs = t_samples[:, np.newaxis] + np.arange(2)
+        for key, next_key in _NEXT_KEYS.items():
+            pairs = episode_batch[key][episode_idxs[:, np.newaxis], t_pairs]
+            transitions[key], transitions[next_key] = pairs[:, 0], pairs[:, 1]
 
         # Select future time indexes proportional with probability future_p. These
         # will be used for HER replay by substituting in future goals.
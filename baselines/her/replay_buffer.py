@@ -4,7 +4,7 @@ import numpy as np
 
 
 class ReplayBuffer:
-    def __init__(self, buffer_shapes, size_in_transitions, T, sample_transitions):
+    def __init__(self, buffer_shapes, size_in_transitions, T, sample_transitions, dtype=np.float32):
         """Creates a replay buffer.
 
         Args:
@@ -13,6 +13,7 @@ class ReplayBuffer:
             size_in_transitions (int): the size of the buffer, measured in transitions
             T (int): the time horizon for episodes
             sample_transitions (function): a function that samples from the replay buffer
+            dtype (numpy dtype): the dtype episodes are stored with
         """
         self.buffer_shapes = buffer_shapes
         self.size = size_in_transitions // T
@@ -20,7 +21,7 @@ class ReplayBuffer:
         self.sample_transitions = sample_transitions
 
         # self.buffers is {key: array(size_in_episodes x T or T+1 x dim_key)}
-        self.buffers = {key: np.empty([self.size, *shape])
+        self.buffers = {key: np.empty([self.size, *shape], dtype=dtype)
                         for key, shape in buffer_shapes.items()}
 
         # memory management
@@ -35,7 +36,8 @@ class ReplayBuffer:
             return self.current_size == self.size
 
     def sample(self, batch_size):
-        """Returns a dict {key: array(batch_size x shapes[key])}
+        """Returns a dict {key: array(batch_size x shapes[key])}, plus 'o_2' and 'ag_2' which
+        sample_transitions gathers from the T+1 long 'o' and 'ag' buffers.
         """
         buffers = {}
 
@@ -44,10 +46,8 @@ class ReplayBuffer:
             for key in self.buffers.keys():
                 buffers[key] = self.buffers[key][:self.current_size]
 
-        buffers['o_2'] = buffers['o'][:, 1:, :]
-        buffers['ag_2'] = buffers['ag'][:, 1:, :]
-
-        transitions = self.sample_transitions(buffers, batch_size)
+            # under the lock, as a prefetching thread may sample while episodes are stored
+            transitions = self.sample_transitions(buffers, batch_size)
 
         for key in (['r', 'o_2', 'ag_2'] + list(self.buffers.keys())):
             assert key in transitions, "key %s missing from transitions" % key
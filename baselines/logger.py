@@ -6,6 +6,9 @@ import json
 import time
 import datetime
 import tempfile
+import threading
+import queue
+import atexit
 from collections import defaultdict
 from contextlib import contextmanager
 
@@ -17,13 +20,23 @@ ERROR = 40
 DISABLED = 50
 
 class KVWriter(object):
+    autoflush = True  # flush after every write, see AsyncOutputFormat
+
     def writekvs(self, kvs):
         raise NotImplementedError
 
+    def flush(self):
+        pass
+
 class SeqWriter(object):
+    autoflush = True
+
     def writeseq(self, seq):
         raise NotImplementedError
 
+    def flush(self):
+        pass
+
 class HumanOutputFormat(KVWriter, SeqWriter):
     def __init__(self, filename_or_file):
         if isinstance(filename_or_file, str):
@@ -66,7 +79,8 @@ class HumanOutputFormat(KVWriter, SeqWriter):
         self.file.write('\n'.join(lines) + '\n')
 
         # Flush the output to the file
-        self.file.flush()
+        if self.autoflush:
+            self.flush()
 
     def _truncate(self, s):
         maxlen = 30
@@ -79,6 +93,10 @@ class HumanOutputFormat(KVWriter, SeqWriter):
             if i < len(seq) - 1: # add space unless this is the last one
                 self.file.write(' ')
         self.file.write('\n')
+        if self.autoflush:
+            self.flush()
+
+    def flush(self):
         self.file.flush()
 
     def close(self):
@@ -94,31 +112,57 @@ class JSONOutputFormat(KVWriter):
             if hasattr(v, 'dtype'):
                 kvs[k] = float(v)
         self.file.write(json.dumps(kvs) + '\n')
+        if self.autoflush:
+            self.flush()
+
+    def flush(self):
         self.file.flush()
 
     def close(self):
         self.file.close()
 
 class CSVOutputFormat(KVWriter):
-    def __init__(self, filename):
+    def __init__(self, filename, segmented=False):
+        """
+        segmented: if False, the whole file is rewritten with a wider header whenever a new
+        key shows up. If True, rows with new keys go to a new segment filename.1, filename.2, ...
+        with its own header instead, so history is never rewritten; read_csv joins the segments.
+        """
+        self.filename = filename
         self.file = open(filename, 'w+t')
+        # segments left by an earlier run into the same file would be read as part of this one
+        for segment in csv_segments(filename):
+            os.remove(segment)
         self.keys = []
         self.sep = ','
+        self.segmented = segmented
+        self.segment = 0
+        self.nrows = 0  # rows in the current file
+
+    def _write_header(self):
+        for (i, k) in enumerate(self.keys):
+            if i > 0:
+                self.file.write(',')
+            self.file.write(k)
+        self.file.write('\n')
 
     def writekvs(self, kvs):
         # Add our current row to the history
         extra_keys = list(kvs.keys() - self.keys)
         extra_keys.sort()
-        if extra_keys:
+        if extra_keys and self.segmented and self.nrows > 0:
+            self.keys.extend(extra_keys)
+            self.file.close()
+            self.segment += 1
+            self.file = open('%s.%i' % (self.filename, self.segment), 'w+t')
+            self.nrows = 0
+            self._write_header()
+        elif extra_keys:
             self.keys.extend(extra_keys)
             self.file.seek(0)
             lines = self.file.readlines()
             self.file.seek(0)
-            for (i, k) in enumerate(self.keys):
-                if i > 0:
-                    self.file.write(',')
-                self.file.write(k)
-            self.file.write('\n')
+            self._write_header()
             for line in lines[1:]:
                 self.file.write(line[:-1])
                 self.file.write(self.sep * len(extra_keys))
@@ -130,6 +174,11 @@ class CSVOutputFormat(KVWriter):
             if v is not None:
                 self.file.write(str(v))
         self.file.write('\n')
+        self.nrows += 1
+        if self.autoflush:
+            self.flush()
+
+    def flush(self):
         self.file.flush()
 
     def close(self):
@@ -163,28 +212,112 @@ class TensorBoardOutputFormat(KVWriter):
         event = self.event_pb2.Event(wall_time=time.time(), summary=summary)
         event.step = self.step # is there any reason why you'd want to specify the step?
         self.writer.WriteEvent(event)
-        self.writer.Flush()
+        if self.autoflush:
+            self.flush()
         self.step += 1
 
+    def flush(self):
+        if self.writer:
+            self.writer.Flush()
+
     def close(self):
         if self.writer:
             self.writer.Close()
             self.writer = None
 
-def make_output_format(format, ev_dir, log_suffix=''):
+class AsyncOutputFormat(KVWriter, SeqWriter):
+    """
+    Wraps an output format so that writekvs / writeseq only queue the data.
+    A background thread writes it out and flushes the wrapped format every
+    flush_interval seconds, so dumpkvs does not wait for disk I/O.
+    """
+    _CLOSE = object()
+
+    def __init__(self, fmt, flush_interval=5.0):
+        self.fmt = fmt
+        self.fmt.autoflush = False
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue()
+        self.error = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        last_flush = time.time()
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            try:
+                if item is self._CLOSE:
+                    self.fmt.flush()
+                    return
+                if item is not None:
+                    method, data = item
+                    method(data)
+                if time.time() - last_flush >= self.flush_interval:
+                    self.fmt.flush()
+                    last_flush = time.time()
+            except Exception as e: # pylint: disable=W0703
+                self.error = e
+            finally:
+                if item is not None:
+                    self.queue.task_done()
+
+    def _put(self, method, data):
+        if self.error is not None:
+            raise self.error
+        self.queue.put((method, data))
+
+    def writekvs(self, kvs):
+        if isinstance(self.fmt, KVWriter):
+            # the logger clears its dict right after dumping it
+            self._put(self.fmt.writekvs, dict(kvs))
+
+    def writeseq(self, seq):
+        if isinstance(self.fmt, SeqWriter):
+            self._put(self.fmt.writeseq, list(seq))
+
+    def flush(self):
+        """
+        Block until everything queued so far is written and flushed.
+        """
+        self.queue.join()
+        self.fmt.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(self._CLOSE)
+        self.thread.join()
+        self.fmt.close()
+        atexit.unregister(self.close)
+
+def make_output_format(format, ev_dir, log_suffix='', flush_interval=None):
+    """
+    If flush_interval is not None, every output format except stdout writes from a
+    background thread and is flushed every flush_interval seconds (see AsyncOutputFormat),
+    and the csv format writes new keys to new segments instead of rewriting the file.
+    """
     os.makedirs(ev_dir, exist_ok=True)
+    buffered = flush_interval is not None
     if format == 'stdout':
         return HumanOutputFormat(sys.stdout)
     elif format == 'log':
-        return HumanOutputFormat(osp.join(ev_dir, 'log%s.txt' % log_suffix))
+        fmt = HumanOutputFormat(osp.join(ev_dir, 'log%s.txt' % log_suffix))
     elif format == 'json':
-        return JSONOutputFormat(osp.join(ev_dir, 'progress%s.json' % log_suffix))
+        fmt = JSONOutputFormat(osp.join(ev_dir, 'progress%s.json' % log_suffix))
     elif format == 'csv':
-        return CSVOutputFormat(osp.join(ev_dir, 'progress%s.csv' % log_suffix))
+        fmt = CSVOutputFormat(osp.join(ev_dir, 'progress%s.csv' % log_suffix), segmented=buffered)
     elif format == 'tensorboard':
-        return TensorBoardOutputFormat(osp.join(ev_dir, 'tb%s' % log_suffix))
+        fmt = TensorBoardOutputFormat(osp.join(ev_dir, 'tb%s' % log_suffix))
     else:
         raise ValueError('Unknown format specified: %s' % (format,))
+    return AsyncOutputFormat(fmt, flush_interval) if buffered else fmt
 
 # ================================================================
 # API
@@ -369,9 +502,12 @@ def get_rank_without_mpi_import():
     return 0
 
 
-def configure(dir=None, format_strs=None, comm=None, log_suffix=''):
+def configure(dir=None, format_strs=None, comm=None, log_suffix='', flush_interval=None):
     """
     If comm is provided, average all numerical stats across that comm
+
+    If flush_interval (seconds) is provided, output files are written by background
+    threads and flushed at that interval instead of on every dumpkvs / log call
     """
     if dir is None:
         dir = os.getenv('OPENAI_LOGDIR')
@@ -391,7 +527,7 @@ def configure(dir=None, format_strs=None, comm=None, log_suffix=''):
         else:
             format_strs = os.getenv('OPENAI_LOG_FORMAT_MPI', 'log').split(',')
     format_strs = filter(None, format_strs)
-    output_formats = [make_output_format(f, dir, log_suffix) for f in format_strs]
+    output_formats = [make_output_format(f, dir, log_suffix, flush_interval=flush_interval) for f in format_strs]
 
     Logger.CURRENT = Logger(dir=dir, output_formats=output_formats, comm=comm)
     log('Logging to %s'%dir)
@@ -459,9 +595,24 @@ def read_json(fname):
             ds.append(json.loads(line))
     return pandas.DataFrame(ds)
 
+def csv_segments(fname):
+    """The segments fname.1, fname.2, ... of a segmented csv, in order."""
+    from glob import glob, escape
+    segments = [f for f in glob(escape(fname) + '.*') if f[len(fname) + 1:].isdigit()]
+    return sorted(segments, key=lambda f: int(f[len(fname) + 1:]))
+
 def read_csv(fname):
+    """
+    Reads a csv written by CSVOutputFormat, including the segments
+    fname.1, fname.2, ... that a segmented CSVOutputFormat adds when new keys appear.
+    """
     import pandas
-    return pandas.read_csv(fname, index_col=None, comment='#')
+    df = pandas.read_csv(fname, index_col=None, comment='#')
+    segments = csv_segments(fname)
+    if segments:
+        df = pandas.concat([df] + [pandas.read_csv(f, index_col=None, comment='#') for f in segments],
+                           ignore_index=True, sort=False)
+    return df
 
 def read_tb(path):
     """
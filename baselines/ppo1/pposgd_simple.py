@@ -5,12 +5,18 @@ import tensorflow as tf, numpy as np
 import time
 from baselines.common.mpi_adam import MpiAdam
 from baselines.common.mpi_moments import mpi_moments
+from baselines.common.advantage import gae
+from baselines.common.segments import vec_traj_segment_generator, flatten_segment
+from baselines.common.vec_env import VecEnv
 from mpi4py import MPI
 from collections import deque
 
 import os
 
 def traj_segment_generator(pi, env, horizon, stochastic):
+    if isinstance(env, VecEnv):
+        yield from vec_traj_segment_generator(lambda ob: pi.act_batch(stochastic, ob), env, horizon)
+        return
     t = 0
     ac = env.action_space.sample() # not used, just so we have the datatype
     new = True # marks if we're on first timestep of an episode
@@ -67,17 +73,10 @@ def add_vtarg_and_adv(seg, gamma, lam):
     """
     Compute target value using TD(lambda) estimator, and advantage with GAE(lambda)
     """
-    new = np.append(seg["new"], 0) # last element is only used for last vtarg, but we already zeroed it if last new = 1
-    vpred = np.append(seg["vpred"], seg["nextvpred"])
-    T = len(seg["rew"])
-    seg["adv"] = gaelam = np.empty(T, 'float32')
-    rew = seg["rew"]
-    lastgaelam = 0
-    for t in reversed(range(T)):
-        nonterminal = 1-new[t+1]
-        delta = rew[t] + gamma * vpred[t+1] * nonterminal - vpred[t]
-        gaelam[t] = lastgaelam = delta + gamma * lam * nonterminal * lastgaelam
+    # nextvpred is already zeroed if the last new = 1, so the last observation never starts an episode
+    seg["adv"] = gae(seg["rew"], seg["vpred"], seg["new"], seg["nextvpred"], 0, gamma, lam)
     seg["tdlamret"] = seg["adv"] + seg["vpred"]
+    flatten_segment(seg)
 
 def learn(env, policy_fn, *,
         timesteps_per_actorbatch, # timesteps per actor per update
@@ -127,7 +126,7 @@ def learn(env, policy_fn, *,
 
     var_list = pi.get_trainable_variables()
     lossandgrad = U.function([ob, ac, atarg, ret, lrmult], losses + [U.flatgrad(total_loss, var_list)])
-    adam = MpiAdam(var_list, epsilon=adam_epsilon)
+    adam = MpiAdam(var_list, epsilon=adam_epsilon, in_graph=True)
 
     assign_old_eq_new = U.function([],[], updates=[tf.assign(oldv, newv)
         for (oldv, newv) in zipsame(oldpi.get_variables(), pi.get_variables())])
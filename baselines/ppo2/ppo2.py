@@ -6,13 +6,14 @@ from baselines import logger
 from collections import deque
 from baselines.common import explained_variance, set_global_seeds
 from baselines.common.policies import build_policy
+from baselines.common.vec_env.vec_normalize import find_vec_normalize, STATE_SUFFIX
 import math
 
 try:
     from mpi4py import MPI
 except ImportError:
     MPI = None
-from baselines.ppo2.runner import Runner
+from baselines.ppo2.runner import Runner, AsyncRunner
 
 
 def constfn(val):
@@ -23,7 +24,7 @@ def constfn(val):
 def learn(*, network, env, total_timesteps, eval_env = None, seed=None, nsteps=2048, ent_coef=0.0, lr=3e-4,
             vf_coef=0.5,  max_grad_norm=0.5, gamma=0.99, lam=0.95,
             log_interval=10, nminibatches=4, noptepochs=4, cliprange=0.2,
-            save_interval=0, load_path=None, model_fn=None, update_fn=None, init_fn=None, mpi_rank_weight=1, comm=None, **network_kwargs):
+            save_interval=0, load_path=None, model_fn=None, update_fn=None, init_fn=None, mpi_rank_weight=1, comm=None, async_batch_size=None, **network_kwargs):
     '''
     Learn policy using PPO algorithm (https://arxiv.org/abs/1707.06347)
 
@@ -72,6 +73,10 @@ def learn(*, network, env, total_timesteps, eval_env = None, seed=None, nsteps=2
 
     load_path: str                    path to load the model from
 
+    async_batch_size: int or None     if set, env has to be a baselines.common.vec_env.AsyncVecEnv. Envs are then stepped as soon as
+                                      async_batch_size of them have reported back instead of in lockstep, so slow envs do not stall
+                                      the others (feed-forward policies only)
+
     **network_kwargs:                 keyword arguments to the policy / network builder. See baselines.common/policies.py/build_policy and arguments to a particular type of network
                                       For instance, 'mlp' network architecture has arguments num_hidden and num_layers.
     '''
@@ -102,15 +107,23 @@ def learn(*, network, env, total_timesteps, eval_env = None, seed=None, nsteps=2
         from baselines.ppo2.model import Model
         model_fn = Model
 
-    model = model_fn(policy=policy, ob_space=ob_space, ac_space=ac_space, nbatch_act=nenvs, nbatch_train=nbatch_train,
+    # the asynchronous runner steps the envs that reported back only, a variable number of them
+    nbatch_act = nenvs if async_batch_size is None else None
+    model = model_fn(policy=policy, ob_space=ob_space, ac_space=ac_space, nbatch_act=nbatch_act, nbatch_train=nbatch_train,
                     nsteps=nsteps, ent_coef=ent_coef, vf_coef=vf_coef,
                     max_grad_norm=max_grad_norm, comm=comm, mpi_rank_weight=mpi_rank_weight)
 
+    vec_normalize = find_vec_normalize(env)
     if load_path is not None:
         print("Loading model from: ", load_path)
         model.load(load_path)
+        if vec_normalize is not None and osp.exists(load_path + STATE_SUFFIX):
+            vec_normalize.load(load_path + STATE_SUFFIX)
     # Instantiate the runner object
-    runner = Runner(env=env, model=model, nsteps=nsteps, gamma=gamma, lam=lam)
+    if async_batch_size is None:
+        runner = Runner(env=env, model=model, nsteps=nsteps, gamma=gamma, lam=lam)
+    else:
+        runner = AsyncRunner(env=env, model=model, nsteps=nsteps, gamma=gamma, lam=lam, batch_size=async_batch_size)
     if eval_env is not None:
         eval_runner = Runner(env = eval_env, model = model, nsteps = nsteps, gamma = gamma, lam= lam)
 
@@ -229,6 +242,8 @@ def learn(*, network, env, total_timesteps, eval_env = None, seed=None, nsteps=2
                 best_mean_rewbuffer = mean_rewbuffer
                 print('Saving to', best_savepath)
                 model.save(best_savepath)
+                if vec_normalize is not None:
+                    vec_normalize.save(best_savepath + STATE_SUFFIX)
 
             if (update % save_interval == 0 or update == 1):
                 checkdir = osp.join(logger.get_dir(), 'checkpoints')
@@ -236,6 +251,8 @@ def learn(*, network, env, total_timesteps, eval_env = None, seed=None, nsteps=2
                 savepath = osp.join(checkdir, '%.5i'%update)
                 print('Saving to', savepath)
                 model.save(savepath)
+                if vec_normalize is not None:
+                    vec_normalize.save(savepath + STATE_SUFFIX)
 
     return model
 # Avoid division error when calculate the mean (in our case if epinfo is empty returns np.nan, not return an error)
@@ -1,5 +1,6 @@
 import numpy as np
-from baselines.common.runners import AbstractEnvRunner
+from baselines.common.runners import AbstractEnvRunner, AbstractAsyncEnvRunner
+from baselines.common.advantage import gae
 
 class Runner(AbstractEnvRunner):
     """
@@ -46,26 +47,64 @@ class Runner(AbstractEnvRunner):
         mb_actions = np.asarray(mb_actions)
         mb_values = np.asarray(mb_values, dtype=np.float32)
         mb_neglogpacs = np.asarray(mb_neglogpacs, dtype=np.float32)
-        mb_dones = np.asarray(mb_dones, dtype=np.bool)
+        mb_dones = np.asarray(mb_dones, dtype=np.bool_)
         last_values = self.model.value(self.obs, S=self.states, M=self.dones)
 
         # discount/bootstrap off value fn
-        mb_returns = np.zeros_like(mb_rewards)
-        mb_advs = np.zeros_like(mb_rewards)
-        lastgaelam = 0
-        for t in reversed(range(self.nsteps)):
-            if t == self.nsteps - 1:
-                nextnonterminal = 1.0 - self.dones
-                nextvalues = last_values
-            else:
-                nextnonterminal = 1.0 - mb_dones[t+1]
-                nextvalues = mb_values[t+1]
-            delta = mb_rewards[t] + self.gamma * nextvalues * nextnonterminal - mb_values[t]
-            mb_advs[t] = lastgaelam = delta + self.gamma * self.lam * nextnonterminal * lastgaelam
-        mb_returns = mb_advs + mb_values
+        mb_returns = gae(mb_rewards, mb_values, mb_dones, last_values, self.dones, self.gamma, self.lam) + mb_values
         return (*map(sf01, (mb_obs, mb_returns, mb_dones, mb_actions, mb_values, mb_neglogpacs)),
             mb_states, epinfos)
 # obs, returns, masks, actions, values, neglogpacs, states = runner.run()
+
+class AsyncRunner(AbstractAsyncEnvRunner):
+    """
+    Runner for an AsyncVecEnv: envs are stepped as soon as they report back, batch_size
+    at a time, instead of in lockstep. Every env still contributes exactly nsteps
+    consecutive transitions, so run() returns the same layout as Runner.run().
+    Only feed-forward policies are supported, and the act model has to take a variable
+    batch size (ppo2.learn builds it with nbatch_act=None).
+    """
+    def __init__(self, *, env, model, nsteps, gamma, lam, batch_size):
+        super().__init__(env=env, model=model, nsteps=nsteps, batch_size=batch_size)
+        self.lam = lam
+        self.gamma = gamma
+
+    def run(self):
+        nsteps, nenv = self.nsteps, self.nenv
+        mb_obs = np.zeros((nsteps,) + self.obs.shape, dtype=self.obs.dtype)
+        mb_rewards = np.zeros((nsteps, nenv), dtype=np.float32)
+        mb_values = np.zeros((nsteps, nenv), dtype=np.float32)
+        mb_neglogpacs = np.zeros((nsteps, nenv), dtype=np.float32)
+        mb_dones = np.zeros((nsteps, nenv), dtype=np.bool_)
+        mb_actions = None
+        epinfos = []
+
+        def act(env_ids, t):
+            nonlocal mb_actions
+            # the act model has a variable batch size, only the envs that reported back are evaluated
+            obs = self.obs[env_ids]
+            actions, values, _, neglogpacs = self.model.step(obs, S=self.states, M=self.dones[env_ids])
+            if mb_actions is None:
+                mb_actions = np.zeros((nsteps, nenv) + actions.shape[1:], dtype=actions.dtype)
+            mb_obs[t, env_ids] = obs
+            mb_actions[t, env_ids] = actions
+            mb_values[t, env_ids] = values
+            mb_neglogpacs[t, env_ids] = neglogpacs
+            mb_dones[t, env_ids] = self.dones[env_ids]
+            return actions
+
+        def observe(env_ids, t, rewards, dones, infos):
+            mb_rewards[t, env_ids] = rewards
+            for info in infos:
+                maybeepinfo = {sub_key:info[key][sub_key] for key in info.keys() for sub_key in info[key]}
+                if maybeepinfo: epinfos.append(maybeepinfo)
+
+        self.rollout(act, observe)
+        last_values = self.model.value(self.obs, S=self.states, M=self.dones)
+        mb_returns = gae(mb_rewards, mb_values, mb_dones, last_values, self.dones, self.gamma, self.lam) + mb_values
+        return (*map(sf01, (mb_obs, mb_returns, mb_dones, mb_actions, mb_values, mb_neglogpacs)),
+            self.states, epinfos)
+
 def sf01(arr):
     """
     swap and then flatten axes 0 and 1
@@ -0,0 +1,56 @@
+import gym
+import numpy as np
+
+from baselines.common.vec_env.async_vec_env import AsyncVecEnv
+from baselines.ppo2.runner import AsyncRunner
+
+
+class CountingEnv(gym.Env):
+    def __init__(self, episode_len):
+        self.episode_len = episode_len
+        self.observation_space = gym.spaces.Box(low=0, high=100, shape=(2,), dtype=np.float32)
+        self.action_space = self.observation_space
+        self.t = 0
+
+    def reset(self):
+        self.t = 0
+        return np.zeros(2, dtype=np.float32)
+
+    def step(self, action):
+        self.t += 1
+        return np.full(2, self.t, dtype=np.float32), 1., self.t >= self.episode_len, {}
+
+
+class Model(object):
+    initial_state = None
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def step(self, obs, S=None, M=None):
+        self.batch_sizes.append(len(obs))
+        return obs.copy(), obs[:, 0], None, np.zeros(len(obs), dtype=np.float32)
+
+    def value(self, obs, S=None, M=None):
+        return obs[:, 0]
+
+
+def test_async_runner_steps_only_reported_envs():
+    nenv, nsteps, batch_size = 4, 6, 2
+    env = AsyncVecEnv([lambda n=n: CountingEnv(n + 2) for n in range(nenv)])
+    try:
+        model = Model()
+        runner = AsyncRunner(env=env, model=model, nsteps=nsteps, gamma=0.99, lam=0.95, batch_size=batch_size)
+        obs, returns, masks, actions, values, neglogpacs, states, epinfos = runner.run()
+    finally:
+        env.close()
+
+    # the first step acts for every env, later ones only for the envs that reported back
+    assert model.batch_sizes[0] == nenv and max(model.batch_sizes[1:]) <= batch_size
+    assert sum(model.batch_sizes) == nenv * nsteps
+    assert obs.shape == actions.shape == (nenv * nsteps, 2)
+    np.testing.assert_array_equal(actions, obs)
+    np.testing.assert_array_equal(values, obs[:, 0])
+    # every env took its own nsteps consecutive steps
+    for n, env_obs in enumerate(obs.reshape(nenv, nsteps, 2)[..., 0]):
+        np.testing.assert_array_equal(env_obs, np.arange(nsteps) % (n + 2))
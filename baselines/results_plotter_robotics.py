@@ -1,3 +1,4 @@
+import os.path as osp
 import numpy as np
 import matplotlib
 matplotlib.use('TkAgg') # Can change to 'Agg' for non-interactive mode
@@ -5,7 +6,8 @@ matplotlib.use('TkAgg') # Can change to 'Agg' for non-interactive mode
 import matplotlib.pyplot as plt
 plt.rcParams['svg.fonttype'] = 'none'
 
-from baselines.bench.monitor import load_results
+from baselines.bench.monitor import LoadMonitorResultsError
+from baselines.common import plot_util
 
 X_TIMESTEPS = 'timesteps'
 X_EPISODES = 'episodes'
@@ -55,10 +57,19 @@ def plot_curves(xy_list, xaxis, title):
     plt.ylabel("Episode Rewards")
     plt.tight_layout()
 
+def load_monitor(dir):
+    """The episodes of the monitor files directly in dir; subdirectories are not plotted."""
+    dir = osp.normpath(osp.expanduser(dir))
+    for result in plot_util.load_results(dir, enable_progress=False, columns=['r', 'l', 't']):
+        if osp.normpath(result.dirname) == dir and result.monitor is not None:
+            return result.monitor
+    raise LoadMonitorResultsError('no monitor files in %s' % dir)
+
 def plot_results(dirs, num_timesteps, xaxis, task_name):
+    # one curve per directory
     tslist = []
     for dir in dirs:
-        ts = load_results(dir)
+        ts = load_monitor(dir)
         ts = ts[ts.l.cumsum() <= num_timesteps]
         tslist.append(ts)
     xy_list = [ts2xy(ts, xaxis) for ts in tslist]
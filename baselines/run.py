@@ -8,6 +8,7 @@ import tensorflow as tf
 
 from baselines.common.vec_env import VecFrameStack, VecNormalize, VecEnv
 from baselines.common.vec_env.vec_video_recorder import VecVideoRecorder
+from baselines.common.vec_env.vec_normalize import find_vec_normalize, STATE_SUFFIX
 from baselines.common.cmd_util import common_arg_parser, parse_unknown_args, make_vec_env, make_env
 from baselines.common.tf_util import get_session
 from baselines import logger
@@ -112,7 +113,10 @@ def build_env(args, render=False):
         env = make_vec_env(env_id, env_type, args.num_env or 1, seed, reward_scale=args.reward_scale, flatten_dict_observations=flatten_dict_observations)
 
         if env_type == 'mujoco':
-            env = VecNormalize(env, use_tf=True)
+            comm = MPI.COMM_WORLD if MPI is not None and MPI.COMM_WORLD.Get_size() > 1 else None
+            # a single process updates its normalization statistics at every step
+            sync_every = args.normalize_sync_every if comm is not None else 1
+            env = VecNormalize(env, use_tf=True, comm=comm, sync_every=sync_every)
 
     return env
 
@@ -211,9 +215,15 @@ def main(args):
     if args.save_path is not None and rank == 0:
         save_path = osp.expanduser(args.save_path)
         model.save(save_path)
+        vec_normalize = find_vec_normalize(env)
+        if vec_normalize is not None:
+            vec_normalize.save(save_path + STATE_SUFFIX)
 
     if args.play:
         logger.log("Running trained model")
+        vec_normalize = find_vec_normalize(env)
+        if vec_normalize is not None:
+            vec_normalize.frozen = True
         obs = env.reset()
 
         state = model.initial_state if hasattr(model, 'initial_state') else None
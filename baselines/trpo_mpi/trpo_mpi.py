@@ -10,6 +10,9 @@ from baselines.common.mpi_adam import MpiAdam
 from baselines.common.cg import cg
 from baselines.common.input import observation_placeholder
 from baselines.common.policies import build_policy
+from baselines.common.advantage import gae
+from baselines.common.segments import vec_traj_segment_generator, flatten_segment
+from baselines.common.vec_env import VecEnv
 from contextlib import contextmanager
 import os
 
@@ -19,6 +22,9 @@ except ImportError:
     MPI = None
 
 def traj_segment_generator(pi, env, horizon, stochastic):
+    if isinstance(env, VecEnv):
+        yield from vec_traj_segment_generator(lambda ob: pi.step(ob, stochastic=stochastic)[:2], env, horizon)
+        return
     # Initialize state variables
     t = 0
     ac = env.action_space.sample()
@@ -75,17 +81,10 @@ def traj_segment_generator(pi, env, horizon, stochastic):
         t += 1
 
 def add_vtarg_and_adv(seg, gamma, lam):
-    new = np.append(seg["new"], 0) # last element is only used for last vtarg, but we already zeroed it if last new = 1
-    vpred = np.append(seg["vpred"], seg["nextvpred"])
-    T = len(seg["rew"])
-    seg["adv"] = gaelam = np.empty(T, 'float32')
-    rew = seg["rew"]
-    lastgaelam = 0
-    for t in reversed(range(T)):
-        nonterminal = 1-new[t+1]
-        delta = rew[t] + gamma * vpred[t+1] * nonterminal - vpred[t]
-        gaelam[t] = lastgaelam = delta + gamma * lam * nonterminal * lastgaelam
+    # nextvpred is already zeroed if the last new = 1, so the last observation never starts an episode
+    seg["adv"] = gae(seg["rew"], seg["vpred"], seg["new"], seg["nextvpred"], 0, gamma, lam)
     seg["tdlamret"] = seg["adv"] + seg["vpred"]
+    flatten_segment(seg)
 
 def learn(*,
         network,
@@ -119,7 +118,7 @@ def learn(*,
 
     env                     environment (one of the gym environments or wrapped via baselines.common.vec_env.VecEnv-type class
 
-    timesteps_per_batch     timesteps per gradient estimation batch
+    timesteps_per_batch     timesteps per gradient estimation batch, over all the envs when env is a VecEnv
 
     max_kl                  max KL divergence between old policy and new policy ( KL(pi_old || pi) )
 
@@ -212,7 +211,7 @@ def learn(*,
     var_list = get_pi_trainable_variables("pi")
     vf_var_list = get_vf_trainable_variables("pi")
 
-    vfadam = MpiAdam(vf_var_list)
+    vfadam = MpiAdam(vf_var_list, in_graph=True)
 
     get_flat = U.GetFlat(var_list)
     set_from_flat = U.SetFromFlat(var_list)